@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+''' Benchmarks of the radio scheduler simulator.
+
+    End-to-end benchmarks time RadioMultilinkScheduler.transmit() for every
+    scheduler type, number of UEs and PHY mode, and RadioSchedulerVecEnv
+    steps with the py_itpp and the NumPy channels. Micro-benchmarks time the
+    channel, CQI, encode/decode and buffer helpers. Every benchmark runs in a
+    fresh worker process, so the reported peak RSS is that of the benchmark.
+
+    Results are saved as JSON. If a baseline file exists, the results are
+    compared with it, and the script exits with status 1 when a benchmark is
+    slower than the baseline by more than the tolerance.
+
+    Usage:
+        python benchmarks/run_benchmarks.py                       # run all, compare with baseline.json
+        python benchmarks/run_benchmarks.py --filter transmit_PropFair
+        python benchmarks/run_benchmarks.py --save-baseline       # store the results as the new baseline
+'''
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEDULER_TYPES = ['Random', 'RoundRobin', 'MaxRate', 'PropFair']
+NROF_UES = [1, 10, 30, 100, 300]
+PHY_MODES = ['bit_level', 'abstracted']
+
+''' Peak resident set size of the current process in MB.
+'''
+def get_peak_rss_mb():
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kB elsewhere
+    if sys.platform == 'darwin':
+        return peak_rss / 2.0 ** 20
+
+    return peak_rss / 2.0 ** 10
+
+''' Call step(i) for i in range(nrof_steps), repeat, and return the best
+    number of steps per second.
+'''
+def time_steps(step, nrof_steps, nrof_repeats=3):
+    best_duration = np.inf
+    for _ in range(nrof_repeats):
+        start_time = time.perf_counter()
+        for i in range(nrof_steps):
+            step(i)
+        best_duration = min(best_duration, time.perf_counter() - start_time)
+
+    return nrof_steps / best_duration
+
+def benchmark_transmit(scheduler_type, nrof_ues, phy_mode, nrof_steps):
+    from gym_radio_scheduler.envs.radio_multilink_scheduler import RadioMultilinkScheduler
+
+    sched = RadioMultilinkScheduler(nrof_ues=nrof_ues, scheduler_type=scheduler_type, phy_mode=phy_mode, seed=42)
+
+    # Warm up the caches, e.g. the PHY context and the fading channels
+    for _ in range(10):
+        sched.transmit()
+
+    return time_steps(lambda i: sched.transmit(), nrof_steps, nrof_repeats=1)
+
+''' Steps of RadioSchedulerVecEnv, counted as env steps (num_envs cells per
+    vec env step), for comparison with the channel backends and with
+    benchmark_transmit.
+'''
+def benchmark_vec_env_step(num_envs, nrof_ues, phy_mode, channel_backend, nrof_steps):
+    from gym_radio_scheduler.envs.radio_scheduler_vec_env import RadioSchedulerVecEnv
+
+    env = RadioSchedulerVecEnv(num_envs, nrof_ues=nrof_ues, scheduler_type='RoundRobin', phy_mode=phy_mode, baseband_engine='numpy', channel_backend=channel_backend, seed=42)
+    env.reset()
+
+    actions = np.full(num_envs, -1)
+    for _ in range(10):
+        env.step(actions)
+
+    return num_envs * time_steps(lambda i: env.step(actions), nrof_steps, nrof_repeats=1)
+
+def benchmark_channel_frequency_response(nrof_steps):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import setup_fading_channel, calculate_channel_frequency_response
+
+    pyp.RNG_reset(42)
+    channel_spec = pyp.comm.Channel_Specification(pyp.comm.CHANNEL_PROFILE.ITU_Vehicular_B)
+    channel = setup_fading_channel(channel_spec, 0.83)
+    calculate_channel_frequency_response(channel, 0)
+
+    return time_steps(lambda i: calculate_channel_frequency_response(channel, i), nrof_steps)
+
+def benchmark_numpy_channel_frequency_responses(nrof_steps, nrof_ues=30):
+    from gym_radio_scheduler.envs.src import NumpyTdlChannel
+
+    channel = NumpyTdlChannel(nrof_ues, 'ITU_Vehicular_B', 0.83, np.random.default_rng(42))
+
+    # Channel frequency responses per second, for comparison with the per-UE py_itpp channel
+    return nrof_ues * time_steps(lambda i: channel.get_frequency_responses(i), nrof_steps)
+
+def _generate_channel_coefficients(nrof_ues):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import setup_fading_channel, calculate_channel_frequency_response
+
+    pyp.RNG_reset(42)
+    channel_spec = pyp.comm.Channel_Specification(pyp.comm.CHANNEL_PROFILE.ITU_Vehicular_B)
+
+    return [calculate_channel_frequency_response(setup_fading_channel(channel_spec, 0.83), 0) for _ in range(nrof_ues)]
+
+def _load_snr_at_bler_target():
+    from gym_radio_scheduler.envs.src import load_from_file, determine_snr_at_bler_target
+
+    awgn_datafile = os.path.join(BENCHMARK_DIR, '..', 'gym_radio_scheduler', 'envs', 'sim_data', 'awgn_custom_config_datafile.npy')
+
+    return determine_snr_at_bler_target(load_from_file(awgn_datafile, encoding='latin1'), 0.1)
+
+def benchmark_wideband_cqi(nrof_steps):
+    from gym_radio_scheduler.envs.src import calculate_wideband_channel_quality_index
+
+    channel_coefficients = _generate_channel_coefficients(1)[0]
+    snr_at_bler_target = _load_snr_at_bler_target()
+
+    return time_steps(lambda i: calculate_wideband_channel_quality_index(channel_coefficients, 0.1, snr_at_bler_target), nrof_steps)
+
+def benchmark_wideband_cqi_batch(nrof_steps, nrof_ues=30):
+    from gym_radio_scheduler.envs.src import calculate_wideband_channel_quality_index_batch
+
+    channel_coefficients = np.array([coefficients.to_numpy_ndarray() for coefficients in _generate_channel_coefficients(nrof_ues)])
+    noise_variance = np.full(nrof_ues, 0.1)
+    snr_at_bler_target = _load_snr_at_bler_target().to_numpy_ndarray()
+
+    # Steps are counted per UE, for comparison with the single-link version
+    return nrof_ues * time_steps(lambda i: calculate_wideband_channel_quality_index_batch(channel_coefficients, noise_variance, snr_at_bler_target), nrof_steps)
+
+def benchmark_encode_decode(nrof_steps, transport_block_size=400):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import PhyContext, channel_encode_and_interleave_bits, deinterleave_and_channel_decode_symbols, to_vec
+
+    pyp.RNG_reset(42)
+    phy_context = PhyContext()
+    bits = pyp.randb(transport_block_size)
+
+    def encode_decode(i):
+        coded_bits, interleaver_sequence = channel_encode_and_interleave_bits(bits, phy_context)
+        soft_values = to_vec(1.0 - 2.0 * coded_bits.to_numpy_ndarray()) # Noiseless soft values
+        deinterleave_and_channel_decode_symbols(soft_values, interleaver_sequence, phy_context)
+
+    return time_steps(encode_decode, nrof_steps)
+
+def benchmark_buffer_helpers(nrof_steps, buffer_size=3000, nrof_bits=1008):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import extract_next_bits_with_zero_padding, extract_next_bits_with_wraparound, add_values_with_wraparound
+
+    pyp.RNG_reset(42)
+    bits = pyp.randb(buffer_size)
+    harq_buffer = pyp.zeros(buffer_size)
+    values = pyp.ones(nrof_bits)
+
+    def buffer_helpers(i):
+        index = (i * nrof_bits) % buffer_size
+        extract_next_bits_with_zero_padding(bits, index, nrof_bits)
+        extract_next_bits_with_wraparound(bits, index, nrof_bits)
+        add_values_with_wraparound(harq_buffer, index, values)
+
+    return time_steps(buffer_helpers, nrof_steps)
+
+def benchmark_circular_buffer(nrof_steps, buffer_size=3000, nrof_bits=1008):
+    from gym_radio_scheduler.envs.src import CircularBuffer
+
+    transmit_buffer = CircularBuffer(buffer_size, np.uint8)
+    transmit_buffer.load(np.random.default_rng(42).integers(0, 2, buffer_size))
+    receive_buffer = CircularBuffer(buffer_size, float)
+    receive_buffer.reset(buffer_size)
+    values = np.ones(nrof_bits)
+
+    def circular_buffer(i):
+        index = (i * nrof_bits) % buffer_size
+        transmit_buffer.read(index, nrof_bits)
+        receive_buffer.accumulate(index, values)
+
+    return time_steps(circular_buffer, nrof_steps)
+
+''' Soft combining of received values into the py_itpp vector passed to the
+    decoder, with method 'string' (formatting and parsing a string, as before
+    the vectors were preallocated), 'preallocated' (copying NumPy values into
+    a reused vector, as for the NumPy baseband), 'circular_buffer' (adding
+    py_itpp values in place, as for the py_itpp baseband) or 'buffer_helpers'
+    (the original py_itpp soft combining with concat/mid).
+'''
+def benchmark_soft_value_conversion(nrof_steps, method, nrof_values=2154):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import PyItppCircularBuffer, PyItppVectorCache, add_values_with_wraparound
+
+    values = np.random.default_rng(42).normal(size=nrof_values)
+
+    if method == 'string':
+        convert = lambda i: pyp.vec(' '.join([repr(value) for value in values.tolist()]))
+    elif method == 'preallocated':
+        vectors = PyItppVectorCache(pyp.vec, float)
+        convert = lambda i: vectors.copy(values)
+    elif method == 'circular_buffer':
+        harq_buffer = PyItppCircularBuffer(pyp.vec)
+        harq_buffer.reset(nrof_values)
+        soft_values = pyp.vec(nrof_values)
+        convert = lambda i: harq_buffer.accumulate(0, soft_values)
+    elif method == 'buffer_helpers':
+        harq_buffer = pyp.zeros(nrof_values)
+        soft_values = pyp.vec(nrof_values)
+        convert = lambda i: add_values_with_wraparound(harq_buffer, 0, soft_values)
+    else:
+        raise ValueError('Unsupported conversion method %s'%(method))
+
+    return time_steps(convert, nrof_steps)
+
+''' Returns the benchmarks as a dict mapping the benchmark name to
+    (function, keyword arguments).
+'''
+def collect_benchmarks(scheduler_types, nrof_ues_list, phy_modes, nrof_transmit_steps, nrof_micro_steps):
+    benchmarks = {}
+    for phy_mode in phy_modes:
+        for scheduler_type in scheduler_types:
+            for nrof_ues in nrof_ues_list:
+                name = 'transmit_%s_%dUES_%s'%(scheduler_type, nrof_ues, phy_mode)
+                benchmarks[name] = (benchmark_transmit, {'scheduler_type': scheduler_type, 'nrof_ues': nrof_ues, 'phy_mode': phy_mode, 'nrof_steps': nrof_transmit_steps})
+
+    for phy_mode in phy_modes:
+        for channel_backend in ['py_itpp', 'numpy']:
+            name = 'vec_env_16ENVS_10UES_%s_%s_channels'%(phy_mode, channel_backend)
+            benchmarks[name] = (benchmark_vec_env_step, {'num_envs': 16, 'nrof_ues': 10, 'phy_mode': phy_mode, 'channel_backend': channel_backend, 'nrof_steps': nrof_transmit_steps})
+
+    benchmarks['channel_frequency_response'] = (benchmark_channel_frequency_response, {'nrof_steps': nrof_micro_steps})
+    benchmarks['numpy_channel_frequency_responses'] = (benchmark_numpy_channel_frequency_responses, {'nrof_steps': nrof_micro_steps})
+    benchmarks['wideband_cqi'] = (benchmark_wideband_cqi, {'nrof_steps': nrof_micro_steps})
+    benchmarks['wideband_cqi_batch'] = (benchmark_wideband_cqi_batch, {'nrof_steps': nrof_micro_steps})
+    benchmarks['encode_decode'] = (benchmark_encode_decode, {'nrof_steps': nrof_micro_steps})
+    benchmarks['buffer_helpers'] = (benchmark_buffer_helpers, {'nrof_steps': nrof_micro_steps})
+    benchmarks['circular_buffer'] = (benchmark_circular_buffer, {'nrof_steps': nrof_micro_steps})
+    for method in ['string', 'preallocated', 'circular_buffer', 'buffer_helpers']:
+        benchmarks['soft_value_conversion_%s'%(method)] = (benchmark_soft_value_conversion, {'nrof_steps': nrof_micro_steps, 'method': method})
+
+    return benchmarks
+
+def run_benchmark(function, kwargs):
+    steps_per_second = function(**kwargs)
+
+    return {'steps_per_second': steps_per_second, 'peak_rss_mb': get_peak_rss_mb()}
+
+''' Run the benchmarks, each in a fresh worker process. Returns a dict
+    mapping the benchmark name to its result.
+'''
+def run_benchmarks(benchmarks):
+    mp_context = multiprocessing.get_context('spawn')
+
+    results = {}
+    for name, (function, kwargs) in benchmarks.items():
+        with ProcessPoolExecutor(max_workers=1, mp_context=mp_context) as executor:
+            result = executor.submit(run_benchmark, function, kwargs).result()
+
+        results[name] = result
+        print('%-45s %12.1f steps/s %10.1f MB'%(name, result['steps_per_second'], result['peak_rss_mb']))
+
+    return results
+
+''' Compare the results with the baseline. Returns the names of the
+    benchmarks whose steps/sec dropped by more than the relative tolerance.
+'''
+def compare_with_baseline(results, baseline, tolerance):
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+
+        ratio = result['steps_per_second'] / baseline[name]['steps_per_second']
+        regressed = ratio < 1.0 - tolerance
+        if regressed:
+            regressions.append(name)
+
+        print('%-45s %6.2fx baseline%s'%(name, ratio, ', REGRESSION' if regressed else ''))
+
+    return regressions
+
+''' Compare the results with the baseline report saved at baseline_filepath,
+    if there is one. Returns the exit status: 1 if a benchmark regressed,
+    otherwise 0.
+'''
+def check_baseline(results, baseline_filepath, tolerance):
+    if not os.path.exists(baseline_filepath):
+        print('No baseline at %s, skipping the comparison'%(baseline_filepath))
+        return 0
+
+    with open(baseline_filepath) as f:
+        baseline = json.load(f)
+    print('Comparing with the baseline recorded on %s (%s, %s CPUs) at %s'%(baseline.get('platform'), baseline.get('processor') or baseline.get('machine'), baseline.get('nrof_cpus'), baseline.get('timestamp')))
+
+    regressions = compare_with_baseline(results, baseline['results'], tolerance)
+    if regressions:
+        print('%d benchmark(s) regressed by more than %d%%'%(len(regressions), 100 * tolerance))
+        return 1
+
+    return 0
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks of the radio scheduler simulator')
+    parser.add_argument('--schedulers', nargs='+', default=SCHEDULER_TYPES)
+    parser.add_argument('--nrof-ues', nargs='+', type=int, default=NROF_UES)
+    parser.add_argument('--phy-modes', nargs='+', default=PHY_MODES)
+    parser.add_argument('--nrof-transmit-steps', type=int, default=200)
+    parser.add_argument('--nrof-micro-steps', type=int, default=1000)
+    parser.add_argument('--filter', default='', help='only run benchmarks whose name contains this string')
+    parser.add_argument('--output', default=os.path.join(BENCHMARK_DIR, 'results.json'))
+    parser.add_argument('--baseline', default=os.path.join(BENCHMARK_DIR, 'baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='store the results as the baseline')
+    parser.add_argument('--tolerance', type=float, default=0.1, help='relative slowdown reported as a regression')
+    args = parser.parse_args()
+
+    benchmarks = collect_benchmarks(args.schedulers, args.nrof_ues, args.phy_modes, args.nrof_transmit_steps, args.nrof_micro_steps)
+    benchmarks = {name: benchmark for name, benchmark in benchmarks.items() if args.filter in name}
+
+    results = run_benchmarks(benchmarks)
+
+    report = {'machine': platform.machine(),
+              'processor': platform.processor(),
+              'nrof_cpus': os.cpu_count(),
+              'platform': platform.platform(),
+              'python': platform.python_version(),
+              'numpy': np.__version__,
+              'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'results': results}
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print('Saved results to %s'%(args.output))
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print('Saved baseline to %s'%(args.baseline))
+        return 0
+
+    return check_baseline(results, args.baseline, args.tolerance)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+''' Statistical validation of the NumPy TDL channel backend against the
+    py_itpp TDL_Channel, or against the theoretical statistics.
+
+    Generates the frequency responses of nrof_ues independent channels over
+    nrof_subframes subframes, and compares the mean power, the CDF of the
+    power (Rayleigh: 1 - exp(-x)), the correlation over subframe lags (Jakes:
+    J0(2 pi fd t)), the correlation over subcarrier separations and the power
+    of each tap of the discretized profile. The script exits with status 1
+    when a statistic differs by more than the tolerance. The comparison is
+    saved as JSON with --output.
+
+    Usage:
+        python benchmarks/validate_channel_backend.py
+        python benchmarks/validate_channel_backend.py --reference theory --output benchmarks/channel_validation_theory.json
+        python benchmarks/validate_channel_backend.py --profile ITU_Pedestrian_A --speed 3.0
+'''
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def generate_py_itpp_responses(channel_profile_name, relative_speed, nrof_ues, nrof_subframes, seed):
+    import py_itpp as pyp
+    from gym_radio_scheduler.envs.src import setup_fading_channel, calculate_channel_frequency_response
+
+    pyp.RNG_reset(seed)
+    channel_spec = pyp.comm.Channel_Specification(getattr(pyp.comm.CHANNEL_PROFILE, channel_profile_name))
+    channels = [setup_fading_channel(channel_spec, relative_speed) for _ in range(nrof_ues)]
+
+    return np.array([[calculate_channel_frequency_response(channel, subframe_index).to_numpy_ndarray() for subframe_index in range(nrof_subframes)] for channel in channels])
+
+def generate_numpy_responses(channel_profile_name, relative_speed, nrof_ues, nrof_subframes, seed):
+    from gym_radio_scheduler.envs.src import NumpyTdlChannel
+
+    channel = NumpyTdlChannel(nrof_ues, channel_profile_name, relative_speed, np.random.default_rng(seed))
+
+    return channel.calculate_frequency_responses(0, nrof_subframes)
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate the NumPy channel backend against py_itpp')
+    parser.add_argument('--profile', default='ITU_Vehicular_B', help='ITU channel profile')
+    parser.add_argument('--speed', type=float, default=0.83, help='relative speed in m/s')
+    parser.add_argument('--reference', default='py_itpp', choices=['py_itpp', 'theory'], help='statistics compared with')
+    parser.add_argument('--nrof-ues', type=int, default=200, help='number of independent channels')
+    parser.add_argument('--nrof-subframes', type=int, default=1000, help='subframes per channel')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='allowed absolute difference of each statistic')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='save the comparison as JSON')
+    args = parser.parse_args()
+
+    from gym_radio_scheduler.envs.src import calculate_channel_statistics, calculate_theoretical_channel_statistics, discretize_channel_profile
+
+    tap_delays, _ = discretize_channel_profile(args.profile)
+
+    if args.reference == 'py_itpp':
+        reference = calculate_channel_statistics(generate_py_itpp_responses(args.profile, args.speed, args.nrof_ues, args.nrof_subframes, args.seed), tap_delays=tap_delays)
+    else:
+        reference = calculate_theoretical_channel_statistics(args.profile, args.speed)
+    candidate = calculate_channel_statistics(generate_numpy_responses(args.profile, args.speed, args.nrof_ues, args.nrof_subframes, args.seed), tap_delays=tap_delays)
+
+    comparison = []
+    for name in sorted(reference):
+        for reference_value, candidate_value in zip(np.atleast_1d(reference[name]), np.atleast_1d(candidate[name])):
+            # The mean power is compared relative to the reference
+            difference = abs(candidate_value - reference_value)
+            if name == 'mean_power':
+                difference /= reference_value
+
+            status = 'ok' if difference <= args.tolerance else 'MISMATCH'
+            comparison.append({'statistic': name, 'reference': float(reference_value), 'numpy': float(candidate_value), 'status': status})
+            print('%-22s %-7s %8.4f  numpy %8.4f  %s'%(name, args.reference, reference_value, candidate_value, status))
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'arguments': vars(args), 'comparison': comparison}, f, indent=2, sort_keys=True)
+
+    nrof_failures = sum(entry['status'] != 'ok' for entry in comparison)
+    sys.exit(1 if nrof_failures > 0 else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+''' Comparison of the abstracted PHY mode with the bit-level PHY mode.
+
+    Runs RadioMultilinkScheduler in both PHY modes for the same scheduler,
+    number of UEs and seeds, records every transmission, and reports per
+    mode the block error rate at each HARQ transmission index, the residual
+    block error rate after the last transmission, the average number of
+    transmissions per transport block and the throughput per subframe,
+    with the gap of the abstracted mode to the bit-level mode.
+
+    With several --eesm-beta values, the abstracted mode is run once per
+    value (the same beta for all CQIs), to calibrate it against the
+    bit-level chain. The script exits with status 1 when the throughput gap
+    of the best beta exceeds the tolerance.
+
+    Usage:
+        python benchmarks/validate_link_abstraction.py
+        python benchmarks/validate_link_abstraction.py --nrof-subframes 20000 --eesm-beta 0.5 1 2 4 --output benchmarks/link_abstraction.json
+'''
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+''' Run the scheduler for nrof_subframes subframes per seed and return the
+    recorded transmissions, concatenated over the seeds.
+'''
+def record_transmissions(phy_mode, scheduler_type, nrof_ues, nrof_subframes, seeds, eesm_beta=None):
+    from gym_radio_scheduler.envs.radio_multilink_scheduler import RadioMultilinkScheduler
+    from gym_radio_scheduler.envs.src import load_recorded_results
+    from gym_radio_scheduler.envs.src.CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+
+    columns = []
+    for seed in seeds:
+        result_dir = tempfile.mkdtemp()
+        try:
+            sched = RadioMultilinkScheduler(nrof_ues=nrof_ues, scheduler_type=scheduler_type, phy_mode=phy_mode, seed=seed, result_dir=result_dir)
+            if eesm_beta is not None:
+                sched.eesm_beta = np.full(len(CONFIG.CQI_INDEX__MODORDER_RATE), eesm_beta)
+
+            for _ in range(nrof_subframes):
+                sched.transmit()
+            sched.close()
+
+            recorded_columns, _ = load_recorded_results(result_dir)
+            columns.append({name: np.array(column) for name, column in recorded_columns.items()})
+        finally:
+            shutil.rmtree(result_dir)
+
+    return {name: np.concatenate([seed_columns[name] for seed_columns in columns]) for name in columns[0]}
+
+''' HARQ and throughput statistics of the recorded transmissions.
+'''
+def calculate_link_statistics(columns, nrof_max_harq_transmissions):
+    transmitting = columns['transport_block_size'] > 0
+    failed = columns['throughput'] == 0
+    harq_transmission_index = columns['harq_transmission_index']
+
+    block_error_rate = []
+    for index in range(nrof_max_harq_transmissions):
+        transmissions = transmitting & (harq_transmission_index == index)
+        block_error_rate.append(float(np.mean(failed[transmissions])) if np.any(transmissions) else float('nan'))
+
+    nrof_blocks = np.count_nonzero(transmitting & (harq_transmission_index == 0))
+    nrof_decoded_blocks = np.count_nonzero(transmitting & ~failed)
+    nrof_lost_blocks = np.count_nonzero(transmitting & failed & (harq_transmission_index == nrof_max_harq_transmissions - 1))
+
+    return {'block_error_rate': block_error_rate,
+            'residual_block_error_rate': nrof_lost_blocks / max(nrof_blocks, 1),
+            'transmissions_per_block': np.count_nonzero(transmitting) / max(nrof_decoded_blocks + nrof_lost_blocks, 1),
+            'throughput': float(np.mean(columns['throughput']))}
+
+def print_statistics(label, statistics, reference=None):
+    print('%-22s throughput %9.1f bits/subframe%s'%(label, statistics['throughput'], '' if reference is None else ' (%+.1f%%)'%(100.0 * (statistics['throughput'] / reference['throughput'] - 1.0))))
+    print('%-22s BLER per transmission %s, residual %.4f, %.3f transmissions per block'%('', ' '.join('%.4f'%(bler) for bler in statistics['block_error_rate']), statistics['residual_block_error_rate'], statistics['transmissions_per_block']))
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the abstracted PHY mode with the bit-level PHY mode')
+    parser.add_argument('--scheduler-type', default='RoundRobin')
+    parser.add_argument('--nrof-ues', type=int, default=10)
+    parser.add_argument('--nrof-subframes', type=int, default=5000, help='subframes per seed')
+    parser.add_argument('--nrof-seeds', type=int, default=4)
+    parser.add_argument('--eesm-beta', nargs='+', type=float, default=[None], help='EESM beta for all CQIs in the abstracted mode')
+    parser.add_argument('--tolerance', type=float, default=0.05, help='allowed relative throughput gap')
+    parser.add_argument('--output', help='save the statistics as JSON')
+    args = parser.parse_args()
+
+    from gym_radio_scheduler.envs.radio_multilink_scheduler import RadioMultilinkScheduler
+
+    nrof_max_harq_transmissions = RadioMultilinkScheduler.nrof_max_harq_transmissions
+    seeds = list(range(42, 42 + args.nrof_seeds))
+
+    reference = calculate_link_statistics(record_transmissions('bit_level', args.scheduler_type, args.nrof_ues, args.nrof_subframes, seeds), nrof_max_harq_transmissions)
+    print_statistics('bit_level', reference)
+
+    results = {'bit_level': reference, 'abstracted': {}}
+    for eesm_beta in args.eesm_beta:
+        statistics = calculate_link_statistics(record_transmissions('abstracted', args.scheduler_type, args.nrof_ues, args.nrof_subframes, seeds, eesm_beta), nrof_max_harq_transmissions)
+        statistics['throughput_gap'] = statistics['throughput'] / reference['throughput'] - 1.0
+
+        label = 'abstracted' if eesm_beta is None else 'abstracted beta %g'%(eesm_beta)
+        print_statistics(label, statistics, reference)
+        results['abstracted'][str(eesm_beta)] = statistics
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'arguments': vars(args), 'results': results}, f, indent=2, sort_keys=True)
+
+    best_gap = min(abs(statistics['throughput_gap']) for statistics in results['abstracted'].values())
+    sys.exit(1 if best_gap > args.tolerance else 0)
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,20 @@
-from gym_radio_scheduler.envs.radio_scheduler_env import RadioSchedulerEnv
+import importlib
+
+# The modules are imported on first access to one of their names, so that importing the package
+# stays cheap, and the env client can be used without loading the simulator and py_itpp
+LAZY_MODULE_NAMES = {'RadioSchedulerEnv': 'gym_radio_scheduler.envs.radio_scheduler_env',
+                     'RadioSchedulerVecEnv': 'gym_radio_scheduler.envs.radio_scheduler_vec_env',
+                     'SharedMemoryVecEnv': 'gym_radio_scheduler.envs.shared_memory_vec_env',
+                     'run_parameter_sweep': 'gym_radio_scheduler.envs.sweep_runner',
+                     'register_scheduler_policy': 'gym_radio_scheduler.envs.src.scheduler_policies',
+                     'get_scheduler_policy': 'gym_radio_scheduler.envs.src.scheduler_policies',
+                     'RadioSchedulerEnvServer': 'gym_radio_scheduler.envs.env_server',
+                     'run_env_server': 'gym_radio_scheduler.envs.env_server',
+                     'RadioSchedulerEnvClient': 'gym_radio_scheduler.envs.env_client',
+                     'RemoteRadioSchedulerEnv': 'gym_radio_scheduler.envs.env_client'}
+
+def __getattr__(name):
+    if name in LAZY_MODULE_NAMES:
+        return getattr(importlib.import_module(LAZY_MODULE_NAMES[name]), name)
+
+    raise AttributeError('module %s has no attribute %s'%(__name__, name))
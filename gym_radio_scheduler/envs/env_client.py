@@ -0,0 +1,127 @@
+import collections
+import socket
+
+import gym
+import numpy as np
+from gym import spaces
+
+from .env_protocol import *
+
+class RadioSchedulerEnvClient():
+    """
+       Connection to a RadioSchedulerEnvServer at address, the path of a Unix
+       domain socket or a (host, port) tuple for TCP. Only NumPy and the
+       socket are used, so the client does not load py_itpp or the simulator.
+
+       step() and reset() act on a batch of envs of the server. With
+       step_async() and step_wait(), several requests can be in flight; the
+       server pushes back when too many are pending.
+    """
+    def __init__(self, address, timeout=None):
+        if isinstance(address, str):
+            self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.socket.settimeout(timeout)
+            self.socket.connect(address)
+        else:
+            self.socket = socket.create_connection(address, timeout)
+            self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        self.pending_requests = collections.deque() # (command, number of envs) per request in flight
+
+        self._send(COMMAND_SPEC)
+        self.nrof_envs, self.observation_low, self.observation_high = decode_spec_response(self._receive())
+        self.observation_shape = self.observation_low.shape
+
+    def _receive_exactly(self, nrof_bytes):
+        buffer = bytearray(nrof_bytes)
+        view = memoryview(buffer)
+        while view:
+            nrof_received_bytes = self.socket.recv_into(view)
+            if nrof_received_bytes == 0:
+                raise ConnectionError('Connection closed by the env server')
+            view = view[nrof_received_bytes:]
+
+        return buffer
+
+    def _send(self, command, env_indices=(), actions=None):
+        self.socket.sendall(encode_request(command, env_indices, actions))
+        self.pending_requests.append((command, len(env_indices)))
+
+    def _receive(self):
+        self.pending_requests.popleft()
+
+        status, payload_size = RESPONSE_HEADER.unpack(self._receive_exactly(RESPONSE_HEADER.size))
+        payload = self._receive_exactly(payload_size)
+
+        if status != STATUS_OK:
+            raise RuntimeError('Env server error: %s'%(payload.decode('utf-8')))
+
+        return payload
+
+    ''' Reset the given envs and return their observations, with shape
+        (len(env_indices), nrof_ues, nrof_observation_fields).
+    '''
+    def reset(self, env_indices):
+        if self.pending_requests:
+            raise RuntimeError('Reset with %d steps in flight'%(len(self.pending_requests)))
+
+        self._send(COMMAND_RESET, env_indices)
+
+        return np.frombuffer(self._receive(), dtype=OBSERVATION_DTYPE).reshape((len(env_indices),) + self.observation_shape)
+
+    ''' Send a step of the given envs, with one action per env (-1 for the
+        scheduler of the server), without waiting for the result.
+    '''
+    def step_async(self, env_indices, actions):
+        self._send(COMMAND_STEP, env_indices, actions)
+
+    ''' Returns the result of the oldest step in flight: (observations,
+        rewards, dones, infos), with arrays over the envs of the step and infos
+        a dict of arrays with the scheduled UEs and their CQIs.
+    '''
+    def step_wait(self):
+        _, nrof_envs = self.pending_requests[0]
+
+        observations, rewards, dones, scheduled_ue_index, cqi = decode_step_response(self._receive(), nrof_envs, self.observation_shape)
+
+        return (observations, rewards, dones, {'scheduled_ue_index': scheduled_ue_index, 'cqi': cqi})
+
+    def step(self, env_indices, actions):
+        self.step_async(env_indices, actions)
+
+        return self.step_wait()
+
+    def close(self):
+        self.socket.close()
+
+class RemoteRadioSchedulerEnv(gym.Env):
+    """
+       The gym interface of RadioSchedulerEnv for env env_index of a
+       RadioSchedulerEnvServer at address.
+    """
+    def __init__(self, address, env_index=0, timeout=None):
+        self.client = RadioSchedulerEnvClient(address, timeout)
+        self.env_indices = [env_index]
+
+        self.action_space = spaces.Discrete(self.observation_shape[0])
+        self.observation_space = spaces.Box(low=self.client.observation_low, high=self.client.observation_high, dtype=np.float32)
+
+    @property
+    def observation_shape(self):
+        return self.client.observation_shape
+
+    def step(self, action=-1):
+        observations, rewards, dones, infos = self.client.step(self.env_indices, [action])
+
+        info = {'scheduled_ue_index': int(infos['scheduled_ue_index'][0]), 'cqi': int(infos['cqi'][0])}
+
+        return (observations[0], float(rewards[0]), bool(dones[0]), info)
+
+    def reset(self):
+        return self.client.reset(self.env_indices)[0]
+
+    def render(self, mode='random', close=False):
+        pass
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,108 @@
+import struct
+import numpy as np
+
+# Binary protocol between the env server and its clients. Every request is a REQUEST_HEADER
+# (command, number of envs) followed by the int32 env indices and, for STEP, the int32 actions.
+# Every response is a RESPONSE_HEADER (status, payload size in bytes) followed by the payload.
+# Only fixed-size NumPy arrays are sent, so nothing is pickled.
+REQUEST_HEADER = struct.Struct('<BI')
+RESPONSE_HEADER = struct.Struct('<BI')
+
+COMMAND_SPEC = 0  # Returns SPEC_HEADER and the observation bounds
+COMMAND_RESET = 1 # Returns the observations
+COMMAND_STEP = 2  # Returns the observations, rewards, dones, scheduled UEs and CQIs
+
+STATUS_OK = 0
+STATUS_ERROR = 1  # The payload is an UTF-8 error message
+
+# Number of envs, number of UEs, number of observation fields
+SPEC_HEADER = struct.Struct('<III')
+
+OBSERVATION_DTYPE = np.dtype('<f4')
+INDEX_DTYPE = np.dtype('<i4')
+REWARD_DTYPE = np.dtype('<f8')
+
+def get_request_payload_size(command, nrof_envs):
+    if command == COMMAND_SPEC:
+        return 0
+    elif command == COMMAND_RESET:
+        return nrof_envs * INDEX_DTYPE.itemsize
+    elif command == COMMAND_STEP:
+        return 2 * nrof_envs * INDEX_DTYPE.itemsize
+    else:
+        raise ValueError('Unsupported command %d'%(command))
+
+def encode_request(command, env_indices=(), actions=None):
+    env_indices = np.asarray(env_indices, dtype=INDEX_DTYPE)
+
+    parts = [REQUEST_HEADER.pack(command, len(env_indices)), env_indices.tobytes()]
+    if command == COMMAND_STEP:
+        parts.append(np.asarray(actions, dtype=INDEX_DTYPE).tobytes())
+
+    return b''.join(parts)
+
+''' Returns (env_indices, actions) from the payload of a request, with actions None unless it is a STEP.
+'''
+def decode_request_payload(command, nrof_envs, payload):
+    env_indices = np.frombuffer(payload, dtype=INDEX_DTYPE, count=nrof_envs)
+
+    actions = None
+    if command == COMMAND_STEP:
+        actions = np.frombuffer(payload, dtype=INDEX_DTYPE, count=nrof_envs, offset=nrof_envs * INDEX_DTYPE.itemsize)
+
+    return (env_indices, actions)
+
+def encode_response(*arrays, status=STATUS_OK):
+    payload = b''.join(array.tobytes() for array in arrays)
+
+    return RESPONSE_HEADER.pack(status, len(payload)) + payload
+
+def encode_error_response(message):
+    payload = message.encode('utf-8')
+
+    return RESPONSE_HEADER.pack(STATUS_ERROR, len(payload)) + payload
+
+def encode_spec_response(nrof_envs, observation_low, observation_high):
+    nrof_ues, nrof_observation_fields = observation_low.shape
+    spec = np.frombuffer(SPEC_HEADER.pack(nrof_envs, nrof_ues, nrof_observation_fields), dtype=np.uint8)
+
+    return encode_response(spec, observation_low.astype(OBSERVATION_DTYPE), observation_high.astype(OBSERVATION_DTYPE))
+
+''' Returns (nrof_envs, observation_low, observation_high).
+'''
+def decode_spec_response(payload):
+    nrof_envs, nrof_ues, nrof_observation_fields = SPEC_HEADER.unpack_from(payload)
+    observation_shape = (nrof_ues, nrof_observation_fields)
+
+    bounds = np.frombuffer(payload, dtype=OBSERVATION_DTYPE, offset=SPEC_HEADER.size).reshape((2,) + observation_shape)
+
+    return (nrof_envs, bounds[0], bounds[1])
+
+def encode_step_response(observations, rewards, dones, scheduled_ue_index, cqi):
+    return encode_response(np.asarray(rewards, dtype=REWARD_DTYPE),
+                           np.asarray(observations, dtype=OBSERVATION_DTYPE),
+                           np.asarray(scheduled_ue_index, dtype=INDEX_DTYPE),
+                           np.asarray(cqi, dtype=INDEX_DTYPE),
+                           np.asarray(dones, dtype=np.uint8))
+
+''' Returns (observations, rewards, dones, scheduled_ue_index, cqi) as read-only
+    views on the payload, for nrof_envs envs with the given observation shape.
+'''
+def decode_step_response(payload, nrof_envs, observation_shape):
+    offset = 0
+
+    rewards = np.frombuffer(payload, dtype=REWARD_DTYPE, count=nrof_envs, offset=offset)
+    offset += rewards.nbytes
+
+    observations = np.frombuffer(payload, dtype=OBSERVATION_DTYPE, count=nrof_envs * int(np.prod(observation_shape)), offset=offset).reshape((nrof_envs,) + tuple(observation_shape))
+    offset += observations.nbytes
+
+    scheduled_ue_index = np.frombuffer(payload, dtype=INDEX_DTYPE, count=nrof_envs, offset=offset)
+    offset += scheduled_ue_index.nbytes
+
+    cqi = np.frombuffer(payload, dtype=INDEX_DTYPE, count=nrof_envs, offset=offset)
+    offset += cqi.nbytes
+
+    dones = np.frombuffer(payload, dtype=np.uint8, count=nrof_envs, offset=offset).astype(bool)
+
+    return (observations, rewards, dones, scheduled_ue_index, cqi)
@@ -0,0 +1,217 @@
+import argparse
+import asyncio
+import os
+import stat
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .env_protocol import *
+from .radio_scheduler_env import RadioSchedulerEnv
+
+class RadioSchedulerEnvServer():
+    """
+       Hosts nrof_envs RadioSchedulerEnv instances behind a Unix domain or
+       TCP socket, so that actor processes can step them without running the
+       simulator themselves. The clients send batched step and reset requests
+       for any of the envs, see RadioSchedulerEnvClient.
+
+       The simulation runs in a single worker thread, so every env is stepped
+       by one thread at a time, while the event loop keeps receiving and
+       sending. Requests are queued up to max_queued_requests in total and
+       max_pending_requests per connection; beyond that the server stops
+       reading from the connections, which pushes back on the clients.
+
+       Env k is seeded with seed k spawned from seed, and env_kwargs are
+       passed to every RadioSchedulerEnv.
+    """
+    def __init__(self, nrof_envs, seed=42, max_queued_requests=64, max_pending_requests=8, **env_kwargs):
+        seed_sequences = np.random.SeedSequence(seed).spawn(nrof_envs)
+        seeds = [int(seed_sequence.generate_state(1, dtype=np.uint32)[0]) for seed_sequence in seed_sequences]
+
+        self.envs = [RadioSchedulerEnv(seed=env_seed, **env_kwargs) for env_seed in seeds]
+        self.nrof_envs = nrof_envs
+        self.max_queued_requests = max_queued_requests
+        self.max_pending_requests = max_pending_requests
+
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.servers = []
+        self.worker_task = None
+
+        env = self.envs[0]
+        self.spec_response = encode_spec_response(nrof_envs, env.observation_space.low, env.observation_space.high)
+
+    def _reset(self, env_indices):
+        observations = np.empty((len(env_indices),) + self.envs[0].observation_space.shape, dtype=OBSERVATION_DTYPE)
+        for i, env_index in enumerate(env_indices):
+            observations[i] = self.envs[env_index].reset()
+
+        return encode_response(observations)
+
+    def _step(self, env_indices, actions):
+        nrof_envs = len(env_indices)
+        observations = np.empty((nrof_envs,) + self.envs[0].observation_space.shape, dtype=OBSERVATION_DTYPE)
+        rewards = np.empty(nrof_envs)
+        dones = np.empty(nrof_envs, dtype=bool)
+        scheduled_ue_index = np.empty(nrof_envs, dtype=INDEX_DTYPE)
+        cqi = np.empty(nrof_envs, dtype=INDEX_DTYPE)
+
+        for i, (env_index, action) in enumerate(zip(env_indices, actions)):
+            # The observation is a view overwritten by the next step, so it is copied here
+            observations[i], rewards[i], dones[i], info = self.envs[env_index].step(int(action))
+            scheduled_ue_index[i] = info['scheduled_ue_index']
+            cqi[i] = info['cqi']
+
+        return encode_step_response(observations, rewards, dones, scheduled_ue_index, cqi)
+
+    # Runs in the worker thread
+    def _execute(self, command, nrof_envs, payload):
+        try:
+            if command == COMMAND_SPEC:
+                return self.spec_response
+
+            env_indices, actions = decode_request_payload(command, nrof_envs, payload)
+            if np.any((env_indices < 0) | (env_indices >= self.nrof_envs)):
+                raise ValueError('Env index out of range [0, %d)'%(self.nrof_envs))
+
+            if command == COMMAND_RESET:
+                return self._reset(env_indices)
+            else:
+                return self._step(env_indices, actions)
+        except Exception as e:
+            return encode_error_response('%s: %s'%(type(e).__name__, e))
+
+    async def _process_requests(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            command, nrof_envs, payload, response = await self.request_queue.get()
+
+            result = await loop.run_in_executor(self.executor, self._execute, command, nrof_envs, payload)
+            if not response.cancelled():
+                response.set_result(result)
+
+    async def _write_responses(self, pending_responses, writer):
+        while True:
+            response = await pending_responses.get()
+            if response is None:
+                return
+
+            writer.write(await response)
+            await writer.drain()
+
+    async def _handle_connection(self, reader, writer):
+        loop = asyncio.get_running_loop()
+
+        # Responses are sent in the order of the requests, which the clients may pipeline
+        pending_responses = asyncio.Queue(self.max_pending_requests)
+        writer_task = asyncio.ensure_future(self._write_responses(pending_responses, writer))
+        try:
+            while True:
+                command, nrof_envs = REQUEST_HEADER.unpack(await reader.readexactly(REQUEST_HEADER.size))
+
+                try:
+                    # Checked before the payload is read, as its size follows from nrof_envs
+                    if nrof_envs > self.nrof_envs:
+                        raise ValueError('Number of envs %d exceeds %d'%(nrof_envs, self.nrof_envs))
+                    payload_size = get_request_payload_size(command, nrof_envs)
+                except ValueError as e:
+                    # The request cannot be framed, so the connection cannot continue after the error
+                    response = loop.create_future()
+                    response.set_result(encode_error_response(str(e)))
+                    await pending_responses.put(response)
+                    break
+
+                payload = await reader.readexactly(payload_size)
+
+                response = loop.create_future()
+                await pending_responses.put(response)
+                await self.request_queue.put((command, nrof_envs, payload, response))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass # The client closed the connection
+        finally:
+            await pending_responses.put(None)
+            try:
+                await writer_task
+            except ConnectionError:
+                pass
+            writer.close()
+
+    ''' Start listening on address, the path of a Unix domain socket or a
+        (host, port) tuple for TCP. Port 0 picks a free port; the address in
+        use is returned. A server can listen on several addresses.
+    '''
+    async def start(self, address):
+        if self.worker_task is None:
+            self.request_queue = asyncio.Queue(self.max_queued_requests)
+            self.worker_task = asyncio.ensure_future(self._process_requests())
+
+        if isinstance(address, str):
+            # Only a stale socket, e.g. of a server that was killed, is replaced
+            if os.path.lexists(address):
+                if not stat.S_ISSOCK(os.lstat(address).st_mode):
+                    raise ValueError('%s exists and is not a socket'%(address))
+                os.remove(address)
+            server = await asyncio.start_unix_server(self._handle_connection, path=address)
+            self.servers.append(server)
+
+            return address
+        else:
+            host, port = address
+            server = await asyncio.start_server(self._handle_connection, host, port)
+            self.servers.append(server)
+
+            return server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self, address):
+        await self.start(address)
+        await self.servers[-1].serve_forever()
+
+    async def stop(self):
+        for server in self.servers:
+            server.close()
+            await server.wait_closed()
+        self.servers = []
+
+        if self.worker_task is not None:
+            self.worker_task.cancel()
+            try:
+                await self.worker_task
+            except asyncio.CancelledError:
+                pass
+            self.worker_task = None
+
+        # The step being executed is finished off the event loop, which keeps serving other tasks meanwhile
+        await asyncio.get_running_loop().run_in_executor(None, self._close_envs)
+
+    def _close_envs(self):
+        self.executor.shutdown(wait=True)
+
+        for env in self.envs:
+            env.close()
+
+''' Run an env server until interrupted.
+'''
+def run_env_server(address, nrof_envs, seed=42, **env_kwargs):
+    server = RadioSchedulerEnvServer(nrof_envs, seed, **env_kwargs)
+    try:
+        asyncio.run(server.serve_forever(address))
+    except KeyboardInterrupt:
+        pass
+
+def main():
+    parser = argparse.ArgumentParser(description='Radio scheduler env server')
+    parser.add_argument('--unix', help='path of the Unix domain socket')
+    parser.add_argument('--host', default='127.0.0.1', help='TCP host, if no Unix domain socket is given')
+    parser.add_argument('--port', type=int, default=5678, help='TCP port')
+    parser.add_argument('--nrof-envs', type=int, default=1)
+    parser.add_argument('--nrof-ues', type=int, default=30)
+    parser.add_argument('--scheduler-type', default='Random')
+    parser.add_argument('--phy-mode', default='bit_level')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    address = args.unix if args.unix is not None else (args.host, args.port)
+    run_env_server(address, args.nrof_envs, args.seed, nrof_ues=args.nrof_ues, scheduler_type=args.scheduler_type, phy_mode=args.phy_mode)
+
+if __name__ == '__main__':
+    main()
@@ -1,6 +1,10 @@
+import copy
+import json
 import os
+import numpy as np
 import py_itpp as pyp
 from .src import *
+from .src.CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
 
 class RadioMultilinkScheduler():
     nrof_bits_in_packet = 1000000 # bits
@@ -8,183 +12,471 @@ class RadioMultilinkScheduler():
     relative_speed = 0.83 # m/s
     bler_target = 0.1
     channel_profile = pyp.comm.CHANNEL_PROFILE.ITU_Vehicular_B
+    eesm_beta = None # EESM calibration factor per CQI, 1.0 for all CQIs if None
     
     def __init__(self, 
                  nrof_ues, 
                  scheduler_type, 
                  prop_fair_window_size=50, 
                  cqi_reporting_interval=1,
-                 seed=42):
+                 seed=42,
+                 channel_trace_cache_dir=None,
+                 channel_trace_block_size=1000,
+                 lazy_channel_evaluation=False,
+                 phy_mode='bit_level',
+                 baseband_engine='py_itpp',
+                 channel_backend='py_itpp',
+                 channel_trace_path=None,
+                 cqi_trace_path=None,
+                 end_of_trace='loop',
+                 channel_update_interval=1,
+                 channel_interpolation='linear',
+                 channel_accuracy=1e-3,
+                 verbosity=0,
+                 event_trace_size=4096,
+                 result_dir=None,
+                 result_chunk_size=4096,
+                 resume_results=False):
 
         self.nrof_ues = nrof_ues
         self.scheduler_type = scheduler_type
+        self.scheduler_policy = get_scheduler_policy(scheduler_type) # Name of a registered policy, or a policy
         self.prop_fair_window_size = prop_fair_window_size
         self.cqi_reporting_interval = cqi_reporting_interval
+        self.lazy_channel_evaluation = lazy_channel_evaluation
+        self.phy_mode = phy_mode # ['bit_level', 'abstracted']
+        self.baseband_engine = baseband_engine # ['py_itpp', 'numpy'], used in the bit-level PHY mode
+        self.channel_backend = channel_backend # ['py_itpp', 'numpy'], 'numpy' is experimental, see below
         self.subframe_index = 0
+        
+        # Per-stage timers and trace of the scheduling decisions, disabled with verbosity 0
+        self.instrumentation = Instrumentation(verbosity, event_trace_size)
+
+        # Simulation parameters, stored with the recorded results
+        self.simulation_parameters = {'nrof_ues': nrof_ues,
+                                      'scheduler_type': getattr(scheduler_type, '__name__', scheduler_type),
+                                      'prop_fair_window_size': prop_fair_window_size,
+                                      'cqi_reporting_interval': cqi_reporting_interval,
+                                      'seed': seed,
+                                      'phy_mode': phy_mode,
+                                      'baseband_engine': baseband_engine,
+                                      'channel_backend': channel_backend}
          
         dirpath = os.path.dirname(os.path.abspath(__file__))
         awgn_datafile = dirpath + '/sim_data/awgn_custom_config_datafile.npy'
-        awgn_data = load_from_file(awgn_datafile, encoding='latin1')
-        self.snr_at_bler_target = determine_snr_at_bler_target(awgn_data, self.bler_target)
-
-        # Setup variables used to maintain state during the simulation
-        self.state = self._setup_state_variables(nrof_ues)
+        self.awgn_data, self.snr_at_bler_target = load_awgn_table(awgn_datafile, self.bler_target) # Shared by all simulators in the process
 
         # Set the random number generator seed for repeatability
         pyp.RNG_reset(seed)
+        
+        # Random numbers used by the scheduler policies, for the HARQ outcomes in the abstracted 
+        # PHY mode, and for the noise of the NumPy baseband engine
+        self.rng = np.random.default_rng(seed)
+        
+        # Codec, modulator and interleaver objects reused across subframes in the bit-level PHY mode
+        self.phy_context = PhyContext()
+        self.ofdm_engine = OfdmBasebandEngine(self.rng)
+
+        # py_itpp vector reused for the channel coefficients from a channel source, for the py_itpp baseband
+        self.channel_vectors = PyItppVectorCache(pyp.cvec, complex)
+
+        # Setup variables used to maintain state during the simulation
+        self._setup_state_variables(nrof_ues)
+
+        # Full-buffer traffic for each UE, with the packet bits generated on demand
+        self.traffic_source = StreamingTrafficSource(nrof_ues, self.nrof_bits_in_packet, seed, self.state.buffer_occupancy, self.state.stream_position)
 
         # Update the UE-level parameters for each UE
         ue_snr_dB = [pyp.random.I_Uniform_RNG(min=10, max=20).sample() for _ in range(nrof_ues)]
         self.ue_noise_variance = [10 ** (-snr * 0.1) for snr in ue_snr_dB]
 
+        # Source of the channel coefficients of all UEs per subframe as a NumPy array, if not 
+        # generated by the per-UE py_itpp channels
+        self.channel = None
+        self.channel_source = None
+
+        # Replayed traces, which can end the simulation
+        self.trace_sources = []
+
         # Setup radio channel for each UE
-        channel_spec = pyp.comm.Channel_Specification(self.channel_profile)
-        self.channel = [setup_fading_channel(channel_spec, self.relative_speed) for _ in range(nrof_ues)]
+        if channel_trace_path is not None:
+            from .src.trace_replay import TraceReplay
+
+            # Replay recorded frequency responses instead of generating the channels
+            self.channel_source = TraceReplay(channel_trace_path, channel_trace_block_size, end_of_trace=end_of_trace)
+            if self.channel_source.shape != (nrof_ues, CONFIG.NROF_TOTAL_SUBCARRIERS):
+                raise ValueError('Mismatched channel trace shape %s for %d UEs'%(self.channel_source.shape, nrof_ues))
+            self.trace_sources.append(self.channel_source)
+        elif channel_backend == 'py_itpp':
+            channel_spec = pyp.comm.Channel_Specification(self.channel_profile)
+            self.channel = [setup_fading_channel(channel_spec, self.relative_speed) for _ in range(nrof_ues)]
+
+            # Initialize the fading channels here, as in the first subframe, so the random stream is 
+            # the same as when they are initialized by the first transmission. After initialization, 
+            # the channels are deterministic functions of the subframe index: they can be read from
+            # precomputed traces and shared by snapshots and forks.
+            for ue_index in range(nrof_ues):
+                calculate_channel_frequency_response(self.channel[ue_index], 0)
+        elif channel_backend == 'numpy':
+            # The channels of all UEs are generated together in blocks of subframes, from their 
+            # own random stream. They are also deterministic functions of the subframe index.
+            # Experimental: the backend matches the theoretical Rayleigh, Jakes and power delay
+            # profile statistics (benchmarks/channel_validation_theory.json), but has not yet
+            # been compared with the py_itpp channels by benchmarks/validate_channel_backend.py.
+            self.channel_source = NumpyTdlChannel(nrof_ues, self.channel_profile, self.relative_speed, np.random.default_rng([seed, 1]))
+        else:
+            raise ValueError('Unsupported channel backend %s'%(channel_backend))
+
+        # Optionally read the channel from precomputed traces
+        self.channel_trace_cache = None
+        if channel_trace_cache_dir is not None:
+            if self.channel is None:
+                raise ValueError('The channel trace cache requires the py_itpp channel backend')
+
+            key = {'seed': seed,
+                   'nrof_ues': nrof_ues,
+                   'channel_profile': str(self.channel_profile),
+                   'relative_speed': self.relative_speed,
+                   'carrier_frequency': CONFIG.CARRIER_FREQUENCY,
+                   'sampling_interval': CONFIG.SAMPLING_INTERVAL,
+                   'subframe_duration': CONFIG.SUBFRAME_DURATION,
+                   'nrof_resource_blocks': CONFIG.NROF_TOTAL_PRBS}
+            from .src.channel_trace_cache import ChannelTraceCache
+
+            self.channel_trace_cache = ChannelTraceCache(channel_trace_cache_dir, self.channel, key, channel_trace_block_size)
+            self.channel_source = self.channel_trace_cache
+
+        # Optionally generate the channels every channel_update_interval subframes only, and interpolate 
+        # in between. With 'auto', the interval is the longest for which the interpolation error at the
+        # Doppler frequency of the UEs is within channel_accuracy.
+        doppler_frequency = calculate_doppler_frequency(self.relative_speed)
+        if channel_update_interval == 'auto':
+            channel_update_interval = determine_channel_update_interval(doppler_frequency, channel_accuracy, channel_interpolation)
+        self.channel_update_interval = channel_update_interval
+        self.simulation_parameters['channel_update_interval'] = channel_update_interval
+        
+        # Mean square error of the interpolated channel coefficients relative to the channel power
+        self.channel_interpolation_error = calculate_interpolation_error(doppler_frequency, channel_update_interval, channel_interpolation)
+        
+        if channel_update_interval > 1:
+            if channel_trace_path is not None or self.channel_trace_cache is not None:
+                raise ValueError('Unsupported channel update interval %d with channel traces'%(channel_update_interval))
+
+            if self.channel is not None:
+                channels = self.channel
+                calculate_frequency_responses = lambda sf_index: np.array([calculate_channel_frequency_response(channel, sf_index).to_numpy_ndarray() for channel in channels])
+            else:
+                numpy_channel = self.channel_source
+                calculate_frequency_responses = lambda sf_index: numpy_channel.calculate_frequency_responses(sf_index, 1)[:, 0]
+            
+            self.channel_source = InterpolatedChannel(calculate_frequency_responses, channel_update_interval, channel_interpolation)
+
+        # Optionally replay the reported CQIs of all UEs from a trace, instead of calculating them from the channels
+        self.cqi_source = None
+        if cqi_trace_path is not None:
+            from .src.trace_replay import TraceReplay
+
+            self.cqi_source = TraceReplay(cqi_trace_path, channel_trace_block_size, end_of_trace=end_of_trace)
+            if self.cqi_source.shape != (nrof_ues,):
+                raise ValueError('Mismatched CQI trace shape %s for %d UEs'%(self.cqi_source.shape, nrof_ues))
+            self.trace_sources.append(self.cqi_source)
+
+        # The channel and CQI sources may hold background threads and memory-mapped files, released by close()
+        self.owns_sources = True
+
+        # Optionally stream the per-subframe results to result_dir. With resume_results, the records already
+        # there are kept and the simulation continues from the subframe after the last one; the channels
+        # are functions of the subframe index, while the per-UE state starts afresh.
+        self.result_recorder = None
+        if result_dir is not None:
+            from .src.result_recorder import StreamingResultRecorder
+
+            self.result_recorder = StreamingResultRecorder(result_dir, result_chunk_size, self.simulation_parameters, resume=resume_results)
+            if self.result_recorder.last_subframe_index is not None:
+                self.subframe_index = self.result_recorder.last_subframe_index + 1
+
+        # The simulator owns its random number stream: the generator state is saved here and
+        # swapped in around every transmission, so several simulators can share a process
+        self.rng_state = pyp.ivec()
+        pyp.RNG_get_state(self.rng_state)
 
     def _setup_state_variables(self, nrof_ues):
-        # Define a dict to store statistics related to scheduler
-        state = {}
-        state['previous_scheduled_subframe'] = [-1 for ue_index in range(nrof_ues)]
-        state['current_data_buffer_index']   = [0 for ue_index in range(nrof_ues)]
-        state['next_data_buffer_index']      = [0 for ue_index in range(nrof_ues)]
-        state['cqi']                         = [0 for ue_index in range(nrof_ues)]
-        state['harq_transmission_index']     = [0 for ue_index in range(nrof_ues)]
-        state['current_harq_buffer_index']   = [0 for ue_index in range(nrof_ues)]
-        state['next_harq_buffer_index']      = [0 for ue_index in range(nrof_ues)]
-        state['scheduling_grant']            = [{} for ue_index in range(nrof_ues)]
+        # Per-UE scheduler state as a structure of arrays in one contiguous block
+        self.state = SchedulerState(nrof_ues, self.prop_fair_window_size)
+
+        # Buffers used by the bit-level HARQ processing
+        if self.phy_mode == 'bit_level':
+            self.harq_state = setup_harq_state_variables(nrof_ues)
+        elif self.phy_mode != 'abstracted':
+            raise ValueError('Unsupported PHY mode %s'%(self.phy_mode))
         
-        state['transmit_data_buffer']        = [pyp.randb(self.nrof_bits_in_packet) for ue_index in range(nrof_ues)] # IP packet bits
-        state['transmit_harq_buffer']        = [pyp.bvec() for ue_index in range(nrof_ues)] # Transmit bits before modulation 
-        state['receive_harq_buffer']         = [pyp.vec() for ue_index in range(nrof_ues)]  # Receive soft value after demodulation
+        # Working buffer for the average rate passed to the scheduler policy
+        self.average_rate = np.zeros(nrof_ues)
         
-        state['scheduled_ue'] = 0 
+    # Update the CQI of all UEs from the channel in the current subframe, without transmitting.
+    # The channels are deterministic per subframe, so the following transmission reports the same CQI.
+    def update_channel_quality_index(self):
+        pyp.RNG_set_state(self.rng_state)
+        try:
+            if self.cqi_source is not None:
+                self.state.cqi[:] = self.cqi_source.get_subframe(self.subframe_index)
+                return
+            
+            if self.channel_source is not None:
+                channel_coefficients = self.channel_source.get_frequency_responses(self.subframe_index)
+            else:
+                channel_coefficients = np.array([calculate_channel_frequency_response(channel, self.subframe_index).to_numpy_ndarray() for channel in self.channel])
+                
+            self.state.cqi[:] = calculate_wideband_channel_quality_index_batch(channel_coefficients, self.ue_noise_variance, self.snr_at_bler_target, self.eesm_beta)
+        finally:
+            pyp.RNG_get_state(self.rng_state)
         
-        state['subframe_throughput']      = [pyp.ivec(self.prop_fair_window_size) for ue_index in range(nrof_ues)]
-        state['interleaver_sequence']     = [pyp.ivec() for ue_index in range(nrof_ues)]
-        state['transport_bits']           = [pyp.ivec() for ue_index in range(nrof_ues)]
+    # True if a trace replayed with end_of_trace='stop' has no data for the next subframe
+    def is_trace_finished(self):
+        return any(source.is_finished(self.subframe_index) for source in self.trace_sources)
 
-        return state
-        
     # Simulate
     def transmit(self, scheduled_ue_index=-1):
+        pyp.RNG_set_state(self.rng_state)
+        try:
+            return self._transmit(scheduled_ue_index)
+        finally:
+            pyp.RNG_get_state(self.rng_state)
+
+    def _transmit(self, scheduled_ue_index):
         state = self.state
         nrof_ues = self.nrof_ues
         sf_index = self.subframe_index
+        instrumentation = self.instrumentation
 
         # Obtain the channel for each UE (frequency-domain complex channel coefficients) and update CQI. 
-        channel_coefficients = []
-        for ue_index in range(nrof_ues):
-            channel_coefficients.append(calculate_channel_frequency_response(self.channel[ue_index], sf_index))
+        start_time = instrumentation.start()
+        cqi_reporting_instant = (sf_index % self.cqi_reporting_interval) == 0
+        cqi_from_channel = cqi_reporting_instant and self.cqi_source is None
+        if self.channel_source is not None:
+            # Array with shape (nrof_ues, nrof_subcarriers), e.g. a zero-copy view of the cached traces
+            channel_coefficients = self.channel_source.get_frequency_responses(sf_index)
+            cqi_channel_coefficients = channel_coefficients
+        else:
+            # With lazy evaluation, the channels are only generated at CQI reporting instants and 
+            # for the scheduled UE. The fading channels generate the same samples for a given
+            # subframe index regardless of the order of evaluation, and all channels are 
+            # initialized in the first subframe (a reporting instant), so the results are identical.
+            # With replayed CQIs, only the channel of the scheduled UE is needed.
+            channel_coefficients = [None for ue_index in range(nrof_ues)]
+            if cqi_from_channel or (not self.lazy_channel_evaluation and self.cqi_source is None):
+                for ue_index in range(nrof_ues):
+                    channel_coefficients[ue_index] = calculate_channel_frequency_response(self.channel[ue_index], sf_index)
             
-            #  Update the channel quality index (CQI) state at reporting intervals
-            if (sf_index % self.cqi_reporting_interval) == 0:
-                # Calculate the wideband CQI assuming perfect channel knowledge
-                cqi = calculate_wideband_channel_quality_index(channel_coefficients[ue_index], self.ue_noise_variance[ue_index], self.snr_at_bler_target)
-                state['cqi'][ue_index] = cqi
+            if cqi_from_channel:
+                cqi_channel_coefficients = np.array([coefficients.to_numpy_ndarray() for coefficients in channel_coefficients])
+        instrumentation.stop('channel', start_time)
                 
-            # Update the HARQ transmission state 
-            if (state['harq_transmission_index'][ue_index] == self.nrof_max_harq_transmissions):
-#                print('Encountered HARQ failure for UE %d in Subframe %d'%(ue_index, subframe_index))
-                state['harq_transmission_index'][ue_index] = 0
+        #  Update the channel quality index (CQI) state of all UEs at reporting intervals
+        if cqi_reporting_instant:
+            start_time = instrumentation.start()
+            if self.cqi_source is not None:
+                state.cqi[:] = self.cqi_source.get_subframe(sf_index)
+            else:
+                # Calculate the wideband CQI assuming perfect channel knowledge
+                state.cqi[:] = calculate_wideband_channel_quality_index_batch(cqi_channel_coefficients, self.ue_noise_variance, self.snr_at_bler_target, self.eesm_beta)
+            instrumentation.stop('cqi', start_time)
+        
+        # Update the HARQ transmission state 
+        state.harq_transmission_index[state.harq_transmission_index == self.nrof_max_harq_transmissions] = 0
         
         # Determine the UE scheduled in this frame if not specified.
         if scheduled_ue_index == -1:
-            if self.scheduler_type == 'Random':
-                scheduled_ue_index = pyp.randi(0, nrof_ues - 1)
-            elif self.scheduler_type == 'RoundRobin':
-                scheduled_ue_index = self.subframe_index % nrof_ues
-            elif self.scheduler_type == 'MaxRate':
-                cqi = [state['cqi'][ue_index] for ue_index in range(nrof_ues)]
-                scheduled_ue_index = cqi.index(max(cqi))
-            elif self.scheduler_type == 'PropFair':
-                window_size = self.prop_fair_window_size
-                if self.subframe_index < window_size: # Not enough data, perform round robin scheduling
-                    scheduled_ue_index = self.subframe_index % nrof_ues
-                else:
-                    proportional_rate = []
-                    for ue_index in range(nrof_ues):
-                        cqi = state['cqi'][ue_index]
-                        _, transport_block_size = get_transmission_parameters_from_cqi(cqi, 1)
-                        instant_rate = transport_block_size * 1e3
-                        
-                        tputs = state['subframe_throughput'][ue_index]
-                        average_rate = pyp.stat.mean(tputs)
-                        
-                        if average_rate == 0:
-                            proportional_rate.append(1e12)
-                        else:
-                            proportional_rate.append(instant_rate / average_rate)
-                        
-                    scheduled_ue_index = proportional_rate.index(max(proportional_rate))
-            else:
-                print('Error: Unsupported scheduler type %s'%(scheduler_type))
+            start_time = instrumentation.start()
+            np.divide(state.subframe_throughput_sum, self.prop_fair_window_size, out=self.average_rate)
+            
+            ue_state = {'cqi': state.cqi[np.newaxis],
+                        'average_rate': self.average_rate[np.newaxis],
+                        'harq_transmission_index': state.harq_transmission_index[np.newaxis],
+                        'buffer_occupancy': state.buffer_occupancy[np.newaxis]}
+            scheduled_ue_index = int(self.scheduler_policy(ue_state, self.subframe_index, self.rng, self.prop_fair_window_size)[0])
+            instrumentation.stop('scheduling', start_time)
             
         # Determine the grant for the scheduled UE
-        scheduled_ue_grant = state['scheduling_grant'][scheduled_ue_index]
+        scheduled_ue_grant = state.get_grant(scheduled_ue_index)
+        harq_transmission_index = int(state.harq_transmission_index[scheduled_ue_index])
 
-        cqi = state['cqi'][scheduled_ue_index]
-        print('Subframe %d, Scheduled UE: %d, CQI: %d, HARQ Transmission Index %d'%(self.subframe_index, scheduled_ue_index, cqi, state['harq_transmission_index'][scheduled_ue_index]))
+        cqi = int(state.cqi[scheduled_ue_index])
 
         # If the HARQ transmission index is 0, schedule a new grant
-        if (state['harq_transmission_index'][scheduled_ue_index] == 0): # Get a new transport block
+        if (harq_transmission_index == 0): # Get a new transport block
             
-            scheduled_ue_grant['start_resource_block'] = 0
-            scheduled_ue_grant['nrof_resource_blocks'] = 1
+            scheduled_ue_grant.start_resource_block = 0
+            scheduled_ue_grant.nrof_resource_blocks = 1
             
             # Transmit a few bits based on the CQI
-            (modulation_order, transport_block_size) = get_transmission_parameters_from_cqi(cqi, scheduled_ue_grant['nrof_resource_blocks'])
+            modulation_order_per_cqi, transport_block_size_per_cqi = get_transmission_parameter_table(scheduled_ue_grant.nrof_resource_blocks)
+            modulation_order = int(modulation_order_per_cqi[cqi])
+            transport_block_size = int(transport_block_size_per_cqi[cqi])
             
-            scheduled_ue_grant['modulation_order'] = modulation_order
-            scheduled_ue_grant['transport_block_size'] = transport_block_size
+            scheduled_ue_grant.cqi = cqi
+            scheduled_ue_grant.modulation_order = modulation_order
+            scheduled_ue_grant.transport_block_size = transport_block_size
                 
             if transport_block_size == 0:
-                print ('Out of range, skipping!')
+                instrumentation.record_events(sf_index, 0, scheduled_ue_index, cqi, harq_transmission_index, 0, False)
                 tput = 0
-                state['subframe_throughput'][scheduled_ue_index].shift_left(tput, 1)
+                state.update_subframe_throughput(scheduled_ue_index, tput)
+                self._record_result(scheduled_ue_index, cqi, 0, harq_transmission_index, tput)
      
                 self.subframe_index += 1
 
                 return (scheduled_ue_index, cqi, tput)
 
-        # If this is a new HARQ transmission, extract new transport bits and update HARQ buffers
-        if (state['harq_transmission_index'][scheduled_ue_index] == 0):
-            state['transport_bits'][scheduled_ue_index] = extract_next_bits_with_zero_padding(state['transmit_data_buffer'][scheduled_ue_index], state['current_data_buffer_index'][scheduled_ue_index], transport_block_size)
-                    
-            state['transmit_harq_buffer'][scheduled_ue_index].clear()
-            state['transmit_harq_buffer'][scheduled_ue_index], state['interleaver_sequence'][scheduled_ue_index] = channel_encode_and_interleave_bits(state['transport_bits'][scheduled_ue_index])
+        noise_variance = self.ue_noise_variance[scheduled_ue_index]
+        scheduled_ue_channel_coefficients = channel_coefficients[scheduled_ue_index]
+        if scheduled_ue_channel_coefficients is None: # Not evaluated yet in lazy mode
+            start_time = instrumentation.start()
+            scheduled_ue_channel_coefficients = calculate_channel_frequency_response(self.channel[scheduled_ue_index], sf_index)
+            instrumentation.stop('channel', start_time)
+        
+        if self.phy_mode == 'bit_level':
+            # If this is a new HARQ transmission, extract new transport bits and update HARQ buffers
+            if (harq_transmission_index == 0):
+                start_time = instrumentation.start()
+                transport_bits = self.traffic_source.get_transport_bits(scheduled_ue_index, transport_block_size)
+                start_new_transport_block(self.harq_state, scheduled_ue_index, transport_bits, self.phy_context)
+                instrumentation.stop('encode_interleave', start_time)
             
-            state['receive_harq_buffer'][scheduled_ue_index].clear()
-            state['receive_harq_buffer'][scheduled_ue_index].set_size(state['transmit_harq_buffer'][scheduled_ue_index].length(), False)
+            start_time = instrumentation.start()
+            modulation_order = scheduled_ue_grant.modulation_order
+            transmit_bits = extract_harq_transmit_bits(self.harq_state, scheduled_ue_index, modulation_order, scheduled_ue_grant.nrof_resource_blocks)
             
-        nrof_transmit_bits = calculate_nrof_transmit_bits(scheduled_ue_grant['modulation_order'], scheduled_ue_grant['nrof_resource_blocks'])
+            if self.baseband_engine == 'numpy':
+                if self.channel_source is None:
+                    scheduled_ue_channel_coefficients = scheduled_ue_channel_coefficients.to_numpy_ndarray()
+                
+                received_soft_values = self.ofdm_engine.propagate_transmit_bits_over_channel(transmit_bits[np.newaxis], modulation_order, scheduled_ue_channel_coefficients[np.newaxis], [noise_variance])[0]
+            else:
+                if self.channel_source is not None:
+                    scheduled_ue_channel_coefficients = self.channel_vectors.copy(scheduled_ue_channel_coefficients)
+                
+                received_soft_values = propagate_transmit_bits_over_channel(convert_harq_transmit_bits(self.harq_state, scheduled_ue_index, transmit_bits), modulation_order, scheduled_ue_grant.nrof_resource_blocks, scheduled_ue_channel_coefficients, noise_variance, self.phy_context)
+            instrumentation.stop('modulation_channel', start_time)
             
-        transmit_bits = extract_next_bits_with_wraparound(state['transmit_harq_buffer'][scheduled_ue_index], state['current_harq_buffer_index'][scheduled_ue_index], nrof_transmit_bits) 
-                    
-        state['next_harq_buffer_index'][scheduled_ue_index] = (state['current_harq_buffer_index'][scheduled_ue_index] + transmit_bits.length()) % state['transmit_harq_buffer'][scheduled_ue_index].length()
-
-        noise_variance = self.ue_noise_variance[scheduled_ue_index]
-        received_soft_values = propagate_transmit_bits_over_channel(transmit_bits, scheduled_ue_grant['modulation_order'], scheduled_ue_grant['nrof_resource_blocks'], channel_coefficients[scheduled_ue_index], noise_variance)
-        
-        state['receive_harq_buffer'][scheduled_ue_index] = add_values_with_wraparound(state['receive_harq_buffer'][scheduled_ue_index], state['current_harq_buffer_index'][scheduled_ue_index], received_soft_values)
-
-        decoded_bits = deinterleave_and_channel_decode_symbols(state['receive_harq_buffer'][scheduled_ue_index], state['interleaver_sequence'][scheduled_ue_index])
+            start_time = instrumentation.start()
+            decoded = combine_and_decode_harq_block(self.harq_state, scheduled_ue_index, received_soft_values, self.phy_context)
+            instrumentation.stop('decode', start_time)
+        else:
+            # Draw the HARQ outcome from the AWGN BLER curves at the EESM effective SNR
+            if (harq_transmission_index == 0):
+                state.harq_accumulated_snr[scheduled_ue_index] = 0.0
+                
+            if self.channel_source is None:
+                scheduled_ue_channel_coefficients = scheduled_ue_channel_coefficients.to_numpy_ndarray()
+            
+            start_time = instrumentation.start()
+            grant_cqi = scheduled_ue_grant.cqi
+            eesm_beta = 1.0 if self.eesm_beta is None else self.eesm_beta[grant_cqi]
+            decoded, state.harq_accumulated_snr[scheduled_ue_index] = transmit_abstracted_harq_block(self.awgn_data, grant_cqi, scheduled_ue_channel_coefficients, noise_variance, eesm_beta, state.harq_accumulated_snr[scheduled_ue_index], self.rng)
+            instrumentation.stop('link_abstraction', start_time)
 
-        if (decoded_bits == state['transport_bits'][scheduled_ue_index]):
-            state['harq_transmission_index'][scheduled_ue_index] = 0
+        if decoded:
+            state.harq_transmission_index[scheduled_ue_index] = 0
             
-            tput = scheduled_ue_grant['transport_block_size']
+            tput = scheduled_ue_grant.transport_block_size
+            self.traffic_source.deliver_bits(scheduled_ue_index, tput)
         else:
-            state['harq_transmission_index'][scheduled_ue_index] = state['harq_transmission_index'][scheduled_ue_index] + 1
+            state.harq_transmission_index[scheduled_ue_index] = harq_transmission_index + 1
             tput = 0
 
-        state['subframe_throughput'][scheduled_ue_index].shift_left(tput, 1)
+        state.update_subframe_throughput(scheduled_ue_index, tput)
+        
+        instrumentation.record_events(sf_index, 0, scheduled_ue_index, cqi, harq_transmission_index, scheduled_ue_grant.transport_block_size, decoded)
+        self._record_result(scheduled_ue_index, cqi, scheduled_ue_grant.transport_block_size, harq_transmission_index, tput)
 
         # Increment the subframe index
         self.subframe_index += 1
 
         return (scheduled_ue_index, cqi, tput)
 
-    # Save Simulation Data
-    def save_simulation_data():
-        filepath = '../sim_data/DATA_%s_%dUES_%dSF.npy'%(scheduler_type, nrof_ues, nrof_subframes)
-        save_simulation_data(filepath, sim['par'], ue, nrof_ues)
+    def _record_result(self, scheduled_ue_index, cqi, transport_block_size, harq_transmission_index, tput):
+        if self.result_recorder is None:
+            return
+
+        self.result_recorder.append(subframe_index=self.subframe_index,
+                                    scheduled_ue_index=scheduled_ue_index,
+                                    cqi=cqi,
+                                    transport_block_size=transport_block_size,
+                                    harq_transmission_index=harq_transmission_index,
+                                    throughput=tput)
+
+    # Capture the simulation state, to continue from it later with restore(). The channels,
+    # the traffic source keys and the PHY caches do not change during the simulation and are
+    # shared, so a snapshot only holds the per-UE state arrays, the HARQ buffers and the 
+    # random generator states.
+    def snapshot(self):
+        snapshot = {'subframe_index': self.subframe_index,
+                    'state': self.state.copy(),
+                    'rng_state': copy_rng_state(self.rng_state),
+                    'numpy_rng_state': self.rng.bit_generator.state}
+        if self.phy_mode == 'bit_level':
+            snapshot['harq_state'] = copy_harq_state_variables(self.harq_state)
+
+        return snapshot
+
+    # Return to a snapshot taken from this simulator. A snapshot can be restored any number of times.
+    def restore(self, snapshot):
+        self.subframe_index = snapshot['subframe_index']
+        self.state.copy_from(snapshot['state'])
+        self.rng_state = copy_rng_state(snapshot['rng_state'])
+        self.rng.bit_generator.state = snapshot['numpy_rng_state']
+        if self.phy_mode == 'bit_level':
+            restore_harq_state_variables(self.harq_state, snapshot['harq_state'])
+
+    # Returns a new simulator that continues independently from the current state, sharing
+    # the parts that do not change during the simulation
+    def fork(self):
+        forked = copy.copy(self)
+
+        forked.state = self.state.copy()
+        forked.traffic_source = copy.copy(self.traffic_source)
+        forked.traffic_source.buffer_occupancy = forked.state.buffer_occupancy
+        forked.traffic_source.stream_position = forked.state.stream_position
+
+        forked.rng_state = copy_rng_state(self.rng_state)
+        forked.rng = copy.deepcopy(self.rng)
+        forked.ofdm_engine = OfdmBasebandEngine(forked.rng)
+        forked.channel_vectors = PyItppVectorCache(pyp.cvec, complex)
+        if self.phy_mode == 'bit_level':
+            forked.harq_state = copy_harq_state_variables(self.harq_state)
+
+        forked.average_rate = np.zeros(self.nrof_ues)
+        forked.instrumentation = Instrumentation(self.instrumentation.verbosity, self.instrumentation.event_trace_size)
+        forked.result_recorder = None # The recorded results belong to the original simulator
+        forked.owns_sources = False # The channel and CQI sources are closed by the original simulator
+
+        return forked
+
+    # Stop the background threads of the channel and CQI sources, release their memory-mapped
+    # files and commit the recorded results. The simulator cannot transmit afterwards.
+    def close(self):
+        if self.owns_sources:
+            for source in [self.channel_trace_cache, self.channel_source, self.cqi_source]:
+                if hasattr(source, 'close'):
+                    source.close()
+
+        if self.result_recorder is not None:
+            self.result_recorder.close()
+            self.result_recorder = None
+
+    # Save the simulation parameters and the per-UE scheduler state to a .npz file, and commit
+    # the per-subframe results recorded so far. Returns the path of the file.
+    def save_simulation_data(self, filepath=None):
+        if self.result_recorder is not None:
+            self.result_recorder.flush()
+
+        if filepath is None:
+            dirpath = os.path.dirname(os.path.abspath(__file__))
+            filepath = dirpath + '/sim_data/DATA_%s_%dUES_%dSF.npz'%(self.simulation_parameters['scheduler_type'], self.nrof_ues, self.subframe_index)
+
+        # Plain arrays, so the file loads without unpickling
+        state_arrays = {name: getattr(self.state, name) for name, _, _ in SCHEDULER_STATE_FIELDS}
+        np.savez(filepath, parameters=json.dumps(self.simulation_parameters), subframe_index=self.subframe_index, **state_arrays)
+
+        return filepath
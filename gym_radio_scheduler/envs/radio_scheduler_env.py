@@ -1,53 +1,162 @@
+import os
+
 import gym
+import numpy as np
 from gym import error, spaces, utils
 from gym.utils import seeding
 
 from .radio_multilink_scheduler import RadioMultilinkScheduler
+from .src.CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
 
 class RadioSchedulerEnv(gym.Env):
 #    metadata = {'render.modes': ['random']}
-    
-    def __init__(self):
-  
+
+    # Columns of the observation
+    OBSERVATION_FIELDS = ('cqi', 'average_throughput', 'harq_transmission_index', 'buffer_occupancy')
+
+    def __init__(self, nrof_ues=30, scheduler_type='Random', seed=42, **scheduler_kwargs):
+        """
+           Parameters
+           ----------
+           nrof_ues : int
+               Number of UEs in the cell.
+           scheduler_type : str or callable
+               ['Random', 'MaxRate', 'RoundRobin', 'PropFair'] or another
+               registered scheduler policy, used when the action is -1.
+           seed : int
+               Seed of the simulation, used again by reset().
+           scheduler_kwargs :
+               Further RadioMultilinkScheduler arguments, e.g. phy_mode.
+               With result_dir, the results of each episode are recorded
+               in the subdirectory EPISODE_<index> of result_dir; with
+               resume_results, the last recorded episode is continued.
+
+           All arguments can be passed through gym.make, e.g.
+           gym.make('RadioScheduler-v0', nrof_ues=10, scheduler_type='PropFair').
+        """
+        self.nrof_ues = nrof_ues
+        self.scheduler_type = scheduler_type
+        self.scheduler_kwargs = scheduler_kwargs
+        self.seed_value = seed
+
+        # Every episode records its results in its own subdirectory of result_dir
+        self.result_dir = scheduler_kwargs.pop('result_dir', None)
+        self.episode_index = 0
+        if self.result_dir is not None and scheduler_kwargs.get('resume_results', False) and os.path.isdir(self.result_dir):
+            self.episode_index = max(len([name for name in os.listdir(self.result_dir) if name.startswith('EPISODE_')]) - 1, 0)
+
+        self.action_space = spaces.Discrete(nrof_ues)
+
+        nrof_cqi = len(CONFIG.CQI_INDEX__MODORDER_RATE)
+        max_transport_block_size = max(CONFIG.VALID_TBS[1])
+        low = np.zeros((nrof_ues, len(self.OBSERVATION_FIELDS)), dtype=np.float32)
+        high = np.empty((nrof_ues, len(self.OBSERVATION_FIELDS)), dtype=np.float32)
+        high[:] = [nrof_cqi - 1, max_transport_block_size, RadioMultilinkScheduler.nrof_max_harq_transmissions, RadioMultilinkScheduler.nrof_bits_in_packet]
+        self.observation_space = spaces.Box(low=low, high=high, dtype=np.float32)
+
+        # The observation is written in place every step and returned as a read-only view
+        self.observation = np.zeros((nrof_ues, len(self.OBSERVATION_FIELDS)), dtype=np.float32)
+        self.observation_view = self.observation.view()
+        self.observation_view.flags.writeable = False
+
+        self._setup_scheduler()
+
+    def _setup_scheduler(self):
+        # Release the channel sources and commit the recorded results of the previous episode
+        if getattr(self, 'sched', None) is not None:
+            # An episode without records, e.g. the one set up before the first reset(), keeps its directory
+            if self.sched.result_recorder is not None and self.sched.result_recorder.nrof_records > 0:
+                self.episode_index += 1
+            self.sched.close()
+
+        scheduler_kwargs = dict(self.scheduler_kwargs)
+        if self.result_dir is not None:
+            scheduler_kwargs['result_dir'] = os.path.join(self.result_dir, 'EPISODE_%06d'%(self.episode_index))
+
         # nrof_ues: Integer value
         # scheduler_type: ['Random', 'MaxRate', 'RoundRobin', 'PropFair']
-        self.sched = RadioMultilinkScheduler(nrof_ues=30, scheduler_type='Random')
-  
+        self.sched = RadioMultilinkScheduler(nrof_ues=self.nrof_ues, scheduler_type=self.scheduler_type, seed=self.seed_value, **scheduler_kwargs)
+
+    def _update_observation(self):
+        state = self.sched.state
+        observation = self.observation
+
+        observation[:, 0] = state.cqi
+        np.divide(state.subframe_throughput_sum, self.sched.prop_fair_window_size, out=observation[:, 1], casting='unsafe')
+        observation[:, 2] = state.harq_transmission_index
+        observation[:, 3] = state.buffer_occupancy
+
+        return self.observation_view
+
     def step(self, action=-1):
         """
            A step in the environment.
-     
+
            Parameters
            ----------
-           action : int in range [0, 30]
-           
-           action: 
+           action : int in range [0, nrof_ues - 1], or -1
+
+           action:
                The UE specified by the action is scheduled in the next
                transmission time interval (TTI). If action is -1, the traditional
-               radio scheduler schedules one of the UEs with index [0,...,30].
-     
+               radio scheduler schedules one of the UEs.
+
            Returns
            -------
-           scheduled_ue_index, channel_quality_index, realized_throughput : tuple
-     
-           scheduled_ue_index (int) :
-               UE scheduled in the current TTI either by specified action or
-               by the radio scheduler
-           channel_quality_index (int) :
-               The observed channel quality index (CQI) for the UE scheduled
-               in the current TTI.
-           realized_throughput (int) :
-               Throughput is 0 if tranmsission failed or UE was out of range,
+           observation, reward, done, info : tuple
+
+           observation (ndarray, float32, shape (nrof_ues, 4)) :
+               Per UE: the reported channel quality index (CQI), the
+               throughput averaged over the proportional fair window, the
+               HARQ transmission index and the buffer occupancy in bits.
+               This is a read-only view of a buffer that is overwritten by
+               the next step; copy it to keep it.
+           reward (float) :
+               Throughput is 0 if transmission failed or UE was out of range,
                otherwise the number of information bits transmitted successfully.
+           done (bool) :
+               False, the cell runs indefinitely, unless it replays a trace
+               with end_of_trace='stop' and the trace has ended.
+           info (dict) :
+               scheduled_ue_index, the UE scheduled in the current TTI either
+               by specified action or by the radio scheduler, and cqi, the
+               CQI of that UE.
         """
-        result = self.sched.transmit(action)
-  
-        return result
-  
+        scheduled_ue_index, cqi, tput = self.sched.transmit(int(action))
+
+        info = {'scheduled_ue_index': scheduled_ue_index, 'cqi': cqi}
+
+        return (self._update_observation(), float(tput), self.sched.is_trace_finished(), info)
+
     def reset(self):
-        result = self.sched.transmit(-1)
+        """
+           Restart the simulation from the seed and return the initial
+           observation, with the CQI reported in the first subframe.
+        """
+        self._setup_scheduler()
+        self.sched.update_channel_quality_index()
+
+        return self._update_observation()
+
+    def seed(self, seed=None):
+        """
+           Set the seed used from the next reset(). A random seed is drawn
+           if seed is None.
+        """
+        if seed is None:
+            seed = int(np.random.SeedSequence().generate_state(1)[0])
+        self.seed_value = seed
+
+        return [seed]
 
-        return result[1]
-  
     def render(self, mode='random', close=False):
         pass
+
+    def close(self):
+        """
+           Stop the background threads of the simulator and commit its
+           recorded results.
+        """
+        if self.sched is not None:
+            self.sched.close()
+            self.sched = None
@@ -0,0 +1,328 @@
+import os
+import numpy as np
+import py_itpp as pyp
+from .src import *
+
+class RadioSchedulerVecEnv():
+    """
+       Steps num_envs independent cells in lockstep. The scheduler-visible
+       state of all cells (CQI, HARQ transmission index and throughput window)
+       is kept in stacked arrays of shape (num_envs, nrof_ues, ...), and the
+       CQI, scheduling and HARQ bookkeeping stages run on all cells at once.
+
+       With phy_mode='abstracted', the HARQ outcomes of all cells are drawn
+       together from the link abstraction. With phy_mode='bit_level', the
+       encoding and decoding of the UE scheduled in each cell run per cell,
+       since they are processed by py_itpp one link at a time. With
+       baseband_engine='numpy', the modulation, OFDM and channel stages of
+       all cells are processed together, one batch per modulation order.
+
+       The channel stage is not batched with the default
+       channel_backend='py_itpp': the channels are generated by one py_itpp
+       TDL_Channel per UE, so every step costs num_envs * nrof_ues py_itpp
+       calls and conversions in Python loops (only those of the scheduled
+       UEs between CQI reports with lazy_channel_evaluation). With
+       channel_backend='numpy', the channels of all UEs in all cells come
+       from a single NumpyTdlChannel, generated in blocks of subframes. The
+       vec_env benchmarks of benchmarks/run_benchmarks.py compare both.
+    """
+    nrof_bits_in_packet = 1000000 # bits
+    nrof_max_harq_transmissions = 4
+    relative_speed = 0.83 # m/s
+    bler_target = 0.1
+    channel_profile = pyp.comm.CHANNEL_PROFILE.ITU_Vehicular_B
+    eesm_beta = None # EESM calibration factor per CQI, 1.0 for all CQIs if None
+
+    def __init__(self,
+                 num_envs,
+                 nrof_ues=30,
+                 scheduler_type='Random',
+                 prop_fair_window_size=50,
+                 cqi_reporting_interval=1,
+                 seed=42,
+                 lazy_channel_evaluation=False,
+                 phy_mode='bit_level',
+                 baseband_engine='py_itpp',
+                 channel_backend='py_itpp',
+                 verbosity=0,
+                 event_trace_size=4096):
+
+        self.num_envs = num_envs
+        self.nrof_ues = nrof_ues
+        self.scheduler_type = scheduler_type
+        self.scheduler_policy = get_scheduler_policy(scheduler_type) # Name of a registered policy, or a policy
+        self.prop_fair_window_size = prop_fair_window_size
+        self.cqi_reporting_interval = cqi_reporting_interval
+        self.lazy_channel_evaluation = lazy_channel_evaluation
+        self.phy_mode = phy_mode # ['bit_level', 'abstracted']
+        self.baseband_engine = baseband_engine # ['py_itpp', 'numpy'], used in the bit-level PHY mode
+        self.channel_backend = channel_backend # ['py_itpp', 'numpy']
+        self.seed = seed
+
+        # Per-stage timers and trace of the scheduling decisions, disabled with verbosity 0
+        self.instrumentation = Instrumentation(verbosity, event_trace_size)
+
+        dirpath = os.path.dirname(os.path.abspath(__file__))
+        awgn_datafile = dirpath + '/sim_data/awgn_custom_config_datafile.npy'
+        self.awgn_data, self.snr_at_bler_target = load_awgn_table(awgn_datafile, self.bler_target) # Shared by all simulators in the process
+
+        # Modulation order and transport block size for each CQI on a single resource block
+        self.modulation_order_per_cqi, self.transport_block_size_per_cqi = get_transmission_parameter_table(1)
+
+        self._setup_cells()
+
+    def _setup_cells(self):
+        num_envs = self.num_envs
+        nrof_ues = self.nrof_ues
+
+        self.subframe_index = 0
+
+        # Stacked scheduler state for all cells, as a structure of arrays in one contiguous block
+        self.state = SchedulerState((num_envs, nrof_ues), self.prop_fair_window_size)
+        self.average_rate = np.zeros((num_envs, nrof_ues))
+
+        # Set the random number generator seeds for repeatability
+        pyp.RNG_reset(self.seed)
+        self.rng = np.random.default_rng(self.seed)
+
+        # Full-buffer traffic for each UE in each cell, indexed by env_index * nrof_ues + ue_index
+        self.traffic_source = StreamingTrafficSource(num_envs * nrof_ues, self.nrof_bits_in_packet, self.seed, self.state.buffer_occupancy.reshape(-1), self.state.stream_position.reshape(-1))
+
+        # Per-cell HARQ buffers used by the bit-level link processing
+        if self.phy_mode == 'bit_level':
+            self.harq_state = [setup_harq_state_variables(nrof_ues) for _ in range(num_envs)]
+            self.phy_context = PhyContext()
+            self.ofdm_engine = OfdmBasebandEngine(self.rng)
+            self.channel_vectors = PyItppVectorCache(pyp.cvec, complex) # For the NumPy channels in the py_itpp baseband
+        elif self.phy_mode != 'abstracted':
+            raise ValueError('Unsupported PHY mode %s'%(self.phy_mode))
+
+        # Update the UE-level parameters for each UE in each cell
+        ue_snr_dB = np.array([[pyp.random.I_Uniform_RNG(min=10, max=20).sample() for _ in range(nrof_ues)] for _ in range(num_envs)])
+        self.ue_noise_variance = 10 ** (-ue_snr_dB * 0.1)
+
+        # Setup radio channel for each UE in each cell
+        self.channel = None
+        self.numpy_channel = None
+        if self.channel_backend == 'py_itpp':
+            channel_spec = pyp.comm.Channel_Specification(self.channel_profile)
+            self.channel = [[setup_fading_channel(channel_spec, self.relative_speed) for _ in range(nrof_ues)] for _ in range(num_envs)]
+        elif self.channel_backend == 'numpy':
+            # The channel of UE ue_index in cell env_index is channel env_index * nrof_ues + ue_index
+            self.numpy_channel = NumpyTdlChannel(num_envs * nrof_ues, self.channel_profile, self.relative_speed, np.random.default_rng([self.seed, 1]))
+        else:
+            raise ValueError('Unsupported channel backend %s'%(self.channel_backend))
+
+        # Keep the py_itpp random number stream owned by this environment
+        self.rng_state = pyp.ivec()
+        pyp.RNG_get_state(self.rng_state)
+
+    # Returns the channel coefficients of all UEs in all cells as a stacked array, and as
+    # the py_itpp vectors used by the bit-level link processing (None with the NumPy channels)
+    def _calculate_channel_frequency_responses(self, sf_index):
+        if self.numpy_channel is not None:
+            return (self.numpy_channel.get_frequency_responses(sf_index).reshape(self.num_envs, self.nrof_ues, -1), None)
+
+        channel_vectors = [[calculate_channel_frequency_response(channel, sf_index) for channel in cell_channels] for cell_channels in self.channel]
+
+        channel_coefficients = np.array([[coefficients.to_numpy_ndarray() for coefficients in cell_vectors] for cell_vectors in channel_vectors])
+
+        return (channel_coefficients, channel_vectors)
+
+    # Returns the channel coefficients of one UE, as a py_itpp vector with the py_itpp channels
+    # and as a NumPy array with the NumPy channels
+    def _calculate_ue_channel_frequency_response(self, env_index, ue_index, sf_index):
+        if self.numpy_channel is not None:
+            return self.numpy_channel.get_frequency_responses(sf_index)[env_index * self.nrof_ues + ue_index]
+
+        return calculate_channel_frequency_response(self.channel[env_index][ue_index], sf_index)
+
+    def _schedule(self):
+        state = self.state
+        np.divide(state.subframe_throughput_sum, self.prop_fair_window_size, out=self.average_rate)
+
+        ue_state = {'cqi': state.cqi,
+                    'average_rate': self.average_rate,
+                    'harq_transmission_index': state.harq_transmission_index,
+                    'buffer_occupancy': state.buffer_occupancy}
+
+        return self.scheduler_policy(ue_state, self.subframe_index, self.rng, self.prop_fair_window_size)
+
+    def step(self, actions=None):
+        """
+           A step in all cells.
+
+           Parameters
+           ----------
+           actions : array of int with shape (num_envs,), optional
+
+           actions:
+               The UE scheduled in each cell in the next TTI. Cells with
+               action -1 (or all cells if actions is None) are scheduled by
+               the configured radio scheduler.
+
+           Returns
+           -------
+           observations, rewards, dones, infos : tuple
+
+           observations (ndarray, shape (num_envs, nrof_ues)) :
+               The CQI of every UE in every cell.
+           rewards (ndarray, shape (num_envs,)) :
+               Number of information bits transmitted successfully in each cell.
+           dones (ndarray, shape (num_envs,)) :
+               Always False, the cells run indefinitely.
+           infos (list of dict) :
+               The scheduled UE and its CQI in each cell.
+        """
+        pyp.RNG_set_state(self.rng_state)
+        try:
+            return self._step(actions)
+        finally:
+            pyp.RNG_get_state(self.rng_state)
+
+    def _step(self, actions):
+        state = self.state
+        num_envs = self.num_envs
+        sf_index = self.subframe_index
+        cells = np.arange(num_envs)
+        instrumentation = self.instrumentation
+
+        # Obtain the channel for every UE in every cell and update the CQI at reporting intervals.
+        # With lazy evaluation, only the channels of the scheduled UEs are generated in between.
+        channel_coefficients = None
+        channel_vectors = None
+        cqi_reporting_instant = (sf_index % self.cqi_reporting_interval) == 0
+        if cqi_reporting_instant or not self.lazy_channel_evaluation:
+            start_time = instrumentation.start()
+            channel_coefficients, channel_vectors = self._calculate_channel_frequency_responses(sf_index)
+            instrumentation.stop('channel', start_time)
+
+            if cqi_reporting_instant:
+                start_time = instrumentation.start()
+                state.cqi[:] = calculate_wideband_channel_quality_index_batch(channel_coefficients, self.ue_noise_variance, self.snr_at_bler_target, self.eesm_beta)
+                instrumentation.stop('cqi', start_time)
+
+        # Update the HARQ transmission state
+        state.harq_transmission_index[state.harq_transmission_index == self.nrof_max_harq_transmissions] = 0
+
+        # Determine the UE scheduled in each cell if not specified
+        start_time = instrumentation.start()
+        scheduled_ue_index = self._schedule()
+        instrumentation.stop('scheduling', start_time)
+        if actions is not None:
+            actions = np.asarray(actions, dtype=int)
+            scheduled_ue_index = np.where(actions == -1, scheduled_ue_index, actions)
+
+        cqi = state.cqi[cells, scheduled_ue_index]
+        harq_transmission_index = state.harq_transmission_index[cells, scheduled_ue_index]
+
+        # Schedule new grants for UEs starting a new HARQ process
+        new_transmission = harq_transmission_index == 0
+        grant_cqi = np.where(new_transmission, cqi, state.grant_cqi[cells, scheduled_ue_index])
+        modulation_order = self.modulation_order_per_cqi[grant_cqi]
+        transport_block_size = self.transport_block_size_per_cqi[grant_cqi]
+
+        state.grant_start_resource_block[cells, scheduled_ue_index] = 0
+        state.grant_nrof_resource_blocks[cells, scheduled_ue_index] = 1
+        state.grant_cqi[cells, scheduled_ue_index] = grant_cqi
+        state.grant_modulation_order[cells, scheduled_ue_index] = modulation_order
+        state.grant_transport_block_size[cells, scheduled_ue_index] = transport_block_size
+
+        # UEs out of range are skipped
+        transmitting = ~(new_transmission & (transport_block_size == 0))
+
+        if self.phy_mode == 'abstracted':
+            if channel_coefficients is None:
+                start_time = instrumentation.start()
+                scheduled_ue_channel_coefficients = np.array([as_ndarray(self._calculate_ue_channel_frequency_response(env_index, ue_index, sf_index)) for env_index, ue_index in zip(cells, scheduled_ue_index)])
+                instrumentation.stop('channel', start_time)
+            else:
+                scheduled_ue_channel_coefficients = channel_coefficients[cells, scheduled_ue_index]
+
+            start_time = instrumentation.start()
+            eesm_beta = 1.0 if self.eesm_beta is None else np.asarray(self.eesm_beta)[grant_cqi]
+            accumulated_snr = np.where(new_transmission, 0.0, state.harq_accumulated_snr[cells, scheduled_ue_index])
+
+            decoded, state.harq_accumulated_snr[cells, scheduled_ue_index] = transmit_abstracted_harq_block(self.awgn_data, grant_cqi, scheduled_ue_channel_coefficients, self.ue_noise_variance[cells, scheduled_ue_index], eesm_beta, accumulated_snr, self.rng)
+            decoded = decoded & transmitting
+            instrumentation.stop('link_abstraction', start_time)
+        else:
+            decoded = np.zeros(num_envs, dtype=bool)
+            transmit_bits = {}
+            ue_channel_coefficients = {}
+            received_soft_values = {}
+            for env_index in np.flatnonzero(transmitting):
+                ue_index = scheduled_ue_index[env_index]
+                harq_state = self.harq_state[env_index]
+                if new_transmission[env_index]:
+                    start_time = instrumentation.start()
+                    transport_bits = self.traffic_source.get_transport_bits(env_index * self.nrof_ues + ue_index, transport_block_size[env_index])
+                    start_new_transport_block(harq_state, ue_index, transport_bits, self.phy_context)
+                    instrumentation.stop('encode_interleave', start_time)
+
+                start_time = instrumentation.start()
+                if channel_vectors is not None:
+                    ue_channel_coefficients[env_index] = channel_vectors[env_index][ue_index]
+                elif channel_coefficients is not None:
+                    ue_channel_coefficients[env_index] = channel_coefficients[env_index, ue_index]
+                else:
+                    ue_channel_coefficients[env_index] = self._calculate_ue_channel_frequency_response(env_index, ue_index, sf_index)
+                instrumentation.stop('channel', start_time)
+
+                start_time = instrumentation.start()
+                transmit_bits[env_index] = extract_harq_transmit_bits(harq_state, ue_index, modulation_order[env_index], 1)
+                if self.baseband_engine != 'numpy':
+                    channel_vector = ue_channel_coefficients[env_index]
+                    if isinstance(channel_vector, np.ndarray):
+                        channel_vector = self.channel_vectors.copy(channel_vector)
+                    received_soft_values[env_index] = propagate_transmit_bits_over_channel(convert_harq_transmit_bits(harq_state, ue_index, transmit_bits[env_index]), modulation_order[env_index], 1, channel_vector, self.ue_noise_variance[env_index, ue_index], self.phy_context)
+                instrumentation.stop('modulation_channel', start_time)
+
+            # With the NumPy engine, propagate the transmissions of all cells with the same
+            # modulation order as one batch
+            if self.baseband_engine == 'numpy':
+                start_time = instrumentation.start()
+                for batch_modulation_order in np.unique(modulation_order[list(transmit_bits.keys())]):
+                    batch_env_index = [env_index for env_index in transmit_bits if modulation_order[env_index] == batch_modulation_order]
+                    batch_ue_index = scheduled_ue_index[batch_env_index]
+
+                    batch_transmit_bits = np.array([transmit_bits[env_index] for env_index in batch_env_index])
+                    batch_channel_coefficients = np.array([as_ndarray(ue_channel_coefficients[env_index]) for env_index in batch_env_index])
+                    batch_received_soft_values = self.ofdm_engine.propagate_transmit_bits_over_channel(batch_transmit_bits, batch_modulation_order, batch_channel_coefficients, self.ue_noise_variance[batch_env_index, batch_ue_index])
+
+                    for batch_index, env_index in enumerate(batch_env_index):
+                        received_soft_values[env_index] = batch_received_soft_values[batch_index]
+                instrumentation.stop('modulation_channel', start_time)
+
+            for env_index in received_soft_values:
+                start_time = instrumentation.start()
+                decoded[env_index] = combine_and_decode_harq_block(self.harq_state[env_index], scheduled_ue_index[env_index], received_soft_values[env_index], self.phy_context)
+                instrumentation.stop('decode', start_time)
+
+        tput = np.where(decoded, transport_block_size, 0)
+        self.traffic_source.deliver_bits(cells * self.nrof_ues + scheduled_ue_index, tput)
+        state.harq_transmission_index[cells, scheduled_ue_index] = np.where(decoded, 0, harq_transmission_index + transmitting)
+
+        state.update_subframe_throughput((cells, scheduled_ue_index), tput)
+
+        instrumentation.record_events(sf_index, cells, scheduled_ue_index, cqi, harq_transmission_index, transport_block_size, decoded)
+
+        # Increment the subframe index
+        self.subframe_index += 1
+
+        infos = [{'scheduled_ue_index': int(scheduled_ue_index[i]), 'cqi': int(cqi[i])} for i in range(num_envs)]
+
+        return (state.cqi.copy(), tput.astype(float), np.zeros(num_envs, dtype=bool), infos)
+
+    def reset(self):
+        self._setup_cells()
+
+        pyp.RNG_set_state(self.rng_state)
+        channel_coefficients, _ = self._calculate_channel_frequency_responses(self.subframe_index)
+        pyp.RNG_get_state(self.rng_state)
+        self.state.cqi[:] = calculate_wideband_channel_quality_index_batch(channel_coefficients, self.ue_noise_variance, self.snr_at_bler_target, self.eesm_beta)
+
+        return self.state.cqi.copy()
+
+    def close(self):
+        pass
@@ -0,0 +1,272 @@
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Commands sent to the shard workers, and their replies. Only these bytes go through the pipes;
+# the actions and results are exchanged through the shared memory.
+COMMAND_STEP = b'S'
+COMMAND_RESET = b'R'
+COMMAND_CLOSE = b'C'
+REPLY_OK = b'K'
+REPLY_ERROR = b'E' # Followed by an UTF-8 error message
+
+''' Offsets in the shared memory block and the shapes of the arrays exchanged
+    with the workers, for num_envs envs with the given observation shape.
+    Returns ({name: (dtype, shape, offset)}, size in bytes).
+'''
+def calculate_shared_memory_layout(num_envs, observation_shape):
+    fields = [('observations',       np.float32, (num_envs,) + tuple(observation_shape)),
+              ('rewards',            np.float64, (num_envs,)),
+              ('actions',            np.int32,   (num_envs,)),
+              ('scheduled_ue_index', np.int32,   (num_envs,)),
+              ('cqi',                np.int32,   (num_envs,)),
+              ('dones',              np.bool_,   (num_envs,))]
+
+    layout = {}
+    nbytes = 0
+    for name, dtype, shape in fields:
+        dtype = np.dtype(dtype)
+        nbytes += -nbytes % dtype.alignment
+        layout[name] = (dtype, shape, nbytes)
+        nbytes += dtype.itemsize * int(np.prod(shape))
+
+    return (layout, nbytes)
+
+def get_shared_arrays(buffer, layout):
+    return {name: np.ndarray(shape, dtype=dtype, buffer=buffer, offset=offset) for name, (dtype, shape, offset) in layout.items()}
+
+def _send_error(connection, e):
+    connection.send_bytes(REPLY_ERROR + ('%s: %s'%(type(e).__name__, e)).encode('utf-8'))
+
+# Steps the envs first_env_index to first_env_index + len(seeds) - 1 on the commands of the parent
+def _serve_shard(connection, arrays, first_env_index, seeds, env_kwargs):
+    from .radio_scheduler_env import RadioSchedulerEnv
+
+    try:
+        envs = [RadioSchedulerEnv(seed=seed, **env_kwargs) for seed in seeds]
+    except Exception as e:
+        _send_error(connection, e)
+        return
+    env_indices = range(first_env_index, first_env_index + len(envs))
+    connection.send_bytes(REPLY_OK)
+
+    try:
+        _step_shard(connection, arrays, env_indices, envs)
+    finally:
+        for env in envs:
+            env.close()
+
+# Runs the commands of the parent on the envs of the shard until it closes the shard
+def _step_shard(connection, arrays, env_indices, envs):
+    observations = arrays['observations']
+    rewards = arrays['rewards']
+    actions = arrays['actions']
+    scheduled_ue_index = arrays['scheduled_ue_index']
+    cqi = arrays['cqi']
+    dones = arrays['dones']
+
+    while True:
+        try:
+            command = connection.recv_bytes()
+        except EOFError:
+            return # The parent has exited
+        if command == COMMAND_CLOSE:
+            return
+
+        try:
+            for env_index, env in zip(env_indices, envs):
+                if command == COMMAND_RESET:
+                    observations[env_index] = env.reset()
+                else:
+                    observations[env_index], rewards[env_index], dones[env_index], info = env.step(int(actions[env_index]))
+                    scheduled_ue_index[env_index] = info['scheduled_ue_index']
+                    cqi[env_index] = info['cqi']
+        except Exception as e:
+            _send_error(connection, e)
+        else:
+            connection.send_bytes(REPLY_OK)
+
+# Worker process of a shard
+def _run_shard_worker(connection, shared_memory_name, layout, first_env_index, seeds, env_kwargs):
+    block = shared_memory.SharedMemory(name=shared_memory_name)
+    try:
+        _serve_shard(connection, get_shared_arrays(block.buf, layout), first_env_index, seeds, env_kwargs)
+    finally:
+        block.close()
+        connection.close()
+
+class SharedMemoryVecEnv():
+    """
+       Steps num_envs RadioSchedulerEnv cells in nrof_workers processes,
+       each owning a contiguous shard of the cells, so the simulation uses
+       as many cores as there are workers.
+
+       The actions and results of all cells live in one shared memory block.
+       A step writes the actions, sends a one-byte command to each worker
+       and waits for a one-byte reply; nothing is pickled after the workers
+       have started. step_async() and step_wait() take the shards to step,
+       so shards can be stepped independently while others are running.
+
+       Env k is seeded with seed k spawned from seed, and env_kwargs are
+       passed to every RadioSchedulerEnv. start_method selects the
+       multiprocessing start method, e.g. 'spawn' or 'forkserver'.
+    """
+    def __init__(self, num_envs, nrof_workers=None, seed=42, start_method=None, **env_kwargs):
+        if nrof_workers is None:
+            nrof_workers = multiprocessing.cpu_count()
+        nrof_workers = min(nrof_workers, num_envs)
+
+        self.num_envs = num_envs
+        self.nrof_workers = nrof_workers
+        self.closed = False
+
+        seed_sequences = np.random.SeedSequence(seed).spawn(num_envs)
+        seeds = [int(seed_sequence.generate_state(1, dtype=np.uint32)[0]) for seed_sequence in seed_sequences]
+
+        # Observation per UE: CQI, average throughput, HARQ transmission index and buffer occupancy
+        from .radio_scheduler_env import RadioSchedulerEnv
+        observation_shape = (env_kwargs.get('nrof_ues', 30), len(RadioSchedulerEnv.OBSERVATION_FIELDS))
+
+        layout, nbytes = calculate_shared_memory_layout(num_envs, observation_shape)
+        self.shared_memory = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.arrays = get_shared_arrays(self.shared_memory.buf, layout)
+
+        # Read-only views of the results, overwritten by the next step
+        self.results = {}
+        for name, array in self.arrays.items():
+            view = array.view()
+            view.flags.writeable = False
+            self.results[name] = view
+
+        # Shard w holds the envs shard_bounds[w] to shard_bounds[w + 1] - 1
+        self.shard_bounds = np.linspace(0, num_envs, nrof_workers + 1).astype(int)
+
+        context = multiprocessing.get_context(start_method)
+        self.connections = []
+        self.processes = []
+        for shard_index in range(nrof_workers):
+            first_env_index, end_env_index = self.shard_bounds[shard_index], self.shard_bounds[shard_index + 1]
+
+            parent_connection, child_connection = context.Pipe()
+            process = context.Process(target=_run_shard_worker, args=(child_connection, self.shared_memory.name, layout, int(first_env_index), seeds[first_env_index:end_env_index], env_kwargs), daemon=True)
+            process.start()
+            child_connection.close()
+
+            self.connections.append(parent_connection)
+            self.processes.append(process)
+
+        self.waiting_shards = []
+        try:
+            self._wait(range(nrof_workers))
+        except RuntimeError:
+            self.close()
+            raise
+
+    # Checked for all shards before anything is written or sent, so a rejected call leaves no shard half-issued
+    def _check_not_waiting(self, shard_indices):
+        for shard_index in shard_indices:
+            if shard_index in self.waiting_shards:
+                raise RuntimeError('Shard %d is still stepping'%(shard_index))
+
+    def _send(self, command, shard_indices):
+        self._check_not_waiting(shard_indices)
+
+        for shard_index in shard_indices:
+            self.connections[shard_index].send_bytes(command)
+            self.waiting_shards.append(shard_index)
+
+    def _wait(self, shard_indices):
+        errors = []
+        for shard_index in shard_indices:
+            try:
+                reply = self.connections[shard_index].recv_bytes()
+            except EOFError:
+                reply = REPLY_ERROR + b'Worker exited'
+            if shard_index in self.waiting_shards:
+                self.waiting_shards.remove(shard_index)
+
+            if reply != REPLY_OK:
+                errors.append('Shard %d: %s'%(shard_index, reply[len(REPLY_ERROR):].decode('utf-8')))
+
+        if errors:
+            raise RuntimeError('; '.join(errors))
+
+    ''' Returns the env indices of the shards.
+    '''
+    def get_shard_env_indices(self, shard_indices):
+        return np.concatenate([np.arange(self.shard_bounds[shard_index], self.shard_bounds[shard_index + 1]) for shard_index in shard_indices])
+
+    def _get_shard_indices(self, shard_indices):
+        return range(self.nrof_workers) if shard_indices is None else list(shard_indices)
+
+    ''' Start a step of the envs of the given shards (all if None), with
+        actions of shape (num_envs,). Only the actions of the envs in the
+        shards are used; -1 schedules with the configured radio scheduler.
+    '''
+    def step_async(self, actions=None, shard_indices=None):
+        shard_indices = self._get_shard_indices(shard_indices)
+        env_indices = self.get_shard_env_indices(shard_indices)
+
+        # The workers of stepping shards may be reading their actions
+        self._check_not_waiting(shard_indices)
+
+        self.arrays['actions'][env_indices] = -1 if actions is None else np.asarray(actions)[env_indices]
+        self._send(COMMAND_STEP, shard_indices)
+
+    ''' Wait for the steps of the given shards (all stepping shards if None)
+        and return (observations, rewards, dones, infos) over all envs, as
+        read-only views that are overwritten by the next step. Envs outside
+        the shards keep the results of their last step.
+    '''
+    def step_wait(self, shard_indices=None):
+        shard_indices = list(self.waiting_shards) if shard_indices is None else list(shard_indices)
+        self._wait(shard_indices)
+
+        results = self.results
+        infos = {'scheduled_ue_index': results['scheduled_ue_index'], 'cqi': results['cqi']}
+
+        return (results['observations'], results['rewards'], results['dones'], infos)
+
+    ''' Returns the shards whose step has finished, without waiting.
+    '''
+    def poll(self):
+        return [shard_index for shard_index in self.waiting_shards if self.connections[shard_index].poll()]
+
+    def step(self, actions=None):
+        self.step_async(actions)
+
+        return self.step_wait()
+
+    def reset(self):
+        shard_indices = range(self.nrof_workers)
+        self._send(COMMAND_RESET, shard_indices)
+        self._wait(shard_indices)
+
+        return self.results['observations']
+
+    ''' Stop the workers and release the shared memory. Workers that have
+        not exited timeout seconds after the close command, e.g. because
+        they hang in a step, are terminated.
+    '''
+    def close(self, timeout=10.0):
+        if self.closed:
+            return
+        self.closed = True
+
+        for connection in self.connections:
+            try:
+                connection.send_bytes(COMMAND_CLOSE)
+            except (BrokenPipeError, OSError):
+                pass
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        for connection in self.connections:
+            connection.close()
+
+        del self.arrays, self.results
+        self.shared_memory.close()
+        self.shared_memory.unlink()
@@ -1,7 +1,47 @@
+from .array_conversion import *
 from .baseband_processing import *
 from .buffer_manipulation import *
 from .channel_quality_index import *
 from .radio_channel import *
-from .plot_utils import *
-from .postprocessing import *
-from .preprocessing import *
+from .numpy_channel import *
+from .channel_interpolation import *
+from .harq_processing import *
+from .phy_context import *
+from .ofdm_baseband import *
+from .link_abstraction import *
+from .traffic_source import *
+from .scheduler_policies import *
+from .scheduler_state import *
+from .awgn_table import *
+from .instrumentation import *
+from .random_state import *
+
+import importlib
+
+# Modules that are not used while simulating are imported on first access to one of their names.
+# They are not included in 'from .src import *', so the simulators import them where they are used.
+LAZY_MODULE_NAMES = {'plot_average_throughput_and_fairness_index': 'plot_utils',
+                     'ChannelTraceCache': 'channel_trace_cache',
+                     'channel_trace_key_hash': 'channel_trace_cache',
+                     'TraceReplay': 'trace_replay',
+                     'calculate_window_average': 'throughput_analytics',
+                     'calculate_window_averages': 'throughput_analytics',
+                     'calculate_moving_average': 'throughput_analytics',
+                     'calculate_jain_fairness_index': 'throughput_analytics',
+                     'calculate_average_fairness_index': 'throughput_analytics',
+                     'StreamingHistogram': 'throughput_analytics',
+                     'save_simulation_result': 'postprocessing',
+                     'load_simulation_result': 'postprocessing',
+                     'save_simulation_data': 'postprocessing',
+                     'load_from_file': 'preprocessing',
+                     'create_new_simulation_directory': 'preprocessing',
+                     'RECORD_FIELDS': 'result_recorder',
+                     'StreamingResultRecorder': 'result_recorder',
+                     'load_recorded_results': 'result_recorder'}
+
+def __getattr__(name):
+    if name in LAZY_MODULE_NAMES:
+        module = importlib.import_module('.' + LAZY_MODULE_NAMES[name], __name__)
+        return getattr(module, name)
+
+    raise AttributeError('module %s has no attribute %s'%(__name__, name))
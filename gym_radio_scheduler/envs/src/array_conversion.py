@@ -0,0 +1,62 @@
+import numpy as np
+import py_itpp as pyp
+
+''' Copy the values of a NumPy array into an existing py_itpp vector of the
+    same length, element by element, without building a new vector.
+'''
+def copy_to_vector(values, vector):
+    for i, value in enumerate(values.tolist()):
+        vector[i] = value
+
+    return vector
+
+''' Convert real values held in a NumPy array to a py_itpp vector.
+'''
+def to_vec(values):
+    values = np.asarray(values, dtype=float)
+
+    return copy_to_vector(values, pyp.vec(len(values)))
+
+''' Convert bits held in a NumPy array to a py_itpp binary vector.
+'''
+def to_bvec(bits):
+    bits = np.asarray(bits, dtype=int)
+
+    return copy_to_vector(bits, pyp.bvec(len(bits)))
+
+''' Convert complex values held in a NumPy array to a py_itpp complex vector.
+'''
+def to_cvec(values):
+    values = np.asarray(values, dtype=complex)
+
+    return copy_to_vector(values, pyp.cvec(len(values)))
+
+''' Returns the values of a py_itpp vector as a NumPy array, or a NumPy array as is.
+'''
+def as_ndarray(values):
+    if isinstance(values, np.ndarray):
+        return values
+
+    return values.to_numpy_ndarray()
+
+class PyItppVectorCache():
+    """
+       Preallocated py_itpp vectors of one type (pyp.vec, pyp.bvec or
+       pyp.cvec), one per length, which NumPy arrays are copied into before
+       they are passed to py_itpp. The vector returned by copy() is reused,
+       so it is only valid until the next copy of the same length.
+    """
+    def __init__(self, vector_type, dtype):
+        self.vector_type = vector_type
+        self.dtype = dtype
+        self.vectors = {}
+
+    def copy(self, values):
+        values = np.asarray(values, dtype=self.dtype)
+
+        vector = self.vectors.get(len(values))
+        if vector is None:
+            vector = self.vector_type(len(values))
+            self.vectors[len(values)] = vector
+
+        return copy_to_vector(values, vector)
@@ -0,0 +1,66 @@
+import os
+import numpy as np
+
+from .channel_quality_index import determine_snr_at_bler_target
+
+# Process-wide cache of the AWGN tables: table filepath -> awgn_data, and
+# (table filepath, bler_target) -> SNR at the BLER target per CQI
+AWGN_DATA_CACHE = {}
+SNR_AT_BLER_TARGET_CACHE = {}
+
+def _get_table_filepath(datafile, table_filepath):
+    if table_filepath is None:
+        table_filepath = os.path.splitext(datafile)[0] + '_table.npy'
+
+    return table_filepath
+
+''' Convert the pickled AWGN datafile, a dict with 'snr_range_dB' and
+    'snr_vs_bler', to a plain .npy table that can be memory-mapped. Column 0 of
+    the table holds the SNR range in dB, and column 1 + cqi the BLER of each CQI.
+'''
+def convert_awgn_datafile(datafile, table_filepath):
+    awgn_data = np.load(datafile, encoding='latin1', allow_pickle=True)[()]
+
+    table = np.column_stack((awgn_data['snr_range_dB'], awgn_data['snr_vs_bler']))
+
+    # Write to a temporary file first, so concurrent processes never read a partial table
+    temp_filepath = '%s.%d.tmp'%(table_filepath, os.getpid())
+    with open(temp_filepath, 'wb') as f:
+        np.save(f, table, allow_pickle=False)
+    os.replace(temp_filepath, table_filepath)
+
+    return table_filepath
+
+''' Returns the AWGN SNR-vs-BLER curves as a dict of read-only arrays, in the
+    format of the pickled datafile. The table is read from table_filepath as a
+    memory map, so the pages are shared by all processes using it, and is
+    generated from datafile first if it does not exist. Loaded once per process.
+'''
+def load_awgn_data(datafile, table_filepath=None):
+    table_filepath = _get_table_filepath(datafile, table_filepath)
+
+    if table_filepath not in AWGN_DATA_CACHE:
+        if not os.path.exists(table_filepath):
+            convert_awgn_datafile(datafile, table_filepath)
+
+        table = np.load(table_filepath, mmap_mode='r', allow_pickle=False)
+
+        AWGN_DATA_CACHE[table_filepath] = {'snr_range_dB': table[:, 0], 'snr_vs_bler': table[:, 1:]}
+
+    return AWGN_DATA_CACHE[table_filepath]
+
+''' Returns (awgn_data, snr_at_bler_target), with the SNR in dB at which each
+    CQI reaches the BLER target as a read-only NumPy array. Both are cached for
+    the process.
+'''
+def load_awgn_table(datafile, bler_target, table_filepath=None):
+    awgn_data = load_awgn_data(datafile, table_filepath)
+
+    key = (_get_table_filepath(datafile, table_filepath), bler_target)
+    if key not in SNR_AT_BLER_TARGET_CACHE:
+        snr_at_bler_target = determine_snr_at_bler_target(awgn_data, bler_target).to_numpy_ndarray()
+        snr_at_bler_target.flags.writeable = False
+
+        SNR_AT_BLER_TARGET_CACHE[key] = snr_at_bler_target
+
+    return (awgn_data, SNR_AT_BLER_TARGET_CACHE[key])
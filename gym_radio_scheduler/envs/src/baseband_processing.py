@@ -18,10 +18,10 @@ def generate_turbo_internal_interleaver_sequence(block_length):
     
     return internal_interleaver_sequence
                                     
-''' Channel encode bits and interleave them using a randomized
-    sequence interleaver 
-'''    
-def channel_encode_and_interleave_bits(bits):
+''' Create the rate 1/3 convolutional code with constraint length 7 used
+    for channel coding
+'''
+def create_convolutional_code():
     conv_code = pyp.comm.Convolutional_Code()
  
     generators = pyp.ivec(3)
@@ -30,6 +30,18 @@ def channel_encode_and_interleave_bits(bits):
     generators[2] = 125 # Octal 0175
     constraint_length = 7
     conv_code.set_generator_polynomials(generators, constraint_length)
+    
+    return conv_code
+
+''' Channel encode bits and interleave them using a randomized
+    sequence interleaver. If a PHY context is given, the codec and 
+    interleaver objects are taken from its cache.
+'''    
+def channel_encode_and_interleave_bits(bits, phy_context=None):
+    if phy_context is None:
+        conv_code = create_convolutional_code()
+    else:
+        conv_code = phy_context.get_convolutional_code()
      
     coded_bits = conv_code.encode(bits)
     
@@ -45,28 +57,30 @@ def channel_encode_and_interleave_bits(bits):
 #     coded_bits = pyp.bvec()
 #     turbo_codec.encode(bits, coded_bits)
     
-    sequence_interleaver_b = pyp.comm.sequence_interleaver_bin(coded_bits.length())
+    if phy_context is None:
+        sequence_interleaver_b = pyp.comm.sequence_interleaver_bin(coded_bits.length())
+    else:
+        sequence_interleaver_b = phy_context.get_sequence_interleaver_bin(coded_bits.length())
     sequence_interleaver_b.randomize_interleaver_sequence()
     
     interleaved_bits = sequence_interleaver_b.interleave(coded_bits) 
     
     return (interleaved_bits, sequence_interleaver_b.get_interleaver_sequence())
 
-def deinterleave_and_channel_decode_symbols(symbols, interleaver_sequence):
+def deinterleave_and_channel_decode_symbols(symbols, interleaver_sequence, phy_context=None):
         
-    sequence_interleaver_d = pyp.comm.sequence_interleaver_double(symbols.length())
+    if phy_context is None:
+        sequence_interleaver_d = pyp.comm.sequence_interleaver_double(symbols.length())
+    else:
+        sequence_interleaver_d = phy_context.get_sequence_interleaver_double(symbols.length())
     sequence_interleaver_d.set_interleaver_sequence(interleaver_sequence)
     
     deinterleaved_symbols = sequence_interleaver_d.deinterleave(symbols, keepzeroes=0) 
         
-    conv_code = pyp.comm.Convolutional_Code()
- 
-    generators = pyp.ivec(3)
-    generators[0] = 91  # Octal 0133
-    generators[1] = 101 # Octal 0145
-    generators[2] = 125 # Octal 0175
-    constraint_length = 7
-    conv_code.set_generator_polynomials(generators, constraint_length)
+    if phy_context is None:
+        conv_code = create_convolutional_code()
+    else:
+        conv_code = phy_context.get_convolutional_code()
      
     decoded_bits = conv_code.decode(deinterleaved_symbols)
     
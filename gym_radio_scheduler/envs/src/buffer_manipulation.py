@@ -1,3 +1,4 @@
+import numpy as np
 import py_itpp as pyp
 
 ''' Extract the next few bits from the buffer. If too few bits are available, 
@@ -63,3 +64,142 @@ def add_values_with_wraparound(buffer_, index, values):
                 value_index = nrof_values
                                 
     return (buffer_ + temp_buffer)
+
+class CircularBuffer():
+    """
+       Fixed-capacity buffer with circular reads and in-place accumulation,
+       used for the HARQ buffers. The storage is allocated once; a new
+       transport block only changes the used length.
+       
+       Reads that do not wrap around return a view of the storage, reads that
+       wrap around are copied to a preallocated output array, which is shared
+       with the copies of the buffer. In both cases the result is only valid
+       until the next read or write of the buffer or its copies.
+
+       Copies, e.g. in simulator snapshots, only hold the used values and
+       allocate the full capacity when they are loaded with a new block.
+    """
+    def __init__(self, capacity, dtype=float):
+        self.capacity = capacity
+        self.data = np.zeros(capacity, dtype=dtype)
+        self.output = np.zeros(capacity, dtype=dtype)
+        self.length = 0
+
+    def _reserve(self, length):
+        if length > len(self.data):
+            self.data = np.zeros(max(length, self.capacity), dtype=self.data.dtype)
+
+    # Load new values, e.g. the coded bits of a new transport block
+    def load(self, values):
+        self._reserve(len(values))
+        self.length = len(values)
+        self.data[:self.length] = values
+
+    # Clear the buffer and set its length
+    def reset(self, length):
+        self._reserve(length)
+        self.length = length
+        self.data[:length] = 0
+
+    def values(self):
+        return self.data[:self.length]
+
+    # Copy of the used values of the buffer, sharing the output array
+    def copy(self):
+        copied = CircularBuffer.__new__(CircularBuffer)
+        copied.capacity = self.capacity
+        copied.data = self.data[:self.length].copy()
+        copied.output = self.output
+        copied.length = self.length
+
+        return copied
+
+    # Overwrite the contents with those of another buffer
+    def copy_from(self, other):
+        self._reserve(other.length)
+        self.length = other.length
+        self.data[:self.length] = other.data[:other.length]
+
+    ''' Read nrof_values values starting from index, wrapping around the end
+        of the buffer as many times as needed.
+    '''
+    def read(self, index, nrof_values):
+        if (index + nrof_values) <= self.length:
+            return self.data[index:index + nrof_values]
+
+        if nrof_values > len(self.output):
+            self.output = np.zeros(nrof_values, dtype=self.data.dtype)
+
+        output = self.output[:nrof_values]
+        position = index
+        nrof_read_values = 0
+        while nrof_read_values < nrof_values:
+            nrof_chunk_values = min(nrof_values - nrof_read_values, self.length - position)
+            output[nrof_read_values:nrof_read_values + nrof_chunk_values] = self.data[position:position + nrof_chunk_values]
+            nrof_read_values += nrof_chunk_values
+            position = 0
+
+        return output
+
+    ''' Add values to the buffer starting from index. If there are more values,
+        wrap around the buffer and continue adding from start of the buffer.
+    '''
+    def accumulate(self, index, values):
+        nrof_values = len(values)
+        position = index
+        nrof_added_values = 0
+        while nrof_added_values < nrof_values:
+            nrof_chunk_values = min(nrof_values - nrof_added_values, self.length - position)
+            self.data[position:position + nrof_chunk_values] += values[nrof_added_values:nrof_added_values + nrof_chunk_values]
+            nrof_added_values += nrof_chunk_values
+            position = 0
+
+class PyItppCircularBuffer():
+    """
+       Circular buffer held in a py_itpp vector (pyp.vec), used for the
+       receive HARQ buffers that are passed to the py_itpp decoder as they
+       are. Accumulation adds each contiguous part of the values with one
+       py_itpp slice operation, so the soft values are not converted between
+       NumPy and py_itpp. The vector is only resized when a transport block
+       of another length starts.
+    """
+    def __init__(self, vector_type=pyp.vec):
+        self.vector_type = vector_type
+        self.data = vector_type()
+        self.length = 0
+
+    # Clear the buffer and set its length
+    def reset(self, length):
+        if length != self.length:
+            self.data.set_size(length, False)
+            self.length = length
+        self.data.clear()
+
+    def values(self):
+        return self.data
+
+    # Copy of the buffer with its own vector
+    def copy(self):
+        copied = PyItppCircularBuffer(self.vector_type)
+        copied.copy_from(self)
+
+        return copied
+
+    # Overwrite the contents with those of another buffer
+    def copy_from(self, other):
+        self.data = other.data.left(other.length)
+        self.length = other.length
+
+    ''' Add values (a py_itpp vector) to the buffer starting from index. If
+        there are more values, wrap around the buffer and continue adding
+        from start of the buffer.
+    '''
+    def accumulate(self, index, values):
+        nrof_values = values.length()
+        position = index
+        nrof_added_values = 0
+        while nrof_added_values < nrof_values:
+            nrof_chunk_values = min(nrof_values - nrof_added_values, self.length - position)
+            self.data.set_subvector(position, self.data.mid(position, nrof_chunk_values) + values.mid(nrof_added_values, nrof_chunk_values))
+            nrof_added_values += nrof_chunk_values
+            position = 0
@@ -0,0 +1,127 @@
+import numpy as np
+from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+
+# Sample offsets, relative to the preceding update, of the channel updates used by each interpolation method
+INTERPOLATION_UPDATE_OFFSETS = {'linear': np.array([0, 1]),
+                                'cubic':  np.array([-1, 0, 1, 2])}
+
+''' Normalized autocorrelation of Rayleigh fading with the Jakes Doppler
+    spectrum, J0(2 pi fd tau), at the given time lags in seconds.
+'''
+def calculate_jakes_autocorrelation(doppler_frequency, time_lags, nrof_integration_points=64):
+    # Bessel function J0(x) = 1/pi * integral over [0, pi] of cos(x sin(theta))
+    theta = (np.arange(nrof_integration_points) + 0.5) * np.pi / nrof_integration_points
+    x = 2 * np.pi * doppler_frequency * np.asarray(time_lags, dtype=float)
+
+    return np.cos(x[..., np.newaxis] * np.sin(theta)).mean(axis=-1)
+
+''' Weights of the channel updates at INTERPOLATION_UPDATE_OFFSETS for a point
+    at the given fraction (0 to 1) of the update interval: linear, or cubic
+    Lagrange interpolation over the two updates on each side. Other update
+    offsets can be given as offsets.
+'''
+def calculate_interpolation_weights(fraction, method='linear', offsets=None):
+    if method not in INTERPOLATION_UPDATE_OFFSETS:
+        raise ValueError('Unsupported interpolation method %s'%(method))
+
+    if offsets is None:
+        offsets = INTERPOLATION_UPDATE_OFFSETS[method]
+    fraction = np.asarray(fraction, dtype=float)[..., np.newaxis]
+
+    weights = np.ones(fraction.shape[:-1] + (len(offsets),))
+    for j, offset in enumerate(offsets):
+        for other_offset in offsets[offsets != offset]:
+            weights[..., j] *= (fraction[..., 0] - other_offset) / (offset - other_offset)
+
+    return weights
+
+''' Mean square error of the interpolated channel, relative to the channel
+    power, averaged over the subframes of an update interval. The fading is
+    assumed to have the Jakes spectrum of the given Doppler frequency.
+'''
+def calculate_interpolation_error(doppler_frequency, update_interval, method='linear', subframe_duration=CONFIG.SUBFRAME_DURATION):
+    offsets = INTERPOLATION_UPDATE_OFFSETS[method]
+    fractions = np.arange(update_interval) / float(update_interval)
+    weights = calculate_interpolation_weights(fractions, method)
+
+    # Times of the updates and of the interpolated subframes, in seconds
+    update_times = offsets * update_interval * subframe_duration
+    times = fractions * update_interval * subframe_duration
+
+    # E|h(t) - sum_j w_j h(t_j)|^2 = 1 - 2 sum_j w_j R(t - t_j) + sum_jk w_j w_k R(t_j - t_k)
+    cross_correlation = calculate_jakes_autocorrelation(doppler_frequency, times[:, np.newaxis] - update_times)
+    update_correlation = calculate_jakes_autocorrelation(doppler_frequency, update_times[:, np.newaxis] - update_times)
+
+    errors = 1.0 - 2.0 * (weights * cross_correlation).sum(axis=-1) + np.einsum('ij,jk,ik->i', weights, update_correlation, weights)
+
+    return float(np.maximum(errors, 0.0).mean())
+
+''' Largest channel update interval in subframes, up to max_update_interval,
+    for which the interpolation error is at most accuracy (the mean square
+    error relative to the channel power, e.g. 1e-3 for -30 dB).
+'''
+def determine_channel_update_interval(doppler_frequency, accuracy, method='linear', max_update_interval=1000):
+    update_interval = 1
+    while update_interval < max_update_interval and calculate_interpolation_error(doppler_frequency, update_interval + 1, method) <= accuracy:
+        update_interval += 1
+
+    return update_interval
+
+class InterpolatedChannel():
+    """
+       Channel coefficients of all UEs, generated every update_interval
+       subframes by calculate_frequency_responses(subframe_index) and
+       interpolated linearly or with cubic Lagrange polynomials in between.
+
+       The fading channels are deterministic functions of the subframe
+       index, so the updates can be generated in any order; the most recent
+       ones are kept for the following subframes.
+    """
+    def __init__(self, calculate_frequency_responses, update_interval, method='linear'):
+        if method not in INTERPOLATION_UPDATE_OFFSETS:
+            raise ValueError('Unsupported interpolation method %s'%(method))
+
+        self.calculate_frequency_responses = calculate_frequency_responses
+        self.update_interval = update_interval
+        self.method = method
+        self.offsets = INTERPOLATION_UPDATE_OFFSETS[method]
+
+        fractions = np.arange(update_interval) / float(update_interval)
+        self.weights = calculate_interpolation_weights(fractions, method)
+
+        # The first interval has no update before it, so the cubic interpolation uses the following updates instead
+        self.first_offsets = self.offsets - self.offsets[0]
+        self.first_weights = calculate_interpolation_weights(fractions, method, self.first_offsets)
+        self.updates = {} # update index -> channel coefficients of all UEs
+
+    def _get_update(self, update_index):
+        if update_index not in self.updates:
+            self.updates[update_index] = np.asarray(self.calculate_frequency_responses(update_index * self.update_interval))
+
+        return self.updates[update_index]
+
+    ''' Returns an array of shape (nrof_ues, nrof_subcarriers) with the channel
+        coefficients of all UEs in the given subframe.
+    '''
+    def get_frequency_responses(self, subframe_index):
+        update_index, offset = divmod(subframe_index, self.update_interval)
+        if offset == 0:
+            return self._get_update(update_index)
+
+        if update_index + self.offsets[0] < 0:
+            update_indices = update_index + self.first_offsets
+            weights = self.first_weights[offset]
+        else:
+            update_indices = update_index + self.offsets
+            weights = self.weights[offset]
+
+        updates = [self._get_update(index) for index in update_indices]
+
+        # Release the updates that have been interpolated past
+        self.updates = {index: update for index, update in self.updates.items() if index >= update_indices[0]}
+
+        frequency_responses = weights[0] * updates[0]
+        for weight, update in zip(weights[1:], updates[1:]):
+            frequency_responses = frequency_responses + weight * update
+
+        return frequency_responses
@@ -1,6 +1,7 @@
 import py_itpp as pyp
 import numpy as np
 from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+from .array_conversion import as_ndarray
 
 def determine_snr_at_bler_target(awgn_data, bler_target):
     awgn_snr_range_dB = awgn_data['snr_range_dB']
@@ -70,14 +71,42 @@ def get_transmission_parameters_from_cqi(cqi, nrof_resource_blocks, offset=0, ad
         
     return (modulation_order, transport_block_size)
 
+TRANSMISSION_PARAMETER_TABLES = {} # nrof_resource_blocks -> (modulation_order, transport_block_size)
+
+''' Modulation order and transport block size for every CQI with the given
+    grant size, as read-only arrays indexed by CQI. The tables only depend on
+    the system configuration, so they are built on first use and shared.
 '''
+def get_transmission_parameter_table(nrof_resource_blocks):
+    if nrof_resource_blocks not in TRANSMISSION_PARAMETER_TABLES:
+        nrof_cqi = len(CONFIG.CQI_INDEX__MODORDER_RATE)
+        transmission_parameters = [get_transmission_parameters_from_cqi(cqi, nrof_resource_blocks) for cqi in range(nrof_cqi)]
+
+        modulation_order, transport_block_size = np.array(transmission_parameters, dtype=int).T.copy()
+        modulation_order.flags.writeable = False
+        transport_block_size.flags.writeable = False
+
+        TRANSMISSION_PARAMETER_TABLES[nrof_resource_blocks] = (modulation_order, transport_block_size)
+
+    return TRANSMISSION_PARAMETER_TABLES[nrof_resource_blocks]
+
+''' Wideband CQI of a single link. eesm_beta holds the EESM calibration factor
+    for each CQI and defaults to 1.0 for all CQIs. The arguments are py_itpp
+    vectors or NumPy arrays, such as the table returned by load_awgn_table;
+    NumPy arguments are handled by the batched implementation.
 '''
-def calculate_wideband_channel_quality_index(channel_coefficients, noise_variance, snr_at_bler_target):
+def calculate_wideband_channel_quality_index(channel_coefficients, noise_variance, snr_at_bler_target, eesm_beta=None):
+    if any(isinstance(values, np.ndarray) for values in [channel_coefficients, snr_at_bler_target, eesm_beta]):
+        if eesm_beta is not None:
+            eesm_beta = as_ndarray(eesm_beta)
+
+        return int(calculate_wideband_channel_quality_index_batch(as_ndarray(channel_coefficients), noise_variance, as_ndarray(snr_at_bler_target), eesm_beta))
     
     nrof_cqi = snr_at_bler_target.length()
     
     eesm_dB = pyp.vec(nrof_cqi)
-    eesm_beta = pyp.ones(nrof_cqi)#[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
+    if eesm_beta is None:
+        eesm_beta = pyp.ones(nrof_cqi)#[1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0]
 
     snr_per_subcarrier = pyp.math.pow(pyp.math.abs(channel_coefficients), 2) * (1.0 / noise_variance)
    
@@ -97,3 +126,49 @@ def calculate_wideband_channel_quality_index(channel_coefficients, noise_varianc
             continue
 
     return 0 # No valid CQI found
+
+''' EESM effective SNR in dB for every link and every CQI. The channel 
+    coefficients have shape (..., nrof_subcarriers), the noise variance is
+    broadcast against the leading dimensions and eesm_beta holds one
+    calibration factor per CQI. Returns an array of shape (..., nrof_cqi).
+
+    The EESM is evaluated once per distinct beta value, and the operations
+    follow the same order as calculate_wideband_channel_quality_index (the
+    mean is a sequential sum), so the results agree with it exactly up to the
+    last-bit accuracy of exp and log.
+'''
+def calculate_effective_snr_dB(channel_coefficients, noise_variance, eesm_beta):
+    eesm_beta = np.asarray(eesm_beta, dtype=float)
+    distinct_beta, cqi_to_distinct_beta = np.unique(eesm_beta, return_inverse=True)
+
+    channel_coefficients = np.asarray(channel_coefficients)
+    nrof_subcarriers = channel_coefficients.shape[-1]
+    snr_per_subcarrier = np.abs(channel_coefficients) ** 2 * (1.0 / np.asarray(noise_variance, dtype=float))[..., np.newaxis]
+
+    # Shape (..., nrof_distinct_beta, nrof_subcarriers)
+    v = np.exp(-1.0 * snr_per_subcarrier[..., np.newaxis, :] / distinct_beta[:, np.newaxis])
+    mean_v = np.cumsum(v, axis=-1)[..., -1] / nrof_subcarriers
+    eesm_value = -1.0 * distinct_beta * np.log(mean_v)
+    with np.errstate(divide='ignore'):
+        eesm_dB = 10.0 * np.log10(eesm_value)
+
+    return eesm_dB[..., cqi_to_distinct_beta.reshape(-1)]
+
+''' Batched wideband CQI calculation over any number of links, e.g. a
+    (nrof_ues, nrof_subcarriers) array of channel coefficients. Returns the
+    same CQIs as calling calculate_wideband_channel_quality_index per link.
+'''
+def calculate_wideband_channel_quality_index_batch(channel_coefficients, noise_variance, snr_at_bler_target, eesm_beta=None):
+    snr_at_bler_target = np.asarray(snr_at_bler_target, dtype=float)
+    nrof_cqi = snr_at_bler_target.shape[0]
+
+    if eesm_beta is None:
+        eesm_beta = np.ones(nrof_cqi)
+
+    eesm_dB = calculate_effective_snr_dB(channel_coefficients, noise_variance, eesm_beta)
+
+    # Find the largest CQI whose SNR at the BLER target is below the EESM
+    valid_cqi = snr_at_bler_target < eesm_dB
+    largest_valid_cqi = nrof_cqi - 1 - np.argmax(valid_cqi[..., ::-1], axis=-1)
+
+    return np.where(np.any(valid_cqi, axis=-1), largest_valid_cqi, 0)
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import numpy as np
+from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+from .radio_channel import calculate_channel_frequency_response
+
+''' Returns the name of the cache directory for the given channel parameters.
+    The key should hold everything that determines the fading realization,
+    e.g. seed, number of UEs, channel profile and relative speed.
+'''
+def channel_trace_key_hash(key):
+    key_string = json.dumps(key, sort_keys=True)
+
+    return hashlib.sha1(key_string.encode('utf-8')).hexdigest()[:16]
+
+class ChannelTraceCache():
+    """
+       Precomputed per-UE channel frequency responses, stored in blocks of
+       block_size subframes as memory-mapped .npy files of shape
+       (block_size, nrof_ues, nrof_subcarriers).
+
+       Missing blocks are generated from the given (initialized) fading
+       channels by a background thread, which also prefetches the blocks
+       following the one being read. Once a block is on disk it is shared by
+       every later simulation with the same key and read with zero-copy views.
+       An error while generating a block is raised when the block is read.
+    """
+    def __init__(self, cache_dir, channels, key, block_size=1000, nrof_prefetch_blocks=1, nrof_resource_blocks=CONFIG.NROF_TOTAL_PRBS):
+        self.channels = channels
+        self.nrof_ues = len(channels)
+        self.nrof_resource_blocks = nrof_resource_blocks
+        self.nrof_subcarriers = CONFIG.SUBCARRIERS_PER_PRB * nrof_resource_blocks
+        self.block_size = block_size
+        self.nrof_prefetch_blocks = nrof_prefetch_blocks
+
+        self.trace_dir = os.path.join(cache_dir, channel_trace_key_hash(key))
+        if not os.path.exists(self.trace_dir):
+            os.makedirs(self.trace_dir)
+
+        key_filepath = os.path.join(self.trace_dir, 'key.json')
+        if not os.path.exists(key_filepath):
+            with open(key_filepath, 'w') as f:
+                json.dump(key, f, sort_keys=True)
+
+        self.blocks = {} # block index -> memory-mapped block
+        self.requested_blocks = []
+        self.errors = {} # block index -> exception raised while generating the block
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self._fill_requested_blocks, daemon=True)
+        self.thread.start()
+
+    def _block_filepath(self, block_index):
+        return os.path.join(self.trace_dir, 'BLOCK_%06d.npy'%(block_index))
+
+    def _request_block(self, block_index):
+        with self.condition:
+            if block_index not in self.requested_blocks and block_index not in self.errors and not os.path.exists(self._block_filepath(block_index)):
+                self.requested_blocks.append(block_index)
+                self.condition.notify_all()
+
+    # Background thread: generate the requested blocks in the order they were requested
+    def _fill_requested_blocks(self):
+        while True:
+            with self.condition:
+                while not self.requested_blocks and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                block_index = self.requested_blocks[0]
+
+            try:
+                self._generate_block(block_index)
+            except Exception as e:
+                with self.condition:
+                    self.errors[block_index] = e
+
+            with self.condition:
+                self.requested_blocks.remove(block_index)
+                self.condition.notify_all()
+
+    def _generate_block(self, block_index):
+        filepath = self._block_filepath(block_index)
+
+        # The temporary file is unique, as other simulations may fill the same block at the same time
+        fd, temp_filepath = tempfile.mkstemp(suffix='.tmp', prefix='BLOCK_%06d_'%(block_index), dir=self.trace_dir)
+        os.close(fd)
+        try:
+            block = np.lib.format.open_memmap(temp_filepath, mode='w+', dtype=complex, shape=(self.block_size, self.nrof_ues, self.nrof_subcarriers))
+            first_subframe_index = block_index * self.block_size
+            for offset in range(self.block_size):
+                if self.closed:
+                    del block
+                    os.remove(temp_filepath)
+                    return
+                for ue_index in range(self.nrof_ues):
+                    channel_coefficients = calculate_channel_frequency_response(self.channels[ue_index], first_subframe_index + offset, self.nrof_resource_blocks)
+                    block[offset, ue_index] = channel_coefficients.to_numpy_ndarray()
+            block.flush()
+            del block
+
+            # Only complete blocks get the final name, so an interrupted fill is regenerated
+            os.replace(temp_filepath, filepath)
+        except BaseException:
+            if os.path.exists(temp_filepath):
+                os.remove(temp_filepath)
+            raise
+
+    def _load_block(self, block_index):
+        filepath = self._block_filepath(block_index)
+
+        self._request_block(block_index)
+        with self.condition:
+            while not os.path.exists(filepath) and block_index not in self.errors and not self.closed:
+                self.condition.wait()
+
+            if block_index in self.errors:
+                raise self.errors.pop(block_index)
+            if self.closed:
+                raise RuntimeError('Channel trace cache is closed')
+
+        for prefetch_block_index in range(block_index + 1, block_index + 1 + self.nrof_prefetch_blocks):
+            self._request_block(prefetch_block_index)
+
+        # Release the blocks that have been read past
+        self.blocks = {index: block for index, block in self.blocks.items() if index >= block_index}
+        self.blocks[block_index] = np.load(filepath, mmap_mode='r')
+
+        return self.blocks[block_index]
+
+    ''' Returns a read-only view of shape (nrof_ues, nrof_subcarriers) with the
+        channel coefficients of all UEs in the given subframe.
+    '''
+    def get_frequency_responses(self, subframe_index):
+        block_index, offset = divmod(subframe_index, self.block_size)
+
+        block = self.blocks.get(block_index)
+        if block is None:
+            block = self._load_block(block_index)
+
+        return block[offset]
+
+    ''' Stop the background thread, abandoning a partly generated block, and
+        release the memory-mapped blocks.
+    '''
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+        self.blocks = {}
@@ -0,0 +1,142 @@
+import numpy as np
+import py_itpp as pyp
+from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+from .array_conversion import *
+from .baseband_processing import *
+from .buffer_manipulation import *
+from .channel_quality_index import calculate_nrof_transmit_bits
+from .radio_channel import propagate_transmit_bits_over_channel
+
+''' Length of the largest coded transport block for the given grant size, for
+    the rate 1/3 convolutional code with constraint length 7 (6 tail bits).
+'''
+def calculate_max_coded_block_length(nrof_resource_blocks=1):
+    max_transport_block_size = max(CONFIG.VALID_TBS[nrof_resource_blocks])
+
+    return 3 * (max_transport_block_size + 6)
+
+''' Create the per-UE buffers used by the bit-level HARQ processing. The dict
+    is indexed as state[key][ue_index], matching the scheduler state, apart
+    from the conversion vectors shared by all UEs. The
+    transmit HARQ buffers are NumPy circular buffers preallocated for the
+    largest coded block, read by the NumPy baseband. The py_itpp baseband
+    reads the same bits from the coded py_itpp vector, and the soft values
+    are combined in py_itpp vectors that are passed to the decoder as they
+    are. The packet data is not stored here, see StreamingTrafficSource.
+'''
+def setup_harq_state_variables(nrof_ues):
+    harq_buffer_capacity = calculate_max_coded_block_length()
+
+    state = {}
+    state['current_harq_buffer_index']   = [0 for ue_index in range(nrof_ues)]
+    state['next_harq_buffer_index']      = [0 for ue_index in range(nrof_ues)]
+
+    state['transmit_harq_buffer']        = [CircularBuffer(harq_buffer_capacity, np.uint8) for ue_index in range(nrof_ues)] # Transmit bits before modulation
+    state['receive_harq_buffer']         = [PyItppCircularBuffer(pyp.vec) for ue_index in range(nrof_ues)]  # Receive soft value after demodulation
+
+    state['coded_bits']                  = [pyp.bvec() for ue_index in range(nrof_ues)]
+    state['interleaver_sequence']        = [pyp.ivec() for ue_index in range(nrof_ues)]
+    state['transport_bits']              = [np.zeros(0, dtype=np.uint8) for ue_index in range(nrof_ues)]
+
+    # Soft values received from the NumPy baseband are copied into these vectors before they are combined
+    state['receive_soft_vectors']        = PyItppVectorCache(pyp.vec, float)
+
+    return state
+
+''' Copy of the bit-level HARQ state. The coded bits, interleaver sequences
+    and transport bits are replaced, never modified, when a new transport
+    block starts, so they are shared with the copy. The HARQ buffers are
+    copied with their used values only, and the conversion vectors, which
+    only hold values during a call, are shared.
+'''
+def copy_harq_state_variables(state):
+    copied_state = {}
+    copied_state['current_harq_buffer_index']   = list(state['current_harq_buffer_index'])
+    copied_state['next_harq_buffer_index']      = list(state['next_harq_buffer_index'])
+
+    copied_state['transmit_harq_buffer']        = [harq_buffer.copy() for harq_buffer in state['transmit_harq_buffer']]
+    copied_state['receive_harq_buffer']         = [harq_buffer.copy() for harq_buffer in state['receive_harq_buffer']]
+
+    copied_state['coded_bits']                  = list(state['coded_bits'])
+    copied_state['interleaver_sequence']        = list(state['interleaver_sequence'])
+    copied_state['transport_bits']              = list(state['transport_bits'])
+
+    copied_state['receive_soft_vectors']        = state['receive_soft_vectors']
+
+    return copied_state
+
+''' Overwrite the bit-level HARQ state with the contents of another HARQ state
+    for the same number of UEs, reusing the existing buffers.
+'''
+def restore_harq_state_variables(state, source_state):
+    state['current_harq_buffer_index'][:]   = source_state['current_harq_buffer_index']
+    state['next_harq_buffer_index'][:]      = source_state['next_harq_buffer_index']
+
+    for harq_buffer, source_harq_buffer in zip(state['transmit_harq_buffer'], source_state['transmit_harq_buffer']):
+        harq_buffer.copy_from(source_harq_buffer)
+    for harq_buffer, source_harq_buffer in zip(state['receive_harq_buffer'], source_state['receive_harq_buffer']):
+        harq_buffer.copy_from(source_harq_buffer)
+
+    state['coded_bits'][:]                  = source_state['coded_bits']
+    state['interleaver_sequence'][:]        = source_state['interleaver_sequence']
+    state['transport_bits'][:]              = source_state['transport_bits']
+
+''' Encode the transport bits (a NumPy array, e.g. from the traffic source) of
+    a new transport block for the UE and reset the transmit and receive HARQ
+    buffers. The optional PHY context provides cached codec, modulator and
+    interleaver objects.
+'''
+def start_new_transport_block(state, ue_index, transport_bits, phy_context=None):
+    state['transport_bits'][ue_index] = transport_bits
+
+    coded_bits, state['interleaver_sequence'][ue_index] = channel_encode_and_interleave_bits(to_bvec(transport_bits), phy_context)
+    state['coded_bits'][ue_index] = coded_bits
+
+    state['transmit_harq_buffer'][ue_index].load(coded_bits.to_numpy_ndarray())
+    state['receive_harq_buffer'][ue_index].reset(coded_bits.length())
+
+''' Extract the bits of the next HARQ transmission from the UE's HARQ buffer,
+    as a NumPy array valid until the next transmission.
+'''
+def extract_harq_transmit_bits(state, ue_index, modulation_order, nrof_resource_blocks):
+    nrof_transmit_bits = calculate_nrof_transmit_bits(modulation_order, nrof_resource_blocks)
+
+    transmit_harq_buffer = state['transmit_harq_buffer'][ue_index]
+    transmit_bits = transmit_harq_buffer.read(state['current_harq_buffer_index'][ue_index], nrof_transmit_bits)
+
+    state['next_harq_buffer_index'][ue_index] = (state['current_harq_buffer_index'][ue_index] + nrof_transmit_bits) % transmit_harq_buffer.length
+
+    return transmit_bits
+
+''' The transmit bits of the UE as a py_itpp binary vector, for the py_itpp
+    baseband. The bits are read from the coded py_itpp vector with py_itpp
+    operations instead of being copied from the NumPy transmit bits.
+'''
+def convert_harq_transmit_bits(state, ue_index, transmit_bits):
+    return extract_next_bits_with_wraparound(state['coded_bits'][ue_index], state['current_harq_buffer_index'][ue_index], len(transmit_bits))
+
+''' Soft combine the received values (a py_itpp vector, or a NumPy array from
+    the NumPy baseband) in the UE's receive HARQ buffer and try to decode the
+    transport block. Returns True if it was decoded correctly.
+'''
+def combine_and_decode_harq_block(state, ue_index, received_soft_values, phy_context=None):
+    if isinstance(received_soft_values, np.ndarray):
+        received_soft_values = state['receive_soft_vectors'].copy(received_soft_values)
+
+    receive_harq_buffer = state['receive_harq_buffer'][ue_index]
+    receive_harq_buffer.accumulate(state['current_harq_buffer_index'][ue_index], received_soft_values)
+
+    decoded_bits = deinterleave_and_channel_decode_symbols(receive_harq_buffer.values(), state['interleaver_sequence'][ue_index], phy_context)
+
+    return np.array_equal(decoded_bits.to_numpy_ndarray(), state['transport_bits'][ue_index])
+
+''' Transmit the next part of the UE's HARQ buffer over the channel, soft combine
+    the received values and try to decode the transport block. Returns True if
+    the transport block was decoded correctly.
+'''
+def transmit_harq_block(state, ue_index, modulation_order, nrof_resource_blocks, channel_coefficients, noise_variance, phy_context=None):
+    transmit_bits = extract_harq_transmit_bits(state, ue_index, modulation_order, nrof_resource_blocks)
+
+    received_soft_values = propagate_transmit_bits_over_channel(convert_harq_transmit_bits(state, ue_index, transmit_bits), modulation_order, nrof_resource_blocks, channel_coefficients, noise_variance, phy_context)
+
+    return combine_and_decode_harq_block(state, ue_index, received_soft_values, phy_context)
@@ -0,0 +1,102 @@
+import time
+import numpy as np
+
+# Scheduling decision and HARQ outcome of one transmission
+EVENT_DTYPE = np.dtype([('subframe_index',          np.int64),
+                        ('env_index',               np.int32),
+                        ('ue_index',                np.int32),
+                        ('cqi',                     np.int16),
+                        ('harq_transmission_index', np.int16),
+                        ('transport_block_size',    np.int32), # 0 if the UE was out of range and skipped
+                        ('decoded',                 np.bool_)])
+
+class Instrumentation():
+    """
+       Per-stage timers and an event trace for the simulator hot path.
+
+       verbosity 0 disables the instrumentation: start() and stop() return
+       immediately and no events are recorded. With verbosity 1, the time
+       spent in each stage is accumulated and the scheduling decisions and
+       HARQ outcomes are kept in a ring buffer of the last event_trace_size
+       events. Verbosity 2 also prints a line per scheduled transmission.
+
+       Typical stages are 'channel', 'cqi', 'scheduling',
+       'encode_interleave', 'modulation_channel', 'decode' and
+       'link_abstraction'.
+    """
+    def __init__(self, verbosity=0, event_trace_size=4096):
+        self.verbosity = verbosity
+        self.enabled = verbosity > 0
+        self.event_trace_size = event_trace_size
+
+        self.reset()
+
+    def reset(self):
+        self.stage_time = {}  # stage -> accumulated time in seconds
+        self.stage_count = {} # stage -> number of timed calls
+
+        self.events = np.zeros(self.event_trace_size if self.enabled else 0, dtype=EVENT_DTYPE)
+        self.nrof_events = 0 # Number of events recorded so far, including overwritten events
+
+    ''' Returns the start time of a timed stage, to be passed to stop().
+    '''
+    def start(self):
+        if not self.enabled:
+            return 0.0
+
+        return time.perf_counter()
+
+    def stop(self, stage, start_time):
+        if not self.enabled:
+            return
+
+        self.stage_time[stage] = self.stage_time.get(stage, 0.0) + (time.perf_counter() - start_time)
+        self.stage_count[stage] = self.stage_count.get(stage, 0) + 1
+
+    ''' Record the transmissions of one subframe. The arguments are scalars for
+        a single cell, or arrays with one element per cell.
+    '''
+    def record_events(self, subframe_index, env_index, ue_index, cqi, harq_transmission_index, transport_block_size, decoded):
+        if not self.enabled:
+            return
+
+        if self.verbosity > 1:
+            for env, ue, ue_cqi, harq_index, tbs in np.broadcast(env_index, ue_index, cqi, harq_transmission_index, transport_block_size):
+                if tbs == 0:
+                    print('Subframe %d, Cell %d, Scheduled UE: %d, CQI: %d, out of range, skipping!'%(subframe_index, env, ue, ue_cqi))
+                else:
+                    print('Subframe %d, Cell %d, Scheduled UE: %d, CQI: %d, HARQ Transmission Index %d'%(subframe_index, env, ue, ue_cqi, harq_index))
+
+        nrof_new_events = np.broadcast(env_index, ue_index).size
+        trace_index = (self.nrof_events + np.arange(nrof_new_events)) % self.event_trace_size
+
+        events = self.events
+        events['subframe_index'][trace_index] = subframe_index
+        events['env_index'][trace_index] = env_index
+        events['ue_index'][trace_index] = ue_index
+        events['cqi'][trace_index] = cqi
+        events['harq_transmission_index'][trace_index] = harq_transmission_index
+        events['transport_block_size'][trace_index] = transport_block_size
+        events['decoded'][trace_index] = decoded
+
+        self.nrof_events += nrof_new_events
+
+    ''' Returns the recorded events still held in the ring buffer, oldest first,
+        as a NumPy structured array with EVENT_DTYPE.
+    '''
+    def get_event_trace(self):
+        if self.nrof_events <= self.event_trace_size:
+            return self.events[:self.nrof_events].copy()
+
+        first_index = self.nrof_events % self.event_trace_size
+
+        return np.concatenate((self.events[first_index:], self.events[:first_index]))
+
+    def save_event_trace(self, filepath):
+        np.save(filepath, self.get_event_trace())
+
+    ''' Returns a dict mapping each timed stage to (total time in seconds,
+        number of calls, mean time per call in seconds).
+    '''
+    def get_stage_timing(self):
+        return {stage: (self.stage_time[stage], self.stage_count[stage], self.stage_time[stage] / self.stage_count[stage]) for stage in self.stage_time}
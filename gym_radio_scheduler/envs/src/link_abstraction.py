@@ -0,0 +1,58 @@
+import numpy as np
+
+''' EESM effective SNR in dB of each link for its own calibration factor beta.
+    The channel coefficients have shape (..., nrof_subcarriers), and the noise
+    variance and beta are broadcast against the leading dimensions.
+'''
+def calculate_link_effective_snr_dB(channel_coefficients, noise_variance, eesm_beta):
+    channel_coefficients = np.asarray(channel_coefficients)
+    eesm_beta = np.asarray(eesm_beta, dtype=float)
+    nrof_subcarriers = channel_coefficients.shape[-1]
+
+    snr_per_subcarrier = np.abs(channel_coefficients) ** 2 * (1.0 / np.asarray(noise_variance, dtype=float))[..., np.newaxis]
+
+    v = np.exp(-1.0 * snr_per_subcarrier / eesm_beta[..., np.newaxis])
+    mean_v = np.cumsum(v, axis=-1)[..., -1] / nrof_subcarriers
+    eesm_value = -1.0 * eesm_beta * np.log(mean_v)
+    with np.errstate(divide='ignore'):
+        return 10.0 * np.log10(eesm_value)
+
+''' Block error rate of transmissions with the given CQIs at the given SNRs,
+    linearly interpolated from the AWGN SNR-vs-BLER curves. SNRs outside the
+    simulated range use the BLER at the nearest end of the range.
+'''
+def calculate_block_error_rate(awgn_data, cqi, snr_dB):
+    snr_range_dB = awgn_data['snr_range_dB']
+    snr_vs_bler = awgn_data['snr_vs_bler']
+
+    snr_dB = np.clip(snr_dB, snr_range_dB[0], snr_range_dB[-1])
+
+    index = np.clip(np.searchsorted(snr_range_dB, snr_dB, side='right') - 1, 0, len(snr_range_dB) - 2)
+    weight = (snr_dB - snr_range_dB[index]) / (snr_range_dB[index + 1] - snr_range_dB[index])
+
+    return (1.0 - weight) * snr_vs_bler[index, cqi] + weight * snr_vs_bler[index + 1, cqi]
+
+''' Decide the outcome of HARQ transmissions from the link abstraction instead
+    of the bit-level encode/modulate/decode chain.
+
+    The EESM effective SNR of every transmission is added (in linear scale) to
+    the SNR accumulated by the earlier transmissions of the same transport
+    block, which models chase combining. The block is decoded with probability
+    1 - BLER, where the BLER is looked up for the CQI of the grant at the
+    combined SNR. Works on single links and on arrays of links.
+
+    Returns (decoded, combined_snr), where combined_snr is the new linear SNR
+    accumulated for the transport block.
+'''
+def transmit_abstracted_harq_block(awgn_data, cqi, channel_coefficients, noise_variance, eesm_beta, accumulated_snr, rng):
+    effective_snr_dB = calculate_link_effective_snr_dB(channel_coefficients, noise_variance, eesm_beta)
+
+    combined_snr = accumulated_snr + 10 ** (0.1 * effective_snr_dB)
+    with np.errstate(divide='ignore'):
+        combined_snr_dB = 10.0 * np.log10(combined_snr)
+
+    block_error_rate = calculate_block_error_rate(awgn_data, cqi, combined_snr_dB)
+
+    decoded = rng.random(np.shape(block_error_rate)) >= block_error_rate
+
+    return (decoded, combined_snr)
@@ -0,0 +1,168 @@
+import numpy as np
+from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+from .channel_interpolation import calculate_jakes_autocorrelation
+
+# ITU-R M.1225 tapped delay line profiles: (tap delays in s, average tap powers in dB)
+ITU_CHANNEL_PROFILES = {'ITU_Pedestrian_A': ([0.0, 110e-9, 190e-9, 410e-9],
+                                             [0.0, -9.7, -19.2, -22.8]),
+                        'ITU_Pedestrian_B': ([0.0, 200e-9, 800e-9, 1200e-9, 2300e-9, 3700e-9],
+                                             [0.0, -0.9, -4.9, -8.0, -7.8, -23.9]),
+                        'ITU_Vehicular_A':  ([0.0, 310e-9, 710e-9, 1090e-9, 1730e-9, 2510e-9],
+                                             [0.0, -1.0, -9.0, -10.0, -15.0, -20.0]),
+                        'ITU_Vehicular_B':  ([0.0, 300e-9, 8900e-9, 12900e-9, 17100e-9, 20000e-9],
+                                             [-2.5, 0.0, -12.8, -10.0, -25.2, -16.0])}
+
+''' Maximum Doppler frequency in Hz at the carrier frequency.
+'''
+def calculate_doppler_frequency(relative_speed):
+    return (CONFIG.CARRIER_FREQUENCY / 3e8) * relative_speed
+
+''' Returns the name of a channel profile given as a name or as a py_itpp
+    CHANNEL_PROFILE value, e.g. 'ITU_Vehicular_B'.
+'''
+def get_channel_profile_name(channel_profile):
+    name = getattr(channel_profile, 'name', str(channel_profile)).split('.')[-1]
+
+    if name not in ITU_CHANNEL_PROFILES:
+        raise ValueError('Unsupported channel profile %s'%(name))
+
+    return name
+
+''' Round the tap delays to the sampling grid, add the powers of taps with the
+    same discrete delay and normalize the total power to 1, as the py_itpp
+    TDL_Channel does. Returns (discrete delays in samples, tap amplitudes).
+'''
+def discretize_channel_profile(channel_profile, sampling_interval=CONFIG.SAMPLING_INTERVAL):
+    delays, powers_dB = ITU_CHANNEL_PROFILES[get_channel_profile_name(channel_profile)]
+
+    delay_samples = np.rint(np.array(delays) / sampling_interval).astype(int)
+    discrete_delays, tap_index = np.unique(delay_samples, return_inverse=True)
+
+    discrete_powers = np.bincount(tap_index, weights=10 ** (0.1 * np.array(powers_dB)))
+    discrete_powers /= discrete_powers.sum()
+
+    return (discrete_delays, np.sqrt(discrete_powers))
+
+class NumpyTdlChannel():
+    """
+       Rayleigh fading tapped delay line channels for all UEs, generated in
+       NumPy as an alternative to one py_itpp TDL_Channel per UE.
+
+       Every tap of every UE is a sum of nrof_sinusoids complex sinusoids with
+       random phases and angles of arrival stratified over the circle, so its
+       Doppler spectrum approaches the Jakes spectrum for the maximum Doppler
+       frequency of relative_speed. The random numbers are drawn from rng at
+       construction, after which the channels are deterministic functions of
+       the subframe index, as with the py_itpp channels.
+
+       The frequency responses are computed over nrof_subcarriers-point DFTs
+       of the discrete tap delays, which is what calc_frequency_response does
+       for the py_itpp channels.
+    """
+    nrof_elements_per_chunk = 1 << 22 # Size of the temporary sinusoid arrays
+
+    def __init__(self, nrof_ues, channel_profile, relative_speed, rng, nrof_sinusoids=16, block_size=100, nrof_resource_blocks=CONFIG.NROF_TOTAL_PRBS):
+        self.nrof_ues = nrof_ues
+        self.nrof_sinusoids = nrof_sinusoids
+        self.block_size = block_size
+        self.nrof_subcarriers = CONFIG.SUBCARRIERS_PER_PRB * nrof_resource_blocks
+        self.doppler_frequency = calculate_doppler_frequency(relative_speed)
+
+        tap_delays, self.tap_amplitudes = discretize_channel_profile(channel_profile)
+        if tap_delays[-1] >= self.nrof_subcarriers:
+            raise ValueError('Channel profile %s is longer than %d samples'%(get_channel_profile_name(channel_profile), self.nrof_subcarriers))
+
+        # DFT of each tap over the subcarriers, with shape (nrof_taps, nrof_subcarriers)
+        self.tap_frequency_responses = np.exp(-2j * np.pi * np.outer(tap_delays, np.arange(self.nrof_subcarriers)) / self.nrof_subcarriers)
+
+        # Doppler shift and phase of each sinusoid, with shape (nrof_ues, nrof_taps, nrof_sinusoids)
+        shape = (nrof_ues, len(tap_delays), nrof_sinusoids)
+        angles_of_arrival = 2 * np.pi * (np.arange(nrof_sinusoids) + rng.random(shape)) / nrof_sinusoids
+        self.doppler_shifts = self.doppler_frequency * np.cos(angles_of_arrival)
+        self.phases = 2 * np.pi * rng.random(shape)
+
+        self.block_index = None
+        self.block = None
+
+    ''' Returns the channel coefficients of all UEs in nrof_subframes subframes
+        from first_subframe_index, with shape (nrof_ues, nrof_subframes, nrof_subcarriers).
+    '''
+    def calculate_frequency_responses(self, first_subframe_index, nrof_subframes):
+        times = (first_subframe_index + np.arange(nrof_subframes)) * CONFIG.SUBFRAME_DURATION
+
+        nrof_taps = len(self.tap_amplitudes)
+        taps = np.empty((self.nrof_ues, nrof_subframes, nrof_taps), dtype=complex)
+
+        chunk_size = max(1, self.nrof_elements_per_chunk // self.doppler_shifts.size)
+        for start in range(0, nrof_subframes, chunk_size):
+            chunk_times = times[start:start + chunk_size]
+
+            # Phases with shape (nrof_ues, nrof_chunk_subframes, nrof_taps, nrof_sinusoids)
+            phases = self.doppler_shifts[:, np.newaxis] * (2 * np.pi * chunk_times)[:, np.newaxis, np.newaxis] + self.phases[:, np.newaxis]
+            taps[:, start:start + chunk_size] = np.exp(1j * phases).sum(axis=-1)
+
+        taps *= self.tap_amplitudes / np.sqrt(self.nrof_sinusoids)
+
+        return np.matmul(taps, self.tap_frequency_responses)
+
+    ''' Returns a read-only array of shape (nrof_ues, nrof_subcarriers) with the
+        channel coefficients of all UEs in the given subframe. The responses are
+        generated block_size subframes at a time.
+    '''
+    def get_frequency_responses(self, subframe_index):
+        block_index, offset = divmod(subframe_index, self.block_size)
+
+        if block_index != self.block_index:
+            responses = self.calculate_frequency_responses(block_index * self.block_size, self.block_size)
+
+            block = np.ascontiguousarray(responses.transpose(1, 0, 2))
+            block.flags.writeable = False
+
+            self.block_index, self.block = block_index, block
+
+        return self.block[offset]
+
+''' Fading statistics of channel coefficients with shape (nrof_ues,
+    nrof_subframes, nrof_subcarriers), used to validate one channel backend
+    against another. Returns a dict with the mean power, the CDF of the power
+    at power_levels, and the normalized correlation over subframe lags and the
+    magnitude of the normalized correlation over subcarrier separations. With
+    tap_delays, the power of the impulse response at those delays in samples,
+    relative to the mean power, is returned as the power delay profile.
+'''
+def calculate_channel_statistics(channel_coefficients, lags=(1, 10, 50, 100), subcarrier_separations=(1, 6, 12, 36), power_levels=(0.01, 0.1, 0.5, 1.0, 2.0), tap_delays=None):
+    channel_coefficients = np.asarray(channel_coefficients)
+    power = np.abs(channel_coefficients) ** 2
+    mean_power = power.mean()
+
+    time_correlation = [np.mean(channel_coefficients[:, lag:] * np.conj(channel_coefficients[:, :-lag])).real / mean_power for lag in lags]
+    frequency_correlation = [np.abs(np.mean(channel_coefficients[..., separation:] * np.conj(channel_coefficients[..., :-separation]))) / mean_power for separation in subcarrier_separations]
+
+    statistics = {'mean_power': mean_power,
+                  'power_cdf': [np.mean(power / mean_power < level) for level in power_levels],
+                  'time_correlation': time_correlation,
+                  'frequency_correlation': frequency_correlation}
+
+    if tap_delays is not None:
+        # The frequency responses are DFTs of the impulse responses over the subcarriers
+        impulse_response_power = (np.abs(np.fft.ifft(channel_coefficients, axis=-1)) ** 2).mean(axis=(0, 1))
+        statistics['tap_power'] = list(impulse_response_power[np.asarray(tap_delays)] / mean_power)
+
+    return statistics
+
+''' The statistics of calculate_channel_statistics for Rayleigh fading with
+    the Jakes Doppler spectrum and the discretized power delay profile of
+    channel_profile, with unit mean power.
+'''
+def calculate_theoretical_channel_statistics(channel_profile, relative_speed, lags=(1, 10, 50, 100), subcarrier_separations=(1, 6, 12, 36), power_levels=(0.01, 0.1, 0.5, 1.0, 2.0), nrof_subcarriers=CONFIG.NROF_TOTAL_SUBCARRIERS):
+    tap_delays, tap_amplitudes = discretize_channel_profile(channel_profile)
+    tap_powers = tap_amplitudes ** 2
+
+    time_lags = np.asarray(lags) * CONFIG.SUBFRAME_DURATION
+    separations = np.asarray(subcarrier_separations)[:, np.newaxis]
+
+    return {'mean_power': 1.0,
+            'power_cdf': list(1.0 - np.exp(-np.asarray(power_levels))),
+            'time_correlation': list(calculate_jakes_autocorrelation(calculate_doppler_frequency(relative_speed), time_lags, nrof_integration_points=256)),
+            'frequency_correlation': list(np.abs((tap_powers * np.exp(-2j * np.pi * separations * tap_delays / nrof_subcarriers)).sum(axis=-1))),
+            'tap_power': list(tap_powers)}
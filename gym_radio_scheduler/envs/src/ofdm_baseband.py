@@ -0,0 +1,159 @@
+import numpy as np
+from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+
+''' Generate the square QAM constellation used by the py_itpp QAM modulator:
+    symbol i * L + j has the real part index j and the imaginary part index i,
+    and carries the Gray code of i followed by the Gray code of j (MSB first).
+    Returns (symbols, bitmap), where bitmap[s] holds the bits of symbol s.
+'''
+def generate_qam_constellation(modulation_order):
+    nrof_constellation_symbols = 2 ** modulation_order
+    L = int(round(np.sqrt(nrof_constellation_symbols)))
+    nrof_bits_per_level = modulation_order // 2
+
+    scaling_factor = np.sqrt((nrof_constellation_symbols - 1) * 2.0 / 3.0)
+
+    levels = np.arange(L)
+    gray_code = levels ^ (levels >> 1)
+    gray_code_bits = (gray_code[:, np.newaxis] >> np.arange(nrof_bits_per_level - 1, -1, -1)) & 1
+
+    i, j = np.divmod(np.arange(nrof_constellation_symbols), L)
+    symbols = (((L - 1) - 2 * j) + 1j * ((L - 1) - 2 * i)) / scaling_factor
+    bitmap = np.concatenate((gray_code_bits[i], gray_code_bits[j]), axis=1)
+
+    return (symbols, bitmap)
+
+class OfdmBasebandEngine():
+    """
+       NumPy implementation of propagate_transmit_bits_over_channel for a
+       batch of transmissions: QAM modulation, OFDM transform, channel and
+       noise, channel compensation, OFDM receiver and LOGMAP soft
+       demodulation, with the same signal model as the py_itpp version.
+
+       Each subframe is held as a (nrof_symbols, nrof_subcarriers) array per
+       transmission, so a whole batch is transformed by one FFT call along
+       the subcarrier axis. The modulated symbols, noise, channel, received
+       symbols and symbol metrics are written into working buffers that are
+       sized for the largest batch seen and reused. The FFTs (np.fft has no
+       out argument), the per-bit symbol selection of the demodulation and
+       the returned soft values still allocate on every call. The noise is
+       drawn from the given NumPy generator.
+
+       As in the py_itpp version, the channel coefficients are applied
+       cyclically over the resource elements of the subframe, in the order
+       subcarrier by subcarrier within each OFDM symbol. When there is one
+       coefficient per granted subcarrier this is the usual per-subcarrier
+       channel.
+    """
+    def __init__(self, rng, nrof_resource_blocks=1):
+        self.rng = rng
+        self.nrof_subcarriers = nrof_resource_blocks * CONFIG.SUBCARRIERS_PER_PRB
+        self.nrof_symbols = CONFIG.NROF_OFDM_SYMBOLS_PER_SUBFRAME
+
+        self.constellations = {}
+        self.buffers = {} # (name, shape) -> working buffer sized for the largest batch
+        self.resource_element_indices = {} # number of channel coefficients -> coefficient of each resource element
+
+    # Returns the working buffer of shape (batch_size,) + shape, grown if needed
+    def _get_buffer(self, name, batch_size, shape, dtype):
+        buffer = self.buffers.get((name, shape))
+        if buffer is None or len(buffer) < batch_size:
+            buffer = np.empty((batch_size,) + shape, dtype=dtype)
+            self.buffers[(name, shape)] = buffer
+
+        return buffer[:batch_size]
+
+    def _get_constellation(self, modulation_order):
+        if modulation_order not in self.constellations:
+            symbols, bitmap = generate_qam_constellation(modulation_order)
+
+            # Decimal value of the bits carried by each symbol, to map bits to symbols
+            bits_to_symbol = np.empty(len(symbols), dtype=int)
+            bits_to_symbol[bitmap.dot(1 << np.arange(modulation_order - 1, -1, -1))] = np.arange(len(symbols))
+
+            # Symbols carrying a 0 and a 1 in each bit position
+            bit_symbol_indices = [(np.flatnonzero(bitmap[:, bit] == 0), np.flatnonzero(bitmap[:, bit] == 1)) for bit in range(modulation_order)]
+
+            self.constellations[modulation_order] = (symbols, bits_to_symbol, bit_symbol_indices)
+
+        return self.constellations[modulation_order]
+
+    def modulate_bits(self, transmit_bits, modulation_order, out=None):
+        symbols, bits_to_symbol, _ = self._get_constellation(modulation_order)
+
+        batch_size = transmit_bits.shape[0]
+        bit_groups = transmit_bits.reshape(batch_size, -1, modulation_order).astype(int, copy=False)
+
+        symbol_indices = self._get_buffer('symbol_indices', batch_size, bit_groups.shape[1:2], int)
+        np.dot(bit_groups, 1 << np.arange(modulation_order - 1, -1, -1), out=symbol_indices)
+        np.take(bits_to_symbol, symbol_indices, out=symbol_indices)
+
+        return np.take(symbols, symbol_indices, out=out)
+
+    ''' LOGMAP soft values log(P(bit = 0)) - log(P(bit = 1)). The symbol
+        metrics are summed in the log domain, as in IT++, so that they do not
+        underflow at high SNR or in deep fades.
+    '''
+    def demodulate_soft_bits(self, received_symbols, modulation_order, noise_variance):
+        symbols, _, bit_symbol_indices = self._get_constellation(modulation_order)
+
+        # Symbol metrics -|r - s|^2 / N0 of shape (batch_size, nrof_received_symbols, nrof_constellation_symbols)
+        batch_size = received_symbols.shape[0]
+        shape = received_symbols.shape[1:] + symbols.shape
+        difference = self._get_buffer('difference', batch_size, shape, complex)
+        metric = self._get_buffer('metric', batch_size, shape, float)
+
+        np.subtract(received_symbols[..., np.newaxis], symbols, out=difference)
+        np.abs(difference, out=metric)
+        np.square(metric, out=metric)
+        metric *= (-1.0 / noise_variance)[:, np.newaxis, np.newaxis]
+
+        soft_values = np.empty(received_symbols.shape + (modulation_order,))
+        for bit, (zero_indices, one_indices) in enumerate(bit_symbol_indices):
+            np.subtract(np.logaddexp.reduce(metric[..., zero_indices], axis=-1), np.logaddexp.reduce(metric[..., one_indices], axis=-1), out=soft_values[..., bit])
+
+        return soft_values.reshape(batch_size, -1)
+
+    ''' Propagate a batch of transmissions with the same modulation order.
+
+        transmit_bits has shape (batch_size, nrof_bits), channel_coefficients
+        (batch_size, nrof_subcarriers) and noise_variance (batch_size,).
+        Returns the soft values with shape (batch_size, nrof_bits).
+    '''
+    def propagate_transmit_bits_over_channel(self, transmit_bits, modulation_order, channel_coefficients, noise_variance):
+        transmit_bits = np.asarray(transmit_bits)
+        noise_variance = np.asarray(noise_variance, dtype=float)
+        channel_coefficients = np.asarray(channel_coefficients)
+
+        batch_size = transmit_bits.shape[0]
+        shape = (self.nrof_symbols, self.nrof_subcarriers)
+
+        modulated_symbols = self._get_buffer('modulated_symbols', batch_size, shape, complex)
+        self.modulate_bits(transmit_bits, modulation_order, out=modulated_symbols.reshape(batch_size, -1))
+
+        ofdm_symbols = np.fft.ifft(modulated_symbols, axis=-1)
+
+        # Complex Gaussian noise with the same scaling as the py_itpp version
+        noise = self._get_buffer('noise', batch_size, shape, complex)
+        self.rng.standard_normal(out=noise.view(float))
+        noise *= (0.5 * np.sqrt(noise_variance) * np.sqrt(0.5))[:, np.newaxis, np.newaxis]
+
+        nrof_channel_coefficients = channel_coefficients.shape[-1]
+        resource_element_index = self.resource_element_indices.get(nrof_channel_coefficients)
+        if resource_element_index is None:
+            resource_element_index = np.arange(self.nrof_symbols * self.nrof_subcarriers) % nrof_channel_coefficients
+            self.resource_element_indices[nrof_channel_coefficients] = resource_element_index
+
+        block_channel_coefficients = self._get_buffer('block_channel_coefficients', batch_size, shape, complex)
+        np.take(channel_coefficients, resource_element_index, axis=1, out=block_channel_coefficients.reshape(batch_size, -1))
+
+        received_symbols = self._get_buffer('received_symbols', batch_size, shape, complex)
+        np.multiply(ofdm_symbols, block_channel_coefficients, out=received_symbols)
+        received_symbols += noise
+
+        received_symbols /= block_channel_coefficients
+
+        # Receiver processing
+        demultiplexed_symbols = np.fft.fft(received_symbols, axis=-1).reshape(batch_size, -1)
+
+        return self.demodulate_soft_bits(demultiplexed_symbols, modulation_order, noise_variance)
@@ -0,0 +1,46 @@
+import py_itpp as pyp
+from collections import OrderedDict
+from .baseband_processing import create_convolutional_code
+
+class PhyContext():
+    """
+       Cache of the py_itpp objects used by the bit-level link processing:
+       the convolutional code, the QAM modulators (keyed by modulation order)
+       and the sequence interleavers (keyed by coded block length).
+
+       The objects are reused across subframes instead of being constructed
+       for every transmission. At most max_cache_size objects are kept; the
+       least recently used object is evicted first.
+    """
+    def __init__(self, max_cache_size=64):
+        self.max_cache_size = max_cache_size
+        self.cache = OrderedDict()
+
+    def _get(self, key, create):
+        cached_object = self.cache.get(key)
+        if cached_object is None:
+            cached_object = create()
+            self.cache[key] = cached_object
+            if len(self.cache) > self.max_cache_size:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(key)
+
+        return cached_object
+
+    def get_convolutional_code(self):
+        return self._get(('convolutional_code',), create_convolutional_code)
+
+    def get_modulator(self, modulation_order):
+        nrof_constellation_symbols = int(pyp.math.pow2(modulation_order))
+
+        return self._get(('qam', modulation_order), lambda: pyp.comm.QAM(nrof_constellation_symbols))
+
+    def get_sequence_interleaver_bin(self, block_length):
+        return self._get(('sequence_interleaver_bin', block_length), lambda: pyp.comm.sequence_interleaver_bin(block_length))
+
+    def get_sequence_interleaver_double(self, block_length):
+        return self._get(('sequence_interleaver_double', block_length), lambda: pyp.comm.sequence_interleaver_double(block_length))
+
+    def clear(self):
+        self.cache.clear()
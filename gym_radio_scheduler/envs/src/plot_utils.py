@@ -1,45 +1,15 @@
 import numpy as np
 
-import matplotlib
-#matplotlib.use('Agg')
-
-from matplotlib import pyplot as plt
-
-def calculate_window_average(values, win_size):
-    nrof_values = len(values)
-    nrof_windows = int(nrof_values / win_size)
-    winavg = np.ndarray((nrof_windows))
-    for window_index in range(nrof_windows):
-        window_values = values[window_index * win_size : (window_index + 1) * win_size]
-        winavg[window_index] = sum(window_values) / float(win_size)
-        
-    return winavg
-
-def calculate_moving_average(values, win_size):
-    nrof_values = len(values)
-    moving_avg_values = np.ndarray((nrof_values - win_size))
-    for i in range(nrof_values - win_size):
-        win_values = values[i : i + win_size]
-        moving_avg_values[i] = sum(win_values) / float(win_size)
-        
-    return moving_avg_values
-            
-def calculate_jain_fairness_index(values):
-    nrof_resources = len(values)
-     
-    sum_of_squared_values = sum([np.square(x) for x in values])
-    square_of_summed_values = np.square(sum(values))
-    
-    fairness_index = []
-    for i in range(len(sum_of_squared_values)):
-        if sum_of_squared_values[i] != 0:
-            fairness_index.append(square_of_summed_values[i] / (nrof_resources * sum_of_squared_values[i]))
-            
-    return fairness_index
+from .throughput_analytics import calculate_window_average, calculate_moving_average, calculate_jain_fairness_index, calculate_average_fairness_index
 
 # Plot
 # Plot Flags: [Moving Average Throughput, Window Average Throughput, Jain Fairness Index]
 def plot_average_throughput_and_fairness_index(filepath, plot_flags=[True, True, True], tput_win_size=100):
+    # Imported here, so matplotlib is only loaded when plotting
+    import matplotlib
+    #matplotlib.use('Agg')
+
+    from matplotlib import pyplot as plt
     
     data = np.load(filepath)[()]
     
@@ -62,17 +32,14 @@ def plot_average_throughput_and_fairness_index(filepath, plot_flags=[True, True,
         legend_strings.append('User %d SNR %d dB'%(ue_index, snr_dB[ue_index]))
     legend_strings.append('Cell')
     
-    ue_subframe_tputs = []
-    cell_subframe_tputs = np.zeros((nrof_subframes))
-    for ue_index in range(nrof_ues):
-        ue_subframe_tputs.append(ue[ue_index]['statistics']['subframe_throughput'])
-        cell_subframe_tputs = cell_subframe_tputs + ue_subframe_tputs[ue_index]
+    ue_subframe_tputs = np.array([ue[ue_index]['statistics']['subframe_throughput'] for ue_index in range(nrof_ues)])
+    cell_subframe_tputs = ue_subframe_tputs.sum(axis=0)
     
     # Moving average of throughput
     if (plot_flags[0]):
+        ue_moving_avg_tput = calculate_moving_average(ue_subframe_tputs, tput_win_size)
         for ue_index in range(nrof_ues):
-            ue_moving_avg_tput = calculate_moving_average(ue_subframe_tputs[ue_index], tput_win_size)
-            ax[ax_index].semilogy(ue_moving_avg_tput)
+            ax[ax_index].semilogy(ue_moving_avg_tput[ue_index])
              
         cell_moving_avg_tput = calculate_moving_average(cell_subframe_tputs, tput_win_size)
              
@@ -87,10 +54,8 @@ def plot_average_throughput_and_fairness_index(filepath, plot_flags=[True, True,
         ax_index = ax_index + 1
     
     # Plot the cumulative distribution of the window averages        
-    ue_winavg_tput = [calculate_window_average(ue_subframe_tputs[ue_index], tput_win_size) for ue_index in range(nrof_ues)]
-        
-    ue_winavg_tput_sorted = [np.sort(ue_winavg_tput[ue_index]) for ue_index in range(nrof_ues)]
-    cell_winavg_tput_sorted = sum(ue_winavg_tput_sorted)
+    ue_winavg_tput_sorted = np.sort(calculate_window_average(ue_subframe_tputs, tput_win_size), axis=-1)
+    cell_winavg_tput_sorted = ue_winavg_tput_sorted.sum(axis=0)
     
     nrof_windows = len(cell_winavg_tput_sorted)
     y = np.arange(nrof_windows) / float(nrof_windows)
@@ -123,14 +88,7 @@ def plot_average_throughput_and_fairness_index(filepath, plot_flags=[True, True,
     
     # Calculate the Jain fairness index
     window_sizes = np.arange(10, 101, 10)
-    avg_fairness = np.ndarray((len(window_sizes))) 
-    for i, W in enumerate(window_sizes):
-        ue_scaled_tput = []
-        for ue_index in range(nrof_ues):
-            window_avg_tput = calculate_window_average(ue_subframe_tputs[ue_index], W)
-            ue_scaled_tput.append(window_avg_tput / snr_dB[ue_index])
-        
-        avg_fairness[i] = np.mean(calculate_jain_fairness_index(ue_scaled_tput))
+    avg_fairness = calculate_average_fairness_index(ue_subframe_tputs, window_sizes, snr_dB)
         
     if (plot_flags[2]):
         ax[ax_index].plot(window_sizes, avg_fairness)
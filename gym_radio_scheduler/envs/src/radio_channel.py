@@ -1,5 +1,6 @@
 import py_itpp as pyp
 from .CONSTANTS import CUSTOM_SYSTEM_CONFIG as CONFIG
+from .numpy_channel import calculate_doppler_frequency
 
 ''' Create an instance of the channel
 '''
@@ -8,10 +9,8 @@ def setup_fading_channel(channel_spec, relative_speed):
 
     channel = pyp.comm.TDL_Channel(channel_spec, sampling_interval)
 
-    # Maximum Doppler frequency assuming a 2Ghz carrier
-    doppler_frequency = (CONFIG.CARRIER_FREQUENCY / 3e8) * relative_speed
-    
-    norm_doppler = doppler_frequency * CONFIG.SAMPLING_INTERVAL
+    # Maximum Doppler frequency at the carrier frequency, normalized to the sampling rate
+    norm_doppler = calculate_doppler_frequency(relative_speed) * CONFIG.SAMPLING_INTERVAL
     channel.set_norm_doppler(norm_doppler)
     
     return channel
@@ -36,10 +35,12 @@ def calculate_channel_frequency_response(channel, subframe_index, nrof_resource_
     
     return channel_coefficients
 
-
-def propagate_transmit_bits_over_channel(transmit_bits, modulation_order, nrof_resource_blocks, channel_coefficients, noise_variance):
-    nrof_constellation_symbols = int(pyp.math.pow2(modulation_order))
-    modulator = pyp.comm.QAM(nrof_constellation_symbols)
+def propagate_transmit_bits_over_channel(transmit_bits, modulation_order, nrof_resource_blocks, channel_coefficients, noise_variance, phy_context=None):
+    if phy_context is None:
+        nrof_constellation_symbols = int(pyp.math.pow2(modulation_order))
+        modulator = pyp.comm.QAM(nrof_constellation_symbols)
+    else:
+        modulator = phy_context.get_modulator(modulation_order)
         
     nrof_subcarriers = nrof_resource_blocks * CONFIG.SUBCARRIERS_PER_PRB
     nrof_symbols = CONFIG.NROF_OFDM_SYMBOLS_PER_SUBFRAME
@@ -0,0 +1,17 @@
+import py_itpp as pyp
+
+''' Copy of a py_itpp random generator state, as saved by RNG_get_state. The
+    copy is made through the generator itself, whose current state is left
+    unchanged.
+'''
+def copy_rng_state(rng_state):
+    current_rng_state = pyp.ivec()
+    pyp.RNG_get_state(current_rng_state)
+
+    copied_rng_state = pyp.ivec()
+    pyp.RNG_set_state(rng_state)
+    pyp.RNG_get_state(copied_rng_state)
+
+    pyp.RNG_set_state(current_rng_state)
+
+    return copied_rng_state
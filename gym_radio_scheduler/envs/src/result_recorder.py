@@ -0,0 +1,159 @@
+import json
+import os
+import numpy as np
+
+# Per-subframe record written by the simulators: (name, dtype)
+RECORD_FIELDS = (('subframe_index',          np.int64),
+                 ('scheduled_ue_index',      np.int32),
+                 ('cqi',                     np.int16),
+                 ('transport_block_size',    np.int32),
+                 ('harq_transmission_index', np.int16),
+                 ('throughput',              np.int32))
+
+def _column_filepath(result_dir, name):
+    return os.path.join(result_dir, name + '.bin')
+
+def _metadata_filepath(result_dir):
+    return os.path.join(result_dir, 'meta.json')
+
+class StreamingResultRecorder():
+    """
+       Append-only columnar store for per-subframe records.
+
+       Each field is stored as a raw binary column file in result_dir, with
+       the field names, dtypes, number of committed records and the
+       simulation parameters in meta.json. Records are buffered in chunks of
+       chunk_size records, so the memory use does not grow with the length
+       of the simulation, and every full chunk is appended to the column
+       files and then committed by atomically replacing meta.json.
+
+       After a crash, only the records committed in meta.json are valid.
+       Opening an existing result_dir with resume=True truncates the columns
+       to the committed records and continues appending after them; the
+       last committed subframe is given by last_subframe_index. Without
+       resume, a result_dir that holds records is rejected, and so are
+       parameters that differ from the stored ones. Use
+       load_recorded_results() to read the columns as memory maps.
+    """
+    def __init__(self, result_dir, chunk_size=4096, parameters=None, fields=RECORD_FIELDS, resume=False):
+        self.result_dir = result_dir
+        self.chunk_size = chunk_size
+        self.fields = [(name, np.dtype(dtype)) for name, dtype in fields]
+
+        if not os.path.exists(result_dir):
+            os.makedirs(result_dir)
+
+        metadata_filepath = _metadata_filepath(result_dir)
+        if os.path.exists(metadata_filepath):
+            with open(metadata_filepath) as f:
+                self.metadata = json.load(f)
+
+            if self.metadata['fields'] != [[name, dtype.str] for name, dtype in self.fields]:
+                raise ValueError('Mismatched record fields in %s'%(metadata_filepath))
+
+            # Compare the parameters as stored, e.g. with tuples as lists
+            if parameters is not None and json.loads(json.dumps(parameters, sort_keys=True)) != self.metadata['parameters']:
+                raise ValueError('Mismatched simulation parameters in %s'%(metadata_filepath))
+
+            if self.metadata['nrof_records'] > 0 and not resume:
+                raise ValueError('%s holds %d records, open it with resume=True to append to them'%(result_dir, self.metadata['nrof_records']))
+
+            # Discard records appended after the last commit
+            for name, dtype in self.fields:
+                with open(_column_filepath(result_dir, name), 'ab') as f:
+                    f.truncate(self.metadata['nrof_records'] * dtype.itemsize)
+        else:
+            self.metadata = {'fields': [[name, dtype.str] for name, dtype in self.fields],
+                             'nrof_records': 0,
+                             'parameters': parameters if parameters is not None else {}}
+
+            for name, _ in self.fields:
+                open(_column_filepath(result_dir, name), 'wb').close()
+            self._commit()
+
+        self.chunk = {name: np.zeros(chunk_size, dtype=dtype) for name, dtype in self.fields}
+        self.nrof_buffered_records = 0
+
+    @property
+    def nrof_records(self):
+        return self.metadata['nrof_records'] + self.nrof_buffered_records
+
+    ''' Subframe index of the last committed record, or None if there is none.
+    '''
+    @property
+    def last_subframe_index(self):
+        nrof_committed_records = self.metadata['nrof_records']
+        if nrof_committed_records == 0:
+            return None
+
+        dtype = dict(self.fields)['subframe_index']
+        with open(_column_filepath(self.result_dir, 'subframe_index'), 'rb') as f:
+            f.seek((nrof_committed_records - 1) * dtype.itemsize)
+
+            return int(np.frombuffer(f.read(dtype.itemsize), dtype=dtype)[0])
+
+    def _commit(self):
+        metadata_filepath = _metadata_filepath(self.result_dir)
+        temp_filepath = metadata_filepath + '.tmp'
+
+        with open(temp_filepath, 'w') as f:
+            json.dump(self.metadata, f, sort_keys=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filepath, metadata_filepath)
+
+    ''' Append one record, given as keyword arguments with one value per field.
+    '''
+    def append(self, **record):
+        index = self.nrof_buffered_records
+        for name, value in record.items():
+            self.chunk[name][index] = value
+
+        self.nrof_buffered_records += 1
+        if self.nrof_buffered_records == self.chunk_size:
+            self.flush()
+
+    ''' Write the buffered records to the column files and commit them.
+    '''
+    def flush(self):
+        nrof_records = self.nrof_buffered_records
+        if nrof_records == 0:
+            return
+
+        for name, _ in self.fields:
+            with open(_column_filepath(self.result_dir, name), 'ab') as f:
+                f.write(self.chunk[name][:nrof_records].tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.metadata['nrof_records'] += nrof_records
+        self._commit()
+
+        self.nrof_buffered_records = 0
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+''' Read the records committed to result_dir. Returns (columns, parameters),
+    where columns maps each field name to a read-only memory-mapped array.
+'''
+def load_recorded_results(result_dir):
+    with open(_metadata_filepath(result_dir)) as f:
+        metadata = json.load(f)
+
+    nrof_records = metadata['nrof_records']
+
+    columns = {}
+    for name, dtype in metadata['fields']:
+        if nrof_records == 0:
+            columns[name] = np.zeros(0, dtype=dtype)
+        else:
+            columns[name] = np.memmap(_column_filepath(result_dir, name), dtype=dtype, mode='r', shape=(nrof_records,))
+
+    return (columns, metadata['parameters'])
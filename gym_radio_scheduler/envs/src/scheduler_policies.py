@@ -0,0 +1,73 @@
+import numpy as np
+from .channel_quality_index import get_transmission_parameter_table
+
+''' Scheduler policies, registered by name.
+
+    A policy is called as policy(ue_state, subframe_index, rng, window_size)
+    and returns the index of the UE scheduled in each cell, as an integer
+    array of shape (nrof_cells,). ue_state is a dict of arrays of shape
+    (nrof_cells, nrof_ues):
+
+        'cqi'                     : latest reported CQI
+        'average_rate'            : throughput averaged over the last window_size subframes
+        'harq_transmission_index' : transmission index of the ongoing HARQ process, 0 if none
+        'buffer_occupancy'        : bits queued for transmission
+
+    rng is a NumPy generator owned by the simulator. The policies should not
+    modify ue_state.
+'''
+SCHEDULER_POLICIES = {}
+
+''' Register a scheduler policy under the given name, either directly or as a
+    decorator: @register_scheduler_policy('MyPolicy').
+'''
+def register_scheduler_policy(name, policy=None):
+    if policy is None:
+        return lambda policy: register_scheduler_policy(name, policy)
+
+    SCHEDULER_POLICIES[name] = policy
+
+    return policy
+
+''' Returns the policy registered under the given name. A callable is returned
+    as is, so a policy can also be passed without registering it.
+'''
+def get_scheduler_policy(scheduler_type):
+    if callable(scheduler_type):
+        return scheduler_type
+
+    if scheduler_type not in SCHEDULER_POLICIES:
+        raise ValueError('Unsupported scheduler type %s'%(scheduler_type))
+
+    return SCHEDULER_POLICIES[scheduler_type]
+
+@register_scheduler_policy('Random')
+def random_policy(ue_state, subframe_index, rng, window_size):
+    nrof_cells, nrof_ues = ue_state['cqi'].shape
+
+    return rng.integers(0, nrof_ues, size=nrof_cells)
+
+@register_scheduler_policy('RoundRobin')
+def round_robin_policy(ue_state, subframe_index, rng, window_size):
+    nrof_cells, nrof_ues = ue_state['cqi'].shape
+
+    return np.full(nrof_cells, subframe_index % nrof_ues)
+
+@register_scheduler_policy('MaxRate')
+def max_rate_policy(ue_state, subframe_index, rng, window_size):
+    return np.argmax(ue_state['cqi'], axis=1)
+
+@register_scheduler_policy('PropFair')
+def proportional_fair_policy(ue_state, subframe_index, rng, window_size):
+    if subframe_index < window_size: # Not enough data, perform round robin scheduling
+        return round_robin_policy(ue_state, subframe_index, rng, window_size)
+
+    _, transport_block_size_per_cqi = get_transmission_parameter_table(1)
+    instant_rate = transport_block_size_per_cqi[ue_state['cqi']] * 1e3
+    average_rate = ue_state['average_rate']
+
+    # UEs without throughput in the window get the highest priority
+    proportional_rate = np.full(average_rate.shape, 1e12)
+    np.divide(instant_rate, average_rate, out=proportional_rate, where=(average_rate != 0))
+
+    return np.argmax(proportional_rate, axis=1)
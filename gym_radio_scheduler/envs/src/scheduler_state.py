@@ -0,0 +1,118 @@
+import numpy as np
+
+# Fields of the scheduler state: (name, dtype, has a throughput window dimension)
+SCHEDULER_STATE_FIELDS = (('cqi',                          np.int64,   False), # Latest reported CQI
+                          ('harq_transmission_index',      np.int64,   False), # 0 if no HARQ process is ongoing
+                          ('harq_accumulated_snr',         np.float64, False), # Linear SNR accumulated over the HARQ transmissions (abstracted PHY)
+                          ('previous_scheduled_subframe',  np.int64,   False),
+                          ('subframe_throughput',          np.int64,   True),  # Circular throughput window
+                          ('subframe_throughput_index',    np.int64,   False), # Next write position in the window
+                          ('subframe_throughput_sum',      np.int64,   False), # Running sum over the window
+                          ('buffer_occupancy',             np.int64,   False), # Traffic source counters
+                          ('stream_position',              np.int64,   False),
+                          ('grant_start_resource_block',   np.int64,   False),
+                          ('grant_nrof_resource_blocks',   np.int64,   False),
+                          ('grant_cqi',                    np.int64,   False),
+                          ('grant_modulation_order',       np.int64,   False),
+                          ('grant_transport_block_size',   np.int64,   False))
+
+def _grant_field(name):
+    array_name = 'grant_' + name
+
+    def get_value(grant):
+        return int(getattr(grant.state, array_name)[grant.index])
+
+    def set_value(grant, value):
+        getattr(grant.state, array_name)[grant.index] = value
+
+    return property(get_value, set_value)
+
+class SchedulingGrant():
+    """
+       The scheduling grant of one UE, read from and written to the grant
+       arrays of a SchedulerState.
+    """
+    __slots__ = ('state', 'index')
+
+    def __init__(self, state, index):
+        self.state = state
+        self.index = index
+
+    start_resource_block = _grant_field('start_resource_block')
+    nrof_resource_blocks = _grant_field('nrof_resource_blocks')
+    cqi = _grant_field('cqi')
+    modulation_order = _grant_field('modulation_order')
+    transport_block_size = _grant_field('transport_block_size')
+
+class SchedulerState():
+    """
+       Per-UE scheduler state as a structure of arrays.
+
+       Every field in SCHEDULER_STATE_FIELDS is a typed NumPy array of shape
+       ue_shape, e.g. (nrof_ues,) or (num_envs, nrof_ues), with a trailing
+       dimension of window_size for the throughput window. All fields are
+       views on one contiguous byte buffer, so the whole state can be copied,
+       serialized or placed in shared memory in a single operation.
+
+       If buffer is given (any writable object supporting the buffer
+       protocol, of at least calculate_nbytes() bytes), the fields are views
+       on it and its contents are used as is. Otherwise a new buffer is
+       allocated and initialized.
+    """
+    __slots__ = ('ue_shape', 'window_size', 'buffer') + tuple(name for name, _, _ in SCHEDULER_STATE_FIELDS)
+
+    def __init__(self, ue_shape, window_size, buffer=None):
+        self.ue_shape = tuple(np.atleast_1d(ue_shape).tolist())
+        self.window_size = window_size
+
+        nbytes = self.calculate_nbytes(self.ue_shape, window_size)
+        if buffer is None:
+            self.buffer = np.zeros(nbytes, dtype=np.uint8)
+        else:
+            self.buffer = np.frombuffer(buffer, dtype=np.uint8, count=nbytes)
+
+        offset = 0
+        for name, dtype, windowed in SCHEDULER_STATE_FIELDS:
+            shape = self.ue_shape + ((window_size,) if windowed else ())
+            field = np.ndarray(shape, dtype=dtype, buffer=self.buffer, offset=offset)
+            setattr(self, name, field)
+            offset += field.nbytes
+
+        if buffer is None:
+            self.previous_scheduled_subframe.fill(-1)
+
+    ''' Size in bytes of the buffer holding the state of the given shape.
+    '''
+    @staticmethod
+    def calculate_nbytes(ue_shape, window_size):
+        nrof_ues = int(np.prod(ue_shape))
+
+        return sum(nrof_ues * (window_size if windowed else 1) * np.dtype(dtype).itemsize for _, dtype, windowed in SCHEDULER_STATE_FIELDS)
+
+    def get_grant(self, index):
+        return SchedulingGrant(self, index)
+
+    ''' Shift the throughputs into the windows of the given UEs (a single index
+        or an index tuple of arrays) and update the running sums.
+    '''
+    def update_subframe_throughput(self, index, tput):
+        window_index = self.subframe_throughput_index[index]
+        if isinstance(index, tuple):
+            window_element = index + (window_index,)
+        else:
+            window_element = (index, window_index)
+
+        self.subframe_throughput_sum[index] += tput - self.subframe_throughput[window_element]
+        self.subframe_throughput[window_element] = tput
+        self.subframe_throughput_index[index] = (window_index + 1) % self.window_size
+
+    def copy(self):
+        return SchedulerState(self.ue_shape, self.window_size, self.buffer.copy())
+
+    ''' Overwrite this state with the contents of another state of the same shape.
+    '''
+    def copy_from(self, other):
+        self.buffer[:] = other.buffer
+
+    def tobytes(self):
+        return self.buffer.tobytes()
@@ -0,0 +1,118 @@
+import numpy as np
+
+# Throughput and fairness statistics over the subframe axis (the last axis) of arrays of
+# shape (nrof_subframes,) or (nrof_ues, nrof_subframes). Only NumPy is used, so the
+# statistics are available without matplotlib.
+
+def _calculate_cumulative_sum(values):
+    values = np.asarray(values)
+
+    # Integer throughputs are summed exactly, floats in double precision
+    dtype = np.int64 if np.issubdtype(values.dtype, np.integer) else np.float64
+
+    cumulative_sum = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=dtype)
+    np.cumsum(values, axis=-1, out=cumulative_sum[..., 1:])
+
+    return cumulative_sum
+
+''' Average over consecutive, non-overlapping windows of win_size subframes.
+    Subframes after the last full window are ignored.
+'''
+def calculate_window_average(values, win_size):
+    values = np.asarray(values)
+    nrof_windows = values.shape[-1] // win_size
+
+    windows = values[..., :nrof_windows * win_size].reshape(values.shape[:-1] + (nrof_windows, win_size))
+
+    return windows.sum(axis=-1) / float(win_size)
+
+''' Average over the sliding windows of win_size subframes starting at subframes
+    0 to nrof_subframes - win_size - 1.
+'''
+def calculate_moving_average(values, win_size):
+    cumulative_sum = _calculate_cumulative_sum(values)
+    nrof_values = cumulative_sum.shape[-1] - 1
+
+    return (cumulative_sum[..., win_size:nrof_values] - cumulative_sum[..., :nrof_values - win_size]) / float(win_size)
+
+''' Window averages for several window sizes from a single cumulative sum over
+    the values. Returns a list with the result of calculate_window_average for
+    each window size.
+'''
+def calculate_window_averages(values, window_sizes):
+    cumulative_sum = _calculate_cumulative_sum(values)
+
+    # The sum over window k is the difference of the cumulative sums at the window boundaries
+    return [np.diff(cumulative_sum[..., ::win_size], axis=-1) / float(win_size) for win_size in window_sizes]
+
+''' Jain's fairness index over the resources (the first axis) of values, for
+    each window. Windows where all values are 0 are left out.
+'''
+def calculate_jain_fairness_index(values):
+    values = np.asarray(values, dtype=np.float64)
+    nrof_resources = values.shape[0]
+
+    sum_of_squared_values = np.square(values).sum(axis=0)
+    square_of_summed_values = np.square(values.sum(axis=0))
+
+    valid = sum_of_squared_values != 0
+
+    return square_of_summed_values[valid] / (nrof_resources * sum_of_squared_values[valid])
+
+''' Mean Jain fairness index of the window-averaged UE throughputs for each
+    window size, with the throughputs of shape (nrof_ues, nrof_subframes). The
+    window averages of each UE are divided by ue_weights, if given.
+'''
+def calculate_average_fairness_index(ue_subframe_tputs, window_sizes, ue_weights=None):
+    window_averages = calculate_window_averages(ue_subframe_tputs, window_sizes)
+
+    avg_fairness = np.zeros(len(window_sizes))
+    for i, window_average in enumerate(window_averages):
+        if ue_weights is not None:
+            window_average = window_average / np.asarray(ue_weights)[:, np.newaxis]
+
+        avg_fairness[i] = np.mean(calculate_jain_fairness_index(window_average))
+
+    return avg_fairness
+
+class StreamingHistogram():
+    """
+       Histogram of a stream of values, e.g. window-averaged throughputs, that
+       gives CDF and percentile estimates while the simulation runs.
+
+       The values are counted in nrof_bins bins between min_value and
+       max_value, linearly or logarithmically spaced. The memory does not
+       depend on the number of values, and the error of a percentile is at
+       most one bin width. Values outside the range are counted in the first
+       and last bins.
+    """
+    def __init__(self, min_value, max_value, nrof_bins=1000, log_scale=False):
+        if log_scale:
+            self.bin_edges = np.geomspace(min_value, max_value, nrof_bins + 1)
+        else:
+            self.bin_edges = np.linspace(min_value, max_value, nrof_bins + 1)
+
+        self.counts = np.zeros(nrof_bins, dtype=np.int64)
+
+    @property
+    def nrof_values(self):
+        return int(self.counts.sum())
+
+    def update(self, values):
+        bin_indices = np.searchsorted(self.bin_edges, np.ravel(values), side='right') - 1
+        np.clip(bin_indices, 0, len(self.counts) - 1, out=bin_indices)
+
+        self.counts += np.bincount(bin_indices, minlength=len(self.counts))
+
+    ''' Returns (values, cdf): the upper bin edges and the fraction of values
+        below each of them.
+    '''
+    def cdf(self):
+        return (self.bin_edges[1:], np.cumsum(self.counts) / float(max(self.nrof_values, 1)))
+
+    ''' Estimate the percentiles (0 to 100) by linear interpolation within the bins.
+    '''
+    def percentile(self, percentiles):
+        cumulative_counts = np.concatenate(([0], np.cumsum(self.counts)))
+
+        return np.interp(np.asarray(percentiles) / 100.0 * cumulative_counts[-1], cumulative_counts, self.bin_edges)
@@ -0,0 +1,163 @@
+import os
+import threading
+import numpy as np
+
+class TraceReplay():
+    """
+       Replays per-UE time series recorded in files, e.g. field measurements
+       or the channels of an earlier run: channel frequency responses with
+       shape (nrof_subframes, nrof_ues, nrof_subcarriers), or CQIs with shape
+       (nrof_subframes, nrof_ues).
+
+       trace_path is a .npy file, or a directory of .npy files holding
+       consecutive parts of the trace in name order, such as the BLOCK files
+       of a ChannelTraceCache. The files are memory-mapped, and a background
+       thread copies the nrof_prefetch_blocks blocks of block_size subframes
+       following the one being read into memory, so the file reads stay off
+       the simulation path.
+
+       After the last subframe of the trace, end_of_trace='loop' continues
+       from the first subframe, and 'stop' raises an IndexError. An error
+       while reading a block is raised when the block is read.
+    """
+    def __init__(self, trace_path, block_size=1000, nrof_prefetch_blocks=2, end_of_trace='loop'):
+        if end_of_trace not in ['loop', 'stop']:
+            raise ValueError('Unsupported end of trace mode %s'%(end_of_trace))
+
+        if os.path.isdir(trace_path):
+            filepaths = [os.path.join(trace_path, name) for name in sorted(os.listdir(trace_path)) if name.endswith('.npy')]
+        else:
+            filepaths = [trace_path]
+
+        if not filepaths:
+            raise ValueError('No trace files in %s'%(trace_path))
+
+        self.parts = [np.load(filepath, mmap_mode='r', allow_pickle=False) for filepath in filepaths]
+        self.shape = self.parts[0].shape[1:] # Shape of one subframe of the trace
+        self.dtype = self.parts[0].dtype
+        for part, filepath in zip(self.parts, filepaths):
+            if part.shape[1:] != self.shape or part.dtype != self.dtype:
+                raise ValueError('Mismatched trace file %s'%(filepath))
+
+        self.part_start_indices = np.cumsum([0] + [len(part) for part in self.parts])
+        self.nrof_subframes = int(self.part_start_indices[-1])
+        self.nrof_blocks = -(-self.nrof_subframes // block_size)
+
+        self.block_size = block_size
+        self.nrof_prefetch_blocks = nrof_prefetch_blocks
+        self.end_of_trace = end_of_trace
+
+        self.blocks = {} # block index -> block in memory
+        self.block_index = None
+        self.requested_blocks = []
+        self.errors = {} # block index -> exception raised while reading the block
+        self.closed = False
+        self.condition = threading.Condition()
+
+        self.thread = threading.Thread(target=self._read_requested_blocks, daemon=True)
+        self.thread.start()
+
+    def _read_block(self, block_index):
+        first_subframe_index = block_index * self.block_size
+        end_subframe_index = min(first_subframe_index + self.block_size, self.nrof_subframes)
+
+        block = np.empty((end_subframe_index - first_subframe_index,) + self.shape, dtype=self.dtype)
+
+        # Copy the overlapping range of every part of the trace
+        for part, part_start_index in zip(self.parts, self.part_start_indices):
+            start_index = max(first_subframe_index, part_start_index)
+            end_index = min(end_subframe_index, part_start_index + len(part))
+            if start_index < end_index:
+                block[start_index - first_subframe_index:end_index - first_subframe_index] = part[start_index - part_start_index:end_index - part_start_index]
+
+        block.flags.writeable = False
+
+        return block
+
+    # Background thread: read the requested blocks in the order they were requested
+    def _read_requested_blocks(self):
+        while True:
+            with self.condition:
+                while not self.requested_blocks and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                block_index = self.requested_blocks[0]
+
+            try:
+                block = self._read_block(block_index)
+            except Exception as e:
+                with self.condition:
+                    self.errors[block_index] = e
+            else:
+                with self.condition:
+                    self.blocks[block_index] = block
+
+            with self.condition:
+                self.requested_blocks.remove(block_index)
+                self.condition.notify_all()
+
+    def _load_block(self, block_index):
+        # Blocks that are read next, wrapping around in the loop mode
+        prefetch_block_indices = [block_index + offset for offset in range(self.nrof_prefetch_blocks + 1)]
+        if self.end_of_trace == 'loop':
+            prefetch_block_indices = [index % self.nrof_blocks for index in prefetch_block_indices]
+        prefetch_block_indices = [index for index in prefetch_block_indices if index < self.nrof_blocks]
+
+        with self.condition:
+            # Release the blocks outside the prefetch window
+            self.blocks = {index: block for index, block in self.blocks.items() if index in prefetch_block_indices}
+
+            for index in prefetch_block_indices:
+                if index not in self.blocks and index not in self.requested_blocks and index not in self.errors:
+                    self.requested_blocks.append(index)
+            self.condition.notify_all()
+
+            while block_index not in self.blocks and block_index not in self.errors and not self.closed:
+                self.condition.wait()
+
+            if block_index in self.errors:
+                raise self.errors.pop(block_index)
+            if self.closed:
+                raise RuntimeError('Trace replay is closed')
+
+            self.block_index = block_index
+
+            return self.blocks[block_index]
+
+    ''' Returns a read-only array with the trace values of all UEs in the given subframe.
+    '''
+    def get_subframe(self, subframe_index):
+        if subframe_index >= self.nrof_subframes:
+            if self.end_of_trace == 'stop':
+                raise IndexError('Subframe %d is past the end of the trace of %d subframes'%(subframe_index, self.nrof_subframes))
+
+            subframe_index %= self.nrof_subframes
+
+        block_index, offset = divmod(subframe_index, self.block_size)
+
+        block = self.blocks.get(block_index) if block_index == self.block_index else None
+        if block is None:
+            block = self._load_block(block_index)
+
+        return block[offset]
+
+    # Channel traces replace the generated channels as a source of frequency responses
+    get_frequency_responses = get_subframe
+
+    ''' True if the trace has no value for the given subframe, which only happens
+        with end_of_trace='stop'.
+    '''
+    def is_finished(self, subframe_index):
+        return self.end_of_trace == 'stop' and subframe_index >= self.nrof_subframes
+
+    ''' Stop the background thread and release the memory-mapped trace files.
+    '''
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+
+        self.thread.join()
+        self.blocks = {}
+        self.parts = []
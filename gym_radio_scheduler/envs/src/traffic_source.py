@@ -0,0 +1,81 @@
+import numpy as np
+
+class StreamingTrafficSource():
+    """
+       Full-buffer traffic for a number of UEs: every UE always has a packet
+       of nrof_bits_in_packet bits queued, and the next packet arrives as
+       soon as the previous one has been delivered.
+
+       Only counters are stored per UE: the number of bits left in the
+       current packet and the position in the UE's bit stream. The payload
+       bits are generated on demand from a counter-based (Philox) generator
+       keyed by the seed and the UE, so bit n of the stream of a UE is the
+       same however the stream is read, and the memory per UE does not
+       depend on the packet size.
+
+       The counters can be kept in arrays owned by the caller, e.g. views on
+       a SchedulerState, by passing them as buffer_occupancy and
+       stream_position.
+    """
+    nrof_words_per_counter = 4 # 64-bit words generated by Philox per counter value
+
+    def __init__(self, nrof_ues, nrof_bits_in_packet, seed=42, buffer_occupancy=None, stream_position=None):
+        self.nrof_ues = nrof_ues
+        self.nrof_bits_in_packet = nrof_bits_in_packet
+
+        # Independent Philox key for each UE
+        seed_sequences = np.random.SeedSequence(seed).spawn(nrof_ues)
+        self.keys = np.array([seed_sequence.generate_state(2, dtype=np.uint64) for seed_sequence in seed_sequences])
+
+        if buffer_occupancy is None:
+            buffer_occupancy = np.empty(nrof_ues, dtype=np.int64)
+        if stream_position is None:
+            stream_position = np.empty(nrof_ues, dtype=np.int64)
+
+        self.buffer_occupancy = buffer_occupancy # Bits left in the current packet
+        self.buffer_occupancy[:] = nrof_bits_in_packet
+        self.stream_position = stream_position # Bits delivered so far
+        self.stream_position[:] = 0
+
+    ''' Returns nrof_bits bits of the UE's stream starting at bit index
+        first_bit_index, as a NumPy array of uint8.
+    '''
+    def generate_stream_bits(self, ue_index, first_bit_index, nrof_bits):
+        first_word_index = first_bit_index // 64
+        end_word_index = (first_bit_index + nrof_bits + 63) // 64
+
+        counter = first_word_index // self.nrof_words_per_counter
+        first_generated_word_index = counter * self.nrof_words_per_counter
+
+        bit_generator = np.random.Philox(key=self.keys[ue_index], counter=counter)
+        words = bit_generator.random_raw(end_word_index - first_generated_word_index)[first_word_index - first_generated_word_index:]
+
+        bits = np.unpackbits(words.astype('<u8').view(np.uint8), bitorder='little')
+        offset = first_bit_index - 64 * first_word_index
+
+        return bits[offset:offset + nrof_bits]
+
+    ''' Returns the payload of the next transport block of the UE, as a NumPy
+        array of uint8. If fewer bits are left in the current packet, the block
+        is padded with zeros. The buffer is not updated until the block is
+        delivered.
+    '''
+    def get_transport_bits(self, ue_index, transport_block_size):
+        nrof_data_bits = int(min(transport_block_size, self.buffer_occupancy[ue_index]))
+
+        transport_bits = np.zeros(transport_block_size, dtype=np.uint8)
+        transport_bits[:nrof_data_bits] = self.generate_stream_bits(ue_index, int(self.stream_position[ue_index]), nrof_data_bits)
+
+        return transport_bits
+
+    ''' Remove the bits of delivered transport blocks from the UE buffers. Works
+        on single UEs and on arrays of distinct UEs.
+    '''
+    def deliver_bits(self, ue_index, nrof_bits):
+        nrof_data_bits = np.minimum(nrof_bits, self.buffer_occupancy[ue_index])
+
+        self.stream_position[ue_index] += nrof_data_bits
+        self.buffer_occupancy[ue_index] -= nrof_data_bits
+
+        # Full buffer: a new packet arrives when the current one has been delivered
+        self.buffer_occupancy[self.buffer_occupancy == 0] = self.nrof_bits_in_packet
@@ -0,0 +1,131 @@
+import itertools
+import json
+import os
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .radio_multilink_scheduler import RadioMultilinkScheduler
+
+''' Expand a parameter grid into the list of simulation runs. The grid maps
+    RadioMultilinkScheduler arguments (scheduler_type, nrof_ues,
+    prop_fair_window_size, cqi_reporting_interval) to lists of values.
+
+    Seed k is the same for every parameter combination, so the schedulers are
+    compared on common random numbers. The seeds are spawned from base_seed,
+    which makes every run independent of the order in which runs are executed.
+'''
+def generate_sweep_runs(parameter_grid, nrof_seeds=1, base_seed=42):
+    parameter_names = sorted(parameter_grid.keys())
+
+    seed_sequences = np.random.SeedSequence(base_seed).spawn(nrof_seeds)
+    seeds = [int(seed_sequence.generate_state(1, dtype=np.uint32)[0]) for seed_sequence in seed_sequences]
+
+    runs = []
+    for values in itertools.product(*[parameter_grid[name] for name in parameter_names]):
+        for seed_index, seed in enumerate(seeds):
+            par = dict(zip(parameter_names, values))
+            par['seed_index'] = seed_index
+            par['seed'] = seed
+            runs.append(par)
+
+    return runs
+
+''' Run a single simulation and return the per-subframe scheduling statistics.
+    The simulator owns its random stream, seeded from the run parameters only.
+'''
+def run_simulation(par, nrof_subframes):
+    scheduler_par = {key: value for key, value in par.items() if key != 'seed_index'}
+    sched = RadioMultilinkScheduler(**scheduler_par)
+
+    statistics = {'scheduled_ue_index': np.zeros(nrof_subframes, dtype=int),
+                  'cqi': np.zeros(nrof_subframes, dtype=int),
+                  'throughput': np.zeros(nrof_subframes, dtype=int)}
+    try:
+        for subframe_index in range(nrof_subframes):
+            scheduled_ue_index, cqi, tput = sched.transmit()
+
+            statistics['scheduled_ue_index'][subframe_index] = scheduled_ue_index
+            statistics['cqi'][subframe_index] = cqi
+            statistics['throughput'][subframe_index] = tput
+    finally:
+        sched.close()
+
+    return {'par': par, 'statistics': statistics}
+
+def _run_file_path(result_dir, run_index):
+    return os.path.join(result_dir, 'RUN_%06d.npz'%(run_index))
+
+# Parameters of a run as stored next to its results, e.g. with tuples as lists
+def _run_parameters_json(par, nrof_subframes):
+    return json.dumps({'par': par, 'nrof_subframes': nrof_subframes}, sort_keys=True, default=str)
+
+''' Save the result of a run as a plain .npz file holding the statistics and
+    the run parameters as JSON. The file is written under a temporary name
+    first, so that an interrupted save is never mistaken for a finished run.
+'''
+def _save_run_result(filepath, result, nrof_subframes):
+    with open(filepath + '.tmp', 'wb') as f:
+        np.savez(f, parameters=np.array(_run_parameters_json(result['par'], nrof_subframes)), **result['statistics'])
+    os.replace(filepath + '.tmp', filepath)
+
+''' Load the result of a run saved by _save_run_result. Returns None if the
+    run was saved with other parameters or another number of subframes, e.g.
+    after the parameter grid was edited, so that the run is simulated again.
+'''
+def _load_run_result(filepath, par, nrof_subframes):
+    with np.load(filepath, allow_pickle=False) as data:
+        if str(data['parameters']) != _run_parameters_json(par, nrof_subframes):
+            return None
+
+        statistics = {name: data[name] for name in data.files if name != 'parameters'}
+
+    return {'par': par, 'statistics': statistics}
+
+''' Run all simulations of the parameter grid on a pool of worker processes.
+
+    Results are merged into the returned list (ordered as generate_sweep_runs)
+    as they arrive. If result_dir is given, each finished run is saved to its
+    own file together with its parameters, and runs already present there
+    with the same parameters and number of subframes are loaded instead of
+    rerun, so an interrupted sweep can be resumed. Runs saved with other
+    parameters are rerun and overwritten. The optional callback is called
+    with (run_index, result) for every finished run.
+
+    Results do not depend on nrof_workers since every run is seeded
+    independently and executed in a single process.
+'''
+def run_parameter_sweep(parameter_grid, nrof_subframes, nrof_seeds=1, base_seed=42, nrof_workers=None, result_dir=None, callback=None):
+    runs = generate_sweep_runs(parameter_grid, nrof_seeds, base_seed)
+    results = [None for _ in runs]
+
+    if result_dir is not None:
+        if not os.path.exists(result_dir):
+            os.makedirs(result_dir)
+
+        for run_index in range(len(runs)):
+            filepath = _run_file_path(result_dir, run_index)
+            if os.path.exists(filepath):
+                results[run_index] = _load_run_result(filepath, runs[run_index], nrof_subframes)
+
+    def merge_result(run_index, result):
+        results[run_index] = result
+
+        if result_dir is not None:
+            _save_run_result(_run_file_path(result_dir, run_index), result, nrof_subframes)
+
+        if callback is not None:
+            callback(run_index, result)
+
+    pending_run_indices = [run_index for run_index in range(len(runs)) if results[run_index] is None]
+
+    if nrof_workers == 1:
+        for run_index in pending_run_indices:
+            merge_result(run_index, run_simulation(runs[run_index], nrof_subframes))
+    else:
+        with ProcessPoolExecutor(max_workers=nrof_workers) as executor:
+            futures = {executor.submit(run_simulation, runs[run_index], nrof_subframes): run_index for run_index in pending_run_indices}
+
+            for future in as_completed(futures):
+                merge_result(futures[future], future.result())
+
+    return results
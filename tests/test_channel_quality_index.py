@@ -0,0 +1,51 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+pyp = pytest.importorskip('py_itpp')
+
+from gym_radio_scheduler.envs.src import (calculate_channel_frequency_response,
+                                          calculate_wideband_channel_quality_index,
+                                          calculate_wideband_channel_quality_index_batch,
+                                          determine_snr_at_bler_target,
+                                          load_awgn_data,
+                                          setup_fading_channel,
+                                          to_vec)
+
+AWGN_DATAFILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'gym_radio_scheduler', 'envs', 'sim_data', 'awgn_custom_config_datafile.npy')
+
+NROF_UES = 3
+NROF_SUBFRAMES = 20
+
+# Channel coefficients of every UE in every subframe, as py_itpp vectors, and a noise variance per UE covering the CQI range
+def generate_links():
+    pyp.RNG_reset(7)
+
+    channel_spec = pyp.comm.Channel_Specification(pyp.comm.CHANNEL_PROFILE.ITU_Vehicular_B)
+    channels = [setup_fading_channel(channel_spec, 0.83) for _ in range(NROF_UES)]
+
+    channel_coefficients = [[calculate_channel_frequency_response(channel, sf_index) for channel in channels] for sf_index in range(NROF_SUBFRAMES)]
+    noise_variance = 10 ** (-0.1 * np.linspace(0.0, 30.0, NROF_UES))
+
+    return (channel_coefficients, noise_variance)
+
+# Without calibration and with a different EESM beta for every CQI
+@pytest.mark.parametrize('per_cqi_eesm_beta', [False, True])
+def test_batch_cqi_matches_scalar_cqi(per_cqi_eesm_beta):
+    channel_coefficients, noise_variance = generate_links()
+    snr_at_bler_target = determine_snr_at_bler_target(load_awgn_data(AWGN_DATAFILE), 0.1)
+
+    eesm_beta = np.linspace(1.0, 10.0, snr_at_bler_target.length()) if per_cqi_eesm_beta else None
+    scalar_eesm_beta = to_vec(eesm_beta) if per_cqi_eesm_beta else None
+    for subframe_channel_coefficients in channel_coefficients:
+        cqi = [calculate_wideband_channel_quality_index(coefficients, variance, snr_at_bler_target, scalar_eesm_beta) 
+               for coefficients, variance in zip(subframe_channel_coefficients, noise_variance)]
+
+        batch_cqi = calculate_wideband_channel_quality_index_batch(np.array([coefficients.to_numpy_ndarray() for coefficients in subframe_channel_coefficients]), 
+                                                                   noise_variance, 
+                                                                   snr_at_bler_target.to_numpy_ndarray(), 
+                                                                   eesm_beta)
+
+        np.testing.assert_array_equal(batch_cqi, cqi)
@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+pytest.importorskip('py_itpp')
+
+from gym_radio_scheduler.envs.radio_multilink_scheduler import RadioMultilinkScheduler
+from gym_radio_scheduler.envs.radio_scheduler_vec_env import RadioSchedulerVecEnv
+
+NROF_UES = 3
+NROF_SUBFRAMES = 20
+CQI_REPORTING_INTERVAL = 4
+
+# Lazy channel evaluation only skips channels that are not used, so the results are identical
+@pytest.mark.parametrize('phy_mode', ['bit_level', 'abstracted'])
+def test_lazy_channel_evaluation_matches_eager_evaluation(phy_mode):
+    results = []
+    for lazy_channel_evaluation in [False, True]:
+        sched = RadioMultilinkScheduler(nrof_ues=NROF_UES, 
+                                        scheduler_type='RoundRobin', 
+                                        cqi_reporting_interval=CQI_REPORTING_INTERVAL, 
+                                        seed=7, 
+                                        lazy_channel_evaluation=lazy_channel_evaluation, 
+                                        phy_mode=phy_mode)
+        results.append([sched.transmit() for _ in range(NROF_SUBFRAMES)])
+
+    assert results[0] == results[1]
+
+@pytest.mark.parametrize('phy_mode', ['bit_level', 'abstracted'])
+def test_vec_env_lazy_channel_evaluation_matches_eager_evaluation(phy_mode):
+    results = []
+    for lazy_channel_evaluation in [False, True]:
+        vec_env = RadioSchedulerVecEnv(2, 
+                                       nrof_ues=NROF_UES, 
+                                       scheduler_type='RoundRobin', 
+                                       cqi_reporting_interval=CQI_REPORTING_INTERVAL, 
+                                       seed=7, 
+                                       lazy_channel_evaluation=lazy_channel_evaluation, 
+                                       phy_mode=phy_mode)
+        results.append([vec_env.step() for _ in range(NROF_SUBFRAMES)])
+
+    for (observations, rewards, _, infos), (lazy_observations, lazy_rewards, _, lazy_infos) in zip(*results):
+        np.testing.assert_array_equal(observations, lazy_observations)
+        np.testing.assert_array_equal(rewards, lazy_rewards)
+        assert infos == lazy_infos
@@ -0,0 +1,27 @@
+import os
+
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+pytest.importorskip('py_itpp')
+
+from gym_radio_scheduler.envs.radio_scheduler_env import RadioSchedulerEnv
+from gym_radio_scheduler.envs.src import load_recorded_results
+
+def test_reset_records_each_episode_in_its_own_directory(tmp_path):
+    result_dir = str(tmp_path / 'results')
+    env = RadioSchedulerEnv(nrof_ues=4, scheduler_type='RoundRobin', seed=7, result_dir=result_dir, result_chunk_size=4)
+
+    nrof_subframes = [5, 3]
+    for nrof_episode_subframes in nrof_subframes:
+        env.reset()
+        for _ in range(nrof_episode_subframes):
+            env.step()
+    env.reset()
+    env.close()
+
+    assert sorted(os.listdir(result_dir)) == ['EPISODE_000000', 'EPISODE_000001', 'EPISODE_000002']
+    for episode_index, nrof_episode_subframes in enumerate(nrof_subframes):
+        columns, _ = load_recorded_results(os.path.join(result_dir, 'EPISODE_%06d'%(episode_index)))
+        np.testing.assert_array_equal(columns['subframe_index'], np.arange(nrof_episode_subframes))
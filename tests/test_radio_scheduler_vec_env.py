@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+pytest.importorskip('py_itpp')
+
+from gym_radio_scheduler.envs.radio_multilink_scheduler import RadioMultilinkScheduler
+from gym_radio_scheduler.envs.radio_scheduler_vec_env import RadioSchedulerVecEnv
+
+NROF_UES = 3
+NROF_SUBFRAMES = 30
+
+# A vec env with one cell draws the same random numbers in the same order as a single simulator with the same seed
+@pytest.mark.parametrize('scheduler_type', ['RoundRobin', 'Random', 'PropFair'])
+def test_single_cell_matches_radio_multilink_scheduler(scheduler_type):
+    sched = RadioMultilinkScheduler(nrof_ues=NROF_UES, scheduler_type=scheduler_type, seed=7)
+    vec_env = RadioSchedulerVecEnv(1, nrof_ues=NROF_UES, scheduler_type=scheduler_type, seed=7)
+
+    for _ in range(NROF_SUBFRAMES):
+        scheduled_ue_index, cqi, tput = sched.transmit()
+        observations, rewards, _, infos = vec_env.step()
+
+        assert (infos[0]['scheduled_ue_index'], infos[0]['cqi'], rewards[0]) == (scheduled_ue_index, cqi, tput)
+        np.testing.assert_array_equal(observations[0], sched.state.cqi)
@@ -0,0 +1,35 @@
+import importlib.util
+import json
+import os
+
+BENCHMARK_FILEPATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks', 'run_benchmarks.py')
+
+def load_run_benchmarks():
+    spec = importlib.util.spec_from_file_location('run_benchmarks', BENCHMARK_FILEPATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+def save_baseline(filepath, steps_per_second):
+    results = {name: {'steps_per_second': value, 'peak_rss_mb': 100.0} for name, value in steps_per_second.items()}
+    with open(filepath, 'w') as f:
+        json.dump({'machine': 'x86_64', 'platform': 'test', 'results': results}, f)
+
+def test_compare_with_baseline_flags_slowdowns_beyond_the_tolerance():
+    run_benchmarks = load_run_benchmarks()
+
+    baseline = {'fast': {'steps_per_second': 100.0}, 'slow': {'steps_per_second': 100.0}, 'removed': {'steps_per_second': 100.0}}
+    results = {'fast': {'steps_per_second': 91.0}, 'slow': {'steps_per_second': 89.0}, 'new': {'steps_per_second': 1.0}}
+
+    assert run_benchmarks.compare_with_baseline(results, baseline, 0.1) == ['slow']
+
+def test_check_baseline_exit_status(tmp_path):
+    run_benchmarks = load_run_benchmarks()
+    baseline_filepath = str(tmp_path / 'baseline.json')
+
+    assert run_benchmarks.check_baseline({'transmit': {'steps_per_second': 1.0}}, baseline_filepath, 0.1) == 0
+
+    save_baseline(baseline_filepath, {'transmit': 200.0})
+    assert run_benchmarks.check_baseline({'transmit': {'steps_per_second': 190.0}}, baseline_filepath, 0.1) == 0
+    assert run_benchmarks.check_baseline({'transmit': {'steps_per_second': 170.0}}, baseline_filepath, 0.1) == 1
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+pytest.importorskip('gym')
+pytest.importorskip('py_itpp')
+
+from gym_radio_scheduler.envs.sweep_runner import generate_sweep_runs, run_parameter_sweep, run_simulation
+
+PARAMETER_GRID = {'scheduler_type': ['RoundRobin', 'PropFair'], 'nrof_ues': [3], 'phy_mode': ['abstracted']}
+NROF_SUBFRAMES = 20
+NROF_SEEDS = 2
+
+def assert_results_equal(results, other_results):
+    assert len(results) == len(other_results)
+    for result, other_result in zip(results, other_results):
+        assert result['par'] == other_result['par']
+        for name, values in result['statistics'].items():
+            np.testing.assert_array_equal(values, other_result['statistics'][name])
+
+# Every run is seeded independently, so the results do not depend on the number of workers
+def test_sweep_results_do_not_depend_on_the_number_of_workers():
+    results = run_parameter_sweep(PARAMETER_GRID, NROF_SUBFRAMES, NROF_SEEDS, nrof_workers=1)
+    assert_results_equal(results, run_parameter_sweep(PARAMETER_GRID, NROF_SUBFRAMES, NROF_SEEDS, nrof_workers=2))
+
+    runs = generate_sweep_runs(PARAMETER_GRID, NROF_SEEDS)
+    assert_results_equal(results, [run_simulation(par, NROF_SUBFRAMES) for par in runs])
+
+def test_resumed_sweep_loads_the_stored_runs(tmp_path):
+    result_dir = str(tmp_path)
+    results = run_parameter_sweep(PARAMETER_GRID, NROF_SUBFRAMES, NROF_SEEDS, nrof_workers=1, result_dir=result_dir)
+
+    simulated_run_indices = []
+    resumed_results = run_parameter_sweep(PARAMETER_GRID, NROF_SUBFRAMES, NROF_SEEDS, nrof_workers=1, result_dir=result_dir, 
+                                          callback=lambda run_index, result: simulated_run_indices.append(run_index))
+    assert simulated_run_indices == []
+    assert_results_equal(results, resumed_results)
+
+    # Runs stored with another number of subframes are simulated again
+    resumed_results = run_parameter_sweep(PARAMETER_GRID, NROF_SUBFRAMES + 1, NROF_SEEDS, nrof_workers=1, result_dir=result_dir, 
+                                          callback=lambda run_index, result: simulated_run_indices.append(run_index))
+    assert simulated_run_indices == list(range(len(results)))
+    assert all(len(result['statistics']['cqi']) == NROF_SUBFRAMES + 1 for result in resumed_results)